@@ -0,0 +1,179 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.client import HTTPException
+from typing import Callable, Iterator, NamedTuple, Optional
+from .DumpListingValidator import ValidatorResult
+from .PhaseRecorder import PhaseRecorder
+from .ResultRecord import ResultRecord
+
+
+class _Task(NamedTuple):
+    name: str
+    # None for inputs that need to be given to run
+    function: Optional[Callable]
+    inputs: tuple
+    is_check: bool
+    # Returns the ResultRecord reporting an exception of function (None for the default one)
+    on_error: Optional[Callable[[Exception], ResultRecord]]
+
+
+class CheckScheduler():
+    """
+    Registry of checks (like validating the dump listings or probing the "latest"
+    dumps) and of the inputs they need (like the main index or the dump listings).
+
+    Inputs are either given when running the checks or computed by a provider, which
+    can itself need other inputs. Each input is computed once, as soon as all of its
+    inputs are available, and each check runs as soon as all of its inputs are. Checks
+    and providers run concurrently, so that the checks take about as long as the
+    slowest of them, instead of the sum.
+
+    A check or provider failing to read something (raising an OSError or HTTPException)
+    doesn't stop the others, it is reported as a failed ValidatorResult instead.
+    """
+    max_workers: int
+    recorder: PhaseRecorder
+
+    def __init__(self, max_workers: int = 4, recorder: Optional[PhaseRecorder] = None):
+        """
+        recorder is notified of each check (by its name) as a phase.
+        """
+        self.max_workers = max_workers
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
+        self._tasks = {}
+
+    def _add_task(self, name: str, function: Optional[Callable], inputs, is_check: bool, on_error: Optional[Callable] = None):
+        if name in self._tasks:
+            raise ValueError('"' + name + '" is already registered.')
+        for input_name in inputs:
+            # Inputs need to be registered first, so that there can't be any cycles
+            if input_name not in self._tasks or self._tasks[input_name].is_check:
+                raise ValueError('Unknown input "' + input_name + '" of "' + name + '".')
+
+        self._tasks[name] = _Task(name, function, tuple(inputs), is_check, on_error)
+
+    def add_input(self, name: str, provider: Optional[Callable] = None, inputs=(), on_error: Optional[Callable] = None):
+        """
+        Register an input computed by calling provider with the given inputs (in
+        order). Inputs without a provider need to be given to run.
+
+        on_error is called with the exception if the provider fails and returns the
+        ResultRecord reporting it (by default, the input is reported as failed).
+        """
+        self._add_task(name, provider, inputs, False, on_error)
+
+    def add_check(self, name: str, check: Callable[..., ValidatorResult], inputs=()):
+        """
+        Register a check, which is called with the given inputs (in order) and
+        returns a ValidatorResult.
+        """
+        self._add_task(name, check, inputs, True)
+
+    def get_checks(self) -> list:
+        """
+        The names of the checks, in the order they were registered.
+        """
+        return [task.name for task in self._tasks.values() if task.is_check]
+
+    def _run_task(self, task: _Task, values: dict):
+        function = task.function
+        if function is None:
+            raise ValueError('Input "' + task.name + '" needs to be given.')
+
+        args = [values[input_name] for input_name in task.inputs]
+        if not task.is_check:
+            return function(*args)
+
+        with self.recorder.phase(task.name):
+            return function(*args)
+
+    def _get_error_result(self, task: _Task, error: Exception) -> ValidatorResult:
+        if task.on_error is not None:
+            return ValidatorResult(False, [task.on_error(error)])
+
+        reason = str(error) or error.__class__.__name__
+        return ValidatorResult(False, [ResultRecord(
+            ('Check "' if task.is_check else 'Input "') + task.name + '" failed (' + reason + ').',
+            task.name, actual=reason)])
+
+    def run(self, inputs: Optional[dict] = None) -> Iterator[tuple]:
+        """
+        Run all checks, yields a (name, ValidatorResult) tuple for each check as soon
+        as it is done.
+
+        inputs are the given inputs by name, the computed inputs are added to it as
+        they become available. Providers of given inputs aren't called. An input whose
+        provider fails is yielded (with the error) instead of the checks that need it,
+        which aren't run. Other exceptions stop starting further checks and are raised.
+        """
+        values = inputs if inputs is not None else {}
+        # Only the inputs that are needed by any of the checks
+        needed = set()
+        to_visit = self.get_checks()
+        while to_visit:
+            name = to_visit.pop()
+            if name in needed or name in values:
+                continue
+            needed.add(name)
+            task = self._tasks[name]
+            if task.function is None:
+                raise ValueError('Input "' + name + '" needs to be given.')
+            to_visit += task.inputs
+
+        pending = [task for task in self._tasks.values() if task.name in needed]
+        if not pending:
+            return
+
+        failed = set()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+            running = {}
+            try:
+                while pending or running:
+                    # In the order registered, so that failures also skip the indirect dependents
+                    for task in [task for task in pending if any(name in failed for name in task.inputs)]:
+                        pending.remove(task)
+                        failed.add(task.name)
+                    for task in [task for task in pending if all(name in values for name in task.inputs)]:
+                        pending.remove(task)
+                        running[executor.submit(self._run_task, task, values)] = task
+                    if not running:
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = running.pop(future)
+                        try:
+                            value = future.result()
+                        except (OSError, HTTPException) as e:
+                            failed.add(task.name)
+                            yield task.name, self._get_error_result(task, e)
+                            continue
+
+                        if task.is_check:
+                            yield task.name, value
+                        else:
+                            values[task.name] = value
+            finally:
+                # Also when the caller stops early
+                for future in running:
+                    future.cancel()
+
+    def run_all(self, inputs: Optional[dict] = None, on_result: Optional[Callable] = None) -> ValidatorResult:
+        """
+        Like run, but returns the results of all checks (and failed inputs) merged (in
+        the order they were registered). on_result is called with the name and the
+        ValidatorResult of each one as soon as it is done.
+        """
+        results = {}
+        for name, result in self.run(inputs):
+            if on_result is not None:
+                on_result(name, result)
+            results[name] = result
+
+        valid = True
+        errors = []
+        for name in self._tasks:
+            if name in results:
+                valid = valid and results[name].valid
+                errors += results[name].errors
+
+        return ValidatorResult(valid, errors)
@@ -0,0 +1,279 @@
+import hashlib
+from http.client import HTTPException
+import json
+import mmap
+import os
+import tempfile
+from typing import Callable, Optional
+from .DumpListingSource import DumpListingSource, LocalDirectorySource
+from .DumpListingValidator import ValidatorResult
+from .ResultRecord import ResultRecord
+
+
+def parse_hashsum_file(raw: bytes) -> dict:
+    """
+    Parse a hash sum file (lines like "<hex digest>  <file name>") into a dict of
+    file name -> hex digest.
+    """
+    hashsums = {}
+    for line in raw.decode('UTF-8').splitlines():
+        parts = line.split(maxsplit=1)
+        if len(parts) == 2:
+            # Binary mode entries are prefixed with "*"
+            hashsums[parts[1].lstrip('*')] = parts[0].lower()
+
+    return hashsums
+
+
+def hash_file(
+    path: str,
+    hash_type: str,
+    chunk_size: int = 64 * 1024 * 1024,
+    progress: Optional[Callable[[int], None]] = None
+) -> str:
+    """
+    Hash the given file, reading it memory-mapped in chunks (constant memory).
+
+    progress is called with the size of each chunk once it was hashed.
+    """
+    hasher = hashlib.new(hash_type)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return hasher.hexdigest()
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(mapped), chunk_size):
+                    hasher.update(view[offset:offset + chunk_size])
+                    if progress:
+                        progress(min(chunk_size, len(mapped) - offset))
+            finally:
+                view.release()
+
+    return hasher.hexdigest()
+
+
+# Bytes hashed so far by all hashing worker processes (see _init_hash_worker)
+_hashed_bytes = None
+
+
+def _init_hash_worker(hashed_bytes):
+    global _hashed_bytes
+    _hashed_bytes = hashed_bytes
+
+
+def _hash_file_counted(path: str, hash_type: str) -> str:
+    """
+    hash_file in a hashing worker process, counting the bytes hashed.
+    """
+    hashed_bytes = _hashed_bytes
+    if hashed_bytes is None:
+        return hash_file(path, hash_type)
+
+    def add_hashed_bytes(size):
+        with hashed_bytes.get_lock():
+            hashed_bytes.value += size
+
+    return hash_file(path, hash_type, progress=add_hashed_bytes)
+
+
+class ChecksumVerifier():
+    """
+    Opt-in verification of the md5/sha1 hash sum files of each dump directory.
+
+    The hash sum files are always checked to list every dump. For LocalDirectorySource,
+    the dump files can also be hashed (in parallel, using a process pool) and compared
+    to the hash sums.
+
+    Hashing progress can be kept in a state file: Dump files that were already hashed
+    (and did not change since) are not hashed again when an interrupted run is resumed.
+    Note that the hash of a single file can't be resumed part way through.
+    """
+    source: DumpListingSource
+    hash_dump_files: bool
+    hash_type: str
+    max_workers: Optional[int]
+    state_path: Optional[str]
+    progress: Optional[Callable]
+    progress_interval: float
+
+    def __init__(
+        self,
+        source: DumpListingSource,
+        hash_dump_files: bool = False,
+        hash_type: str = 'md5',
+        max_workers: Optional[int] = None,
+        state_path: Optional[str] = None,
+        progress: Optional[Callable] = None,
+        progress_interval: float = 5.0
+    ):
+        """
+        progress is called with the bytes hashed so far, the total bytes to hash and the
+        name of the dump file that was just hashed. While dump files are being hashed,
+        it is also called every progress_interval seconds (with None as name).
+        """
+        if hash_type not in ('md5', 'sha1'):
+            raise ValueError('Unknown hash_type ' + hash_type)
+        if hash_dump_files and not isinstance(source, LocalDirectorySource):
+            raise ValueError(
+                'Hashing dump files is only possible for a LocalDirectorySource.')
+
+        self.source = source
+        self.hash_dump_files = hash_dump_files
+        self.hash_type = hash_type
+        self.max_workers = max_workers
+        self.state_path = state_path
+        self.progress = progress
+        self.progress_interval = progress_interval
+
+    def _get_hashsums(self, dump_dir_name, dump_dir):
+        """
+        Returns a dict of hash type -> (hash sum file name, dict of file name -> hex digest)
+        and a ValidatorResult reporting the hash sum files that couldn't be read.
+        """
+        hashsums = {}
+        errors = []
+        for hash_type, hashsum_file in (('md5', dump_dir.md5sums_file), ('sha1', dump_dir.sha1sums_file)):
+            if not hashsum_file:
+                continue
+            try:
+                hashsums[hash_type] = (hashsum_file, parse_hashsum_file(
+                    self.source.read_file(dump_dir_name, hashsum_file)))
+            except (OSError, HTTPException, UnicodeDecodeError) as e:
+                reason = str(e) or e.__class__.__name__
+                errors.append(ResultRecord(
+                    'Hash sum file "' + hashsum_file + '" is unreachable (' + reason + ').',
+                    'hashsum_file_reachable', dump_dir=dump_dir_name, expected=hashsum_file, actual=reason))
+
+        return hashsums, ValidatorResult(not errors, errors)
+
+    def _ensure_hashsum_entries(self, dump_dir_name, dump_dir, hashsums) -> ValidatorResult:
+        """
+        Make sure all dumps are listed in all hash sum files.
+        """
+        valid = True
+        errors = []
+
+        for dump_name in dump_dir.dumps:
+            for hashsum_file, entries in hashsums.values():
+                if dump_name not in entries:
+                    valid = False
+                    errors.append(ResultRecord(
+                        'Dump ' + dump_name + ' is missing from hash sum file "' +
+                        hashsum_file + '".',
+                        'hashsum_entry', dump=dump_name, dump_dir=dump_dir_name, expected=hashsum_file))
+
+        return ValidatorResult(valid, errors)
+
+    def _load_state(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding='UTF-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        if not self.state_path:
+            return
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.state_path)), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='UTF-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _ensure_dump_file_hashes(self, to_hash) -> ValidatorResult:
+        """
+        Hash the given dump files (list of (dump directory name, dump name, path,
+        expected hex digest)) and make sure they match.
+        """
+        valid = True
+        errors = []
+        state = self._load_state()
+
+        def get_state_key(path):
+            stat = os.stat(path)
+            return '%s:%s:%d:%d' % (self.hash_type, path, stat.st_size, stat.st_mtime_ns)
+
+        digests = {}
+        pending = []
+        for _, dump_name, path, _ in to_hash:
+            state_key = get_state_key(path)
+            if state_key in state:
+                digests[dump_name] = state[state_key]
+            else:
+                pending.append((dump_name, path, state_key))
+
+        total_bytes = sum(os.stat(path).st_size for _, path, _ in pending)
+        if pending:
+            # Imports multiprocessing, only needed when hashing dump files
+            from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+            import multiprocessing
+
+            # Shared with the worker processes, which add to it after each chunk
+            hashed_bytes = multiprocessing.Value('q', 0)
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_hash_worker, initargs=(hashed_bytes,)
+            ) as executor:
+                futures = {executor.submit(_hash_file_counted, path, self.hash_type): (dump_name, state_key)
+                           for dump_name, path, state_key in pending}
+                reported_bytes = 0
+                while futures:
+                    done, _ = wait(futures, timeout=self.progress_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        dump_name, state_key = futures.pop(future)
+                        digests[dump_name] = state[state_key] = future.result()
+                        self._save_state(state)
+                        reported_bytes = hashed_bytes.value
+                        if self.progress:
+                            self.progress(reported_bytes, total_bytes, dump_name)
+                    if not done and self.progress and hashed_bytes.value != reported_bytes:
+                        # Within the (possibly huge) dump files being hashed
+                        reported_bytes = hashed_bytes.value
+                        self.progress(reported_bytes, total_bytes, None)
+
+        for dump_dir_name, dump_name, _, expected_digest in to_hash:
+            if digests[dump_name] != expected_digest:
+                valid = False
+                errors.append(ResultRecord(
+                    'Dump ' + dump_name + ' has ' + self.hash_type + ' ' +
+                    digests[dump_name] + ' (expected ' + expected_digest + ').',
+                    'dump_' + self.hash_type, dump=dump_name, dump_dir=dump_dir_name,
+                    expected=expected_digest, actual=digests[dump_name]))
+
+        return ValidatorResult(valid, errors)
+
+    def verify(self, dump_all_info) -> ValidatorResult:
+        valid = True
+        errors = []
+        to_hash = []
+
+        for dump_dir_name, dump_dir in dump_all_info.dump_dirs.items():
+            if not dump_dir.dumps:
+                continue
+
+            # Unreadable hash sum files are reported, the other dump directories are still checked
+            hashsums, result = self._get_hashsums(dump_dir_name, dump_dir)
+            valid = valid and result.valid
+            errors += result.errors
+            result = self._ensure_hashsum_entries(
+                dump_dir_name, dump_dir, hashsums)
+            valid = valid and result.valid
+            errors += result.errors
+
+            if self.hash_dump_files and self.hash_type in hashsums and isinstance(self.source, LocalDirectorySource):
+                entries = hashsums[self.hash_type][1]
+                for dump_name in dump_dir.dumps:
+                    if dump_name in entries:
+                        to_hash.append((dump_dir_name, dump_name, self.source.get_path(
+                            dump_dir_name, dump_name), entries[dump_name]))
+
+        if to_hash:
+            result = self._ensure_dump_file_hashes(to_hash)
+            valid = valid and result.valid
+            errors += result.errors
+
+        return ValidatorResult(valid, errors)
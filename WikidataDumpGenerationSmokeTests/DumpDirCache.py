@@ -0,0 +1,112 @@
+from hashlib import sha1
+import datetime
+import json
+import os
+import tempfile
+import time
+from typing import NamedTuple, Optional
+from .DumpListingTypes import DumpDirInfo, DumpInfo
+
+
+class DumpDirCacheEntry(NamedTuple):
+    dump_dir: DumpDirInfo
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # The dump directory's modification stamp from the main index, when it was read
+    stamp: Optional[str] = None
+
+
+class DumpDirCache():
+    """
+    On-disk cache of parsed dump directory listings (one JSON file per URL), along with
+    the validators (ETag, Last-Modified) needed to revalidate them and the modification
+    stamp of the dump directory (see DumpListingSource.get_main_index_stamped).
+    """
+    # Entries written in other formats are ignored (format 1 had dump dates without the time)
+    _format = 2
+
+    cache_dir: str
+    max_entries: int
+    max_age: float
+
+    def __init__(self, cache_dir: str, max_entries: int = 5000, max_age_days: float = 400):
+        """
+        Entries that were not used in max_age_days are evicted, as are the least
+        recently used entries beyond max_entries.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_path(self, url) -> str:
+        return os.path.join(self.cache_dir, sha1(url.encode('UTF-8')).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[DumpDirCacheEntry]:
+        path = self._get_path(url)
+        try:
+            with open(path, encoding='UTF-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('url') != url or data.get('format') != self._format:
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+        dumps = {
+            dump_name: DumpInfo(size, datetime.datetime.fromisoformat(date))
+            for dump_name, (size, date) in data['dumps'].items()
+        }
+        return DumpDirCacheEntry(
+            DumpDirInfo(dumps, data['md5sums_file'], data['sha1sums_file']),
+            data['etag'],
+            data['last_modified'],
+            data.get('stamp')
+        )
+
+    def set(
+        self,
+        url: str,
+        dump_dir: DumpDirInfo,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        stamp: Optional[str] = None
+    ):
+        data = {
+            'format': self._format,
+            'url': url,
+            'dumps': {
+                dump_name: [dump_info.size, dump_info.date.isoformat()]
+                for dump_name, dump_info in dump_dir.dumps.items()
+            },
+            'md5sums_file': dump_dir.md5sums_file,
+            'sha1sums_file': dump_dir.sha1sums_file,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stamp': stamp,
+        }
+        # Write to a temporary file first, so that concurrent readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='UTF-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._get_path(url))
+
+    def evict(self):
+        """
+        Remove entries that are too old or too many (least recently used first).
+        """
+        now = time.time()
+        entries = []
+        for dir_entry in os.scandir(self.cache_dir):
+            if not dir_entry.name.endswith('.json'):
+                continue
+            mtime = dir_entry.stat().st_mtime
+            if now - mtime > self.max_age:
+                os.unlink(dir_entry.path)
+            else:
+                entries.append((mtime, dir_entry.path))
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            os.unlink(path)
@@ -0,0 +1,112 @@
+from typing import Optional
+from .DumpListingValidator import ValidatorResult
+from .HttpTransport import HttpTransport
+from .ResultRecord import ResultRecord
+
+_BZ2_BLOCK_MAGIC = 0x314159265359
+_BZ2_END_OF_STREAM_MAGIC = 0x177245385090
+
+
+def check_gzip(head: bytes, tail: bytes) -> Optional[str]:
+    """
+    Check the gzip header (magic, compression method, reserved flags) and the
+    trailer (CRC32 and ISIZE). Returns the problem found, if any.
+    """
+    if len(head) < 10 or head[:2] != b'\x1f\x8b':
+        return 'no gzip header'
+    if head[2] != 8:
+        return 'unknown gzip compression method ' + str(head[2])
+    if head[3] & 0xe0:
+        return 'reserved gzip flags set'
+    if len(tail) < 8:
+        return 'no gzip trailer'
+    if not any(tail):
+        # CRC32 and ISIZE of a non-empty stream can't both be zero, this is what
+        # preallocated (or zero filled) files look like
+        return 'gzip trailer is zeroed (CRC32 and ISIZE are 0)'
+
+    return None
+
+
+def check_bz2(head: bytes, tail: bytes) -> Optional[str]:
+    """
+    Check the bzip2 stream header (magic, block size, first block or end of stream
+    magic) and that the (last) stream ends in the end of stream marker. Returns the
+    problem found, if any.
+    """
+    if len(head) < 10 or head[:3] != b'BZh' or head[3:4] not in b'123456789':
+        return 'no bzip2 header'
+    if int.from_bytes(head[4:10], 'big') not in (_BZ2_BLOCK_MAGIC, _BZ2_END_OF_STREAM_MAGIC):
+        return 'no bzip2 block after the header'
+
+    # The stream ends with the (bit aligned) 48 bit end of stream magic, the 32 bit
+    # combined CRC and up to 7 bits of padding.
+    tail_bits = int.from_bytes(tail[-11:], 'big')
+    for padding in range(8):
+        if (tail_bits >> (32 + padding)) & 0xffffffffffff == _BZ2_END_OF_STREAM_MAGIC:
+            return None
+
+    return 'no bzip2 end of stream marker'
+
+
+class DumpIntegrityProber():
+    """
+    Cheap corruption detection for the "latest" dumps: Only the first and the last
+    bytes of each dump are requested (using HTTP range requests) and their gzip/bzip2
+    structure is checked.
+    """
+    main_index_url: str
+    transport: HttpTransport
+    head_size: int
+    tail_size: int
+
+    def __init__(self, main_index_url: str, transport: Optional[HttpTransport] = None, head_size: int = 64, tail_size: int = 64):
+        self.main_index_url = main_index_url
+        self.transport = transport if transport is not None else HttpTransport()
+        self.head_size = head_size
+        self.tail_size = tail_size
+
+    def _request_range(self, url, byte_range) -> bytes:
+        # No content encoding, we want the raw bytes of the requested range
+        response = self.transport.stream(
+            url, {'Range': 'bytes=' + byte_range, 'Accept-Encoding': 'identity'})
+        if response.status != 206:
+            # Don't download the whole dump
+            response.chunks.close()
+            raise ValueError('range request failed (status ' +
+                             str(response.status) + ')')
+
+        return b''.join(response.chunks)
+
+    def _probe(self, latest_name) -> Optional[str]:
+        url = self.main_index_url + latest_name
+        try:
+            head = self._request_range(url, '0-' + str(self.head_size - 1))
+            tail = self._request_range(url, '-' + str(self.tail_size))
+        except ValueError as e:
+            return str(e)
+
+        if latest_name.endswith('.gz'):
+            return check_gzip(head, tail)
+        if latest_name.endswith('.bz2'):
+            return check_bz2(head, tail)
+
+        return None
+
+    def probe_latest(self, latest) -> ValidatorResult:
+        """
+        Make sure all "latest" dumps look like intact gzip/bzip2 files.
+        """
+        valid = True
+        errors = []
+
+        for latest_name in latest:
+            problem = self._probe(latest_name)
+            if problem:
+                valid = False
+                errors.append(ResultRecord(
+                    'Latest dump "' + latest_name +
+                    '" seems corrupt (' + problem + ').',
+                    'latest_integrity', dump=latest_name, actual=problem))
+
+        return ValidatorResult(valid, errors)
@@ -0,0 +1,257 @@
+from datetime import datetime
+import os
+import tempfile
+import threading
+import time
+from typing import ContextManager
+from .DumpListingValidator import ValidatorResult
+from .DumpSizeHistory import DumpSizeHistory
+from .DumpTable import DumpTable
+from .PhaseRecorder import PhaseRecorder
+from .ResultRecord import ResultRecord
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    return '{' + ','.join(name + '="' + _escape_label_value(str(value)) + '"' for name, value in labels) + '}'
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class _MetricsPhaseRecorder(PhaseRecorder):
+    def __init__(self, metrics: 'DumpListingMetrics', project: str):
+        self._metrics = metrics
+        self._project = project
+
+    def phase(self, name: str) -> ContextManager:
+        return _TimedPhase(self._metrics, self._project, name)
+
+
+class _TimedPhase():
+    def __init__(self, metrics: 'DumpListingMetrics', project: str, name: str):
+        self._metrics = metrics
+        self._project = project
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe_phase(
+            self._project, self._name, time.perf_counter() - self._start)
+
+
+class DumpListingMetrics():
+    """
+    Metrics about the dumps and the validation results (per project and canonical dump
+    type) and histograms of the time taken by each phase (see PhaseRecorder), in the
+    OpenMetrics text format.
+
+    The metrics can be written to a file (for the node_exporter textfile collector) or
+    be served over HTTP (from a long running --watch process).
+    """
+    prefix: str
+    buckets: tuple
+
+    def __init__(self, prefix: str = 'wikidata_dump_smoke_tests', buckets: tuple = DEFAULT_BUCKETS):
+        """
+        buckets are the upper bounds of the phase duration histogram buckets (seconds).
+        """
+        self.prefix = prefix
+        self.buckets = buckets
+
+        self._lock = threading.Lock()
+        # project -> list of (metric name, labels, value)
+        self._project_samples = {}
+        # (project, phase) -> [bucket counts..., sum, count]
+        self._phase_durations = {}
+
+    def get_phase_recorder(self, project: str) -> PhaseRecorder:
+        """
+        PhaseRecorder adding the phase durations of the given project to the histograms.
+        """
+        return _MetricsPhaseRecorder(self, project)
+
+    def observe_phase(self, project: str, phase: str, seconds: float):
+        with self._lock:
+            histogram = self._phase_durations.get((project, phase))
+            if histogram is None:
+                histogram = self._phase_durations[(project, phase)] = [
+                    0] * len(self.buckets) + [0.0, 0]
+            for i, upper_bound in enumerate(self.buckets):
+                if seconds <= upper_bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def _get_failing_types(self, dump_table: DumpTable, errors) -> set:
+        failing_types = set()
+        for error in errors:
+            dump_name = ResultRecord.from_error(error).dump
+            if dump_name is None:
+                continue
+
+            if dump_name.startswith('latest-'):
+                # The "latest" dumps are named without "-BETA"
+                dump_type = DumpSizeHistory.get_dump_type(dump_name)
+                for type_name in dump_table.type_names:
+                    if DumpSizeHistory.get_dump_type(type_name) == dump_type:
+                        failing_types.add(type_name)
+                continue
+
+            canonical_re = DumpTable._canonical_re.search(dump_name)
+            if canonical_re:
+                failing_types.add(canonical_re.group(
+                    1) + '-' + canonical_re.group(2))
+
+        return failing_types
+
+    def update(self, project: str, dump_all_info, result: ValidatorResult):
+        """
+        Replace the dump metrics of the given project with the ones of the given
+        DumpAllInfo and its validation result.
+        """
+        dump_table = dump_all_info.dump_table
+        if dump_table is None:
+            dump_table = DumpTable.from_dump_dirs(dump_all_info.dump_dirs)
+
+        # Rows are ordered by date, so the last two rows of each type are the newest
+        last_rows = {}
+        previous_rows = {}
+        for row, type_id in enumerate(dump_table.dump_type_ids):
+            previous_rows[type_id] = last_rows.get(type_id)
+            last_rows[type_id] = row
+
+        today = datetime.now().toordinal()
+        failing_types = self._get_failing_types(dump_table, result.errors)
+        samples: list = [
+            ('valid', (('project', project),), int(result.valid)),
+            ('errors', (('project', project),), len(result.errors)),
+        ]
+        for type_id, type_name in enumerate(dump_table.type_names):
+            row = last_rows[type_id]
+            labels = (('project', project), ('type', type_name))
+            dir_id = dump_table.dump_dir_ids[row]
+            size = dump_table.dump_sizes[row]
+
+            samples.append(('latest_dump_size_bytes', labels, size))
+            samples.append(('latest_dump_age_days', labels,
+                           today - dump_table.dump_days[row]))
+            previous_row = previous_rows[type_id]
+            if previous_row is not None and dump_table.dump_sizes[previous_row] > 0:
+                samples.append(('latest_dump_growth_ratio', labels,
+                               size / dump_table.dump_sizes[previous_row]))
+            samples.append(('hashsum_file_present', labels + (('hash', 'md5'),),
+                            dump_table.dir_has_md5sums[dir_id]))
+            samples.append(('hashsum_file_present', labels + (('hash', 'sha1'),),
+                            dump_table.dir_has_sha1sums[dir_id]))
+            samples.append(('dump_type_valid', labels,
+                           int(type_name not in failing_types)))
+
+        with self._lock:
+            self._project_samples[project] = samples
+
+    def update_mirror(self, project: str, comparison):
+        """
+        Replace the metrics of the given mirror with the ones of its MirrorComparison.
+        """
+        samples: list = [
+            ('valid', (('project', project),), int(comparison.valid)),
+            ('errors', (('project', project),), len(comparison.errors)),
+        ]
+        if comparison.sync_lag is not None:
+            samples.append(('mirror_sync_lag_days', (('project', project),), comparison.sync_lag))
+
+        with self._lock:
+            self._project_samples[project] = samples
+
+    _gauges = (
+        ('valid', 'Whether all checks passed (1) or not (0).'),
+        ('errors', 'Number of errors found.'),
+        ('latest_dump_size_bytes', 'Size of the newest dump of the type.'),
+        ('latest_dump_age_days', 'Age of the newest dump of the type.'),
+        ('latest_dump_growth_ratio', 'Size of the newest dump of the type relative to the previous one.'),
+        ('hashsum_file_present', 'Whether the dump directory of the newest dump of the type has the hash sum file.'),
+        ('dump_type_valid', 'Whether no errors were found for dumps of the type (1) or not (0).'),
+        ('mirror_sync_lag_days', 'Days between the newest dump directory and the newest one the mirror has synced.'),
+    )
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, help_text in self._gauges:
+                metric_name = self.prefix + '_' + name
+                lines.append('# HELP ' + metric_name + ' ' + help_text)
+                lines.append('# TYPE ' + metric_name + ' gauge')
+                for samples in self._project_samples.values():
+                    for sample_name, labels, value in samples:
+                        if sample_name == name:
+                            lines.append(
+                                metric_name + _format_labels(labels) + ' ' + _format_value(value))
+
+            metric_name = self.prefix + '_phase_duration_seconds'
+            lines.append('# HELP ' + metric_name +
+                         ' Time taken by each phase of reading and validating the dump listings.')
+            lines.append('# TYPE ' + metric_name + ' histogram')
+            for (project, phase), histogram in self._phase_durations.items():
+                labels = (('project', project), ('phase', phase))
+                for upper_bound, count in zip(self.buckets, histogram):
+                    lines.append(metric_name + '_bucket' + _format_labels(labels + (('le', repr(float(upper_bound))),)) +
+                                 ' ' + str(count))
+                lines.append(metric_name + '_bucket' + _format_labels(labels + (('le', '+Inf'),)) +
+                             ' ' + str(histogram[-1]))
+                lines.append(metric_name + '_sum' +
+                             _format_labels(labels) + ' ' + repr(histogram[-2]))
+                lines.append(metric_name + '_count' +
+                             _format_labels(labels) + ' ' + str(histogram[-1]))
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """
+        Write the metrics to the given file (atomically, as required by the textfile
+        collector, whose files need to end in ".prom").
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='UTF-8') as f:
+            f.write(self.render())
+        # mkstemp creates the file only readable by us, node_exporter might run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = ''):
+        """
+        Serve the metrics over HTTP (in a background thread), returns the server.
+        """
+        # Only needed in --watch mode
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('UTF-8')
+                self.send_response(200)
+                self.send_header(
+                    'Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,116 @@
+from functools import lru_cache
+import datetime
+import re
+from typing import Iterable, Iterator, Union
+from .DumpListingTypes import DumpDirInfo, DumpInfo
+
+
+@lru_cache(maxsize=None)
+def _parse_date(date: bytes) -> datetime.datetime:
+    # Listings only contain a handful of distinct timestamps, no need to strptime each row
+    date_string = date.decode('ascii')
+    if len(date_string) == len('01-Jan-2021'):
+        return datetime.datetime.strptime(date_string, '%d-%b-%Y')
+    return datetime.datetime.strptime(date_string, '%d-%b-%Y %H:%M')
+
+
+class DumpListingParser():
+    """
+    Parses the raw (HTML) directory index listings in a single pass over the bytes.
+
+    Each pattern matches at most once per line, preferring the first alternative, just
+    like searching each line for the first and then for the second pattern.
+
+    Listings can be given as bytes or as an iterable of chunks (like a streamed HTTP
+    response body), in which case they are parsed incrementally as the chunks arrive.
+    """
+    _dump_dir_re = re.compile(
+        rb"^(?:[^\n]*?(?P<dump>(?:wikidata|commons)-[^\n]*?\.(?:gz|bz2))[^\n]*(?P<date>\d\d-\w{3}-20[2-3]\d(?: \d\d:\d\d)?)[^\n]*?(?P<size>\d\d\d\d+)" +
+        rb"|[^\n]*?(?P<hashsum_file>(?:wikidata|commons)-\d+-(?P<hash_type>sha1|md5)sums\.txt))",
+        re.MULTILINE
+    )
+    _main_index_re = re.compile(
+        rb"^(?:[^\n]*?(?P<dir>20[2-3]\d[0-1]\d[0-3]\d/)(?:[^\n]*?(?P<dir_modified>\d\d-\w{3}-20[2-3]\d \d\d:\d\d))?" +
+        rb"|[^\n]*?(?P<latest>latest-[^\n]*?\.(?:gz|bz2))[^\n]*(?P<date>\d\d-\w{3}-20[2-3]\d \d\d:\d\d) +(?P<size>\d+))",
+        re.MULTILINE
+    )
+
+    @staticmethod
+    def _iter_matches(pattern: re.Pattern, listing: Union[bytes, Iterable[bytes]]) -> Iterator[re.Match]:
+        if isinstance(listing, bytes):
+            yield from pattern.finditer(listing)
+            return
+
+        # Incomplete last line of the chunks seen so far
+        remainder = []
+        for chunk in listing:
+            line_end = chunk.rfind(b'\n')
+            if line_end == -1:
+                remainder.append(chunk)
+                continue
+
+            remainder.append(chunk[:line_end + 1])
+            yield from pattern.finditer(b''.join(remainder))
+            remainder = [chunk[line_end + 1:]]
+
+        yield from pattern.finditer(b''.join(remainder))
+
+    @classmethod
+    def iter_dump_dir(cls, dump_dir_raw: Union[bytes, Iterable[bytes]]) -> Iterator[tuple]:
+        """
+        Yields a (name, DumpInfo) tuple for each dump and a (name, None) tuple for each
+        hash sum file, in listing order.
+        """
+        for match in cls._iter_matches(cls._dump_dir_re, dump_dir_raw):
+            dump_name = match.group('dump')
+            if dump_name is not None:
+                yield dump_name.decode('UTF-8'), DumpInfo(
+                    int(match.group('size')), _parse_date(match.group('date')))
+            else:
+                yield match.group('hashsum_file').decode('UTF-8'), None
+
+    @classmethod
+    def parse_dump_dir(cls, dump_dir_raw: Union[bytes, Iterable[bytes]]) -> DumpDirInfo:
+        dumps = {}
+        md5sums_file = None
+        sha1sums_file = None
+
+        for name, dump_info in cls.iter_dump_dir(dump_dir_raw):
+            if dump_info is not None:
+                dumps[name] = dump_info
+            elif name.endswith('-sha1sums.txt'):
+                sha1sums_file = name
+            else:
+                md5sums_file = name
+
+        return DumpDirInfo(dumps, md5sums_file, sha1sums_file)
+
+    @classmethod
+    def parse_main_index_stamped(cls, dump_main_index_raw: Union[bytes, Iterable[bytes]]):
+        """
+        Returns a tuple of a dict of the dump directories (ordered by date) to their
+        modification time stamp as listed (or None) and a dict of the "latest" dumps.
+        """
+        dirs = {}
+        latest = {}
+
+        for match in cls._iter_matches(cls._main_index_re, dump_main_index_raw):
+            dir_date = match.group('dir')
+            if dir_date is not None:
+                dir_modified = match.group('dir_modified')
+                dirs[dir_date.decode('ascii')] = dir_modified.decode(
+                    'ascii') if dir_modified else None
+            else:
+                latest[match.group('latest').decode('UTF-8')] = DumpInfo(
+                    int(match.group('size')), _parse_date(match.group('date')))
+
+        return dirs, latest
+
+    @classmethod
+    def parse_main_index(cls, dump_main_index_raw: Union[bytes, Iterable[bytes]]):
+        """
+        Returns a tuple of the list of dump directories and a dict of the "latest" dumps.
+        """
+        dirs, latest = cls.parse_main_index_stamped(dump_main_index_raw)
+
+        return list(dirs), latest
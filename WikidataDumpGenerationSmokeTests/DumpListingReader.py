@@ -1,97 +1,238 @@
-from urllib.request import urlopen
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 import datetime
-import re
-from typing import NamedTuple, Optional
-
-try:
-    class DumpInfo(NamedTuple):
-        size: int
-        date: datetime.datetime
-
-    class DumpDirInfo(NamedTuple):
-        dumps: dict[str, DumpInfo]
-        md5sums_file: Optional[str]
-        sha1sums_file: Optional[str]
-
-    class DumpAllInfo(NamedTuple):
-        latest: dict[str, DumpInfo]
-        dump_dirs: dict[str, DumpDirInfo]
-except TypeError:
-    # B/C for Python < 3.9: https://docs.python.org/3.9/whatsnew/3.9.html#type-hinting-generics-in-standard-collections
-    from collections import namedtuple
-    DumpDirInfo = namedtuple(
-        # type: ignore
-        'DumpDirInfo', ['dumps', 'md5sums_file', 'sha1sums_file'])
-    DumpInfo = namedtuple('DumpInfo', ['size', 'date'])  # type: ignore
-    DumpAllInfo = namedtuple(
-        'DumpAllInfo', ['latest', 'dump_dirs'])  # type: ignore
+from http.client import HTTPException
+import threading
+from typing import Optional, TYPE_CHECKING
+from .DumpListingSource import DumpListingSource, HttpIndexSource
+from .DumpListingTypes import DumpAllInfo, DumpDirInfo, DumpInfo
+from .DumpTable import DumpTable
+from .HttpTransport import HttpTransport
+from .PhaseRecorder import PhaseRecorder
+
+if TYPE_CHECKING:
+    from .DumpDirCache import DumpDirCache
+
+
+class LazyDumpDirs(Mapping):
+    """
+    Mapping of the dump directories (like "20211029/") to their DumpDirInfo, each dump
+    directory is only requested when it's first accessed. Iterating requests all dump
+    directories not requested yet at once (concurrently, see DumpListingReader).
+
+    Dump directories that can't be read are left out and added to unreachable_dirs.
+    """
+    unreachable_dirs: dict
+
+    def __init__(self, reader: 'DumpListingReader', dir_stamps: dict):
+        """
+        dir_stamps maps the dump directories (ordered by date) to their modification
+        stamp, see DumpListingSource.get_main_index_stamped.
+        """
+        self._reader = reader
+        self._dir_stamps = dir_stamps
+        self._newest_dir = list(dir_stamps)[-1] if dir_stamps else None
+        self._dump_dirs = {}
+        self._lock = threading.Lock()
+        self.unreachable_dirs = {}
+
+    def get_dirs(self) -> list:
+        """
+        All dump directories (ordered by date), without requesting them. Some of them
+        might turn out to be unreachable.
+        """
+        return list(self._dir_stamps)
+
+    def get_stamp(self, dir_date: str) -> Optional[str]:
+        """
+        The modification stamp of the given dump directory, from the main index.
+        """
+        return self._dir_stamps[dir_date]
+
+    def get_loaded(self) -> dict:
+        """
+        The dump directories read so far (ordered by date), without requesting any.
+        """
+        return {dir_date: self._dump_dirs[dir_date] for dir_date in self._dir_stamps if dir_date in self._dump_dirs}
+
+    def is_loaded(self, dir_date: str) -> bool:
+        return dir_date in self._dump_dirs or dir_date in self.unreachable_dirs
+
+    def load(self, dirs=None):
+        """
+        Request the given dump directories (all if not given), unless they were
+        requested already.
+        """
+        with self._lock:
+            dirs = [dir_date for dir_date in (self._dir_stamps if dirs is None else dirs)
+                    if not self.is_loaded(dir_date)]
+            if not dirs:
+                return
+            dump_dirs, unreachable_dirs = self._reader.get_dump_dirs(
+                dirs, self._newest_dir)
+            self._dump_dirs.update(dump_dirs)
+            self.unreachable_dirs.update(unreachable_dirs)
+
+    def __getitem__(self, dir_date: str) -> DumpDirInfo:
+        if dir_date not in self._dir_stamps:
+            raise KeyError(dir_date)
+        self.load([dir_date])
+        if dir_date in self.unreachable_dirs:
+            raise KeyError(dir_date)
+
+        return self._dump_dirs[dir_date]
+
+    def __contains__(self, dir_date) -> bool:
+        return dir_date in self._dir_stamps and dir_date not in self.unreachable_dirs
+
+    def __iter__(self):
+        self.load()
+        return (dir_date for dir_date in self._dir_stamps if dir_date in self._dump_dirs)
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self._dump_dirs)
 
 
 class DumpListingReader():
-    main_index_url: str
-
-    def __init__(self, main_index_url: str):
-        self.main_index_url = main_index_url
-
-    def _request_dump_main_index(self):
-        with urlopen(self.main_index_url) as request:
-            assert request.status == 200
-            return request.read()
-
-    def _request_dump_dir(self, dir_date):
-        with urlopen(self.main_index_url + dir_date) as request:
-            assert request.status == 200
-            return request.read()
-
-    def _get_dump_dir(self, dir_date) -> DumpDirInfo:
-        dump_dir_raw = self._request_dump_dir(dir_date)
-        dumps = {}
-        md5sums_file = None
-        sha1sums_file = None
-
-        for line in dump_dir_raw.splitlines():
-            line = line.decode('UTF-8')
-            res_dump = re.search(
-                r"((wikidata|commons)-.*?\.(gz|bz2)).*(\d\d-\w{3}-20[2-3]\d).*?(\d\d\d\d+)", line)
-            res_hashsum_file = re.search(
-                r"((wikidata|commons)-\d+-(sha1|md5)sums\.txt)", line)
-            if res_dump:
-                date = datetime.datetime.strptime(
-                    res_dump.group(4), '%d-%b-%Y')
-                dump_info = DumpInfo(int(res_dump.group(5)), date)
-                dumps[res_dump.group(1)] = dump_info
-            elif res_hashsum_file:
-                hash_type = res_hashsum_file.group(3)
-                if hash_type == 'sha1':
-                    sha1sums_file = res_hashsum_file.group(1)
-                elif hash_type == 'md5':
-                    md5sums_file = res_hashsum_file.group(1)
-                else:
-                    raise Exception('Unknown hash_type ' + hash_type)
-
-        return DumpDirInfo(dumps, md5sums_file, sha1sums_file)
+    max_workers: int
+    source: DumpListingSource
+    recorder: PhaseRecorder
+    last_dirs: Optional[int]
+    since_date: Optional[datetime.date]
+
+    def __init__(
+        self,
+        main_index_url: str,
+        max_workers: int = 1,
+        transport: Optional[HttpTransport] = None,
+        cache: Optional['DumpDirCache'] = None,
+        source: Optional[DumpListingSource] = None,
+        recorder: Optional[PhaseRecorder] = None,
+        last_dirs: Optional[int] = None,
+        since_date: Optional[datetime.date] = None
+    ):
+        """
+        Reads the directory index listings at main_index_url (using the given
+        transport and cache, see HttpIndexSource), unless another source is given.
+
+        max_workers limits how many dump directories are requested concurrently
+        (1 means the dump directories are requested one after another).
+
+        recorder is notified of the "index", "dump_dir" and "dump_table" phases.
+
+        Only the last_dirs newest dump directories and the ones from since_date on are
+        read (all, if not given).
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+        if last_dirs is not None and last_dirs < 1:
+            raise ValueError('last_dirs must be at least 1.')
+
+        self.max_workers = max_workers
+        self.source = source if source is not None else HttpIndexSource(
+            main_index_url, transport, cache)
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
+        self.last_dirs = last_dirs
+        self.since_date = since_date
+
+    def get_window(self, dirs) -> list:
+        """
+        The dump directories (ordered by date) within the last_dirs and since_date window.
+        """
+        dirs = list(dirs)
+        if self.since_date is not None:
+            since = self.since_date.strftime('%Y%m%d')
+            dirs = [dir_date for dir_date in dirs if dir_date[0:8] >= since]
+        if self.last_dirs is not None:
+            dirs = dirs[-self.last_dirs:]
+
+        return dirs
+
+    def _get_dump_dir(self, dir_date, is_newest=False) -> DumpDirInfo:
+        with self.recorder.phase('dump_dir'):
+            return self.source.get_dump_dir(dir_date, is_newest)
+
+    def _try_get_dump_dir(self, dir_date, is_newest=False):
+        """
+        Returns a tuple of the DumpDirInfo (or None) and the reason it couldn't be read.
+        """
+        try:
+            return self._get_dump_dir(dir_date, is_newest), None
+        except (OSError, HTTPException) as e:
+            return None, str(e) or e.__class__.__name__
 
     def get_dumps_info(self) -> DumpAllInfo:
-        dump_main_index_raw = self._request_dump_main_index()
-
-        dirs = []
-        latest = {}
-
-        for line in dump_main_index_raw.splitlines():
-            line = line.decode('UTF-8')
-            res_dirs = re.search(r"20[2-3]\d[0-1]\d[0-3]\d/", line)
-            res_latest = re.search(
-                r"(latest-.*?\.(gz|bz2)).*(\d\d-\w{3}-20[2-3]\d) \d\d:\d\d +(\d+)", line)
-            if res_dirs:
-                dirs.append(res_dirs.group(0))
-            elif res_latest:
-                date = datetime.datetime.strptime(
-                    res_latest.group(3), '%d-%b-%Y')
-                latest[res_latest.group(1)] = DumpInfo(
-                    int(res_latest.group(4)), date)
+        with self.recorder.phase('index'):
+            dirs, latest = self.source.get_main_index()
+
+        dump_dirs, unreachable_dirs = self.get_dump_dirs(self.get_window(dirs))
+
+        with self.recorder.phase('dump_table'):
+            dump_table = DumpTable.from_dump_dirs(dump_dirs)
+
+        return DumpAllInfo(latest, dump_dirs, dump_table, unreachable_dirs)
+
+    def get_lazy_dumps_info(self) -> DumpAllInfo:
+        """
+        Like get_dumps_info, but only the main index is read right away: The dump_dirs
+        are a LazyDumpDirs and there's no dump_table. Its unreachable_dirs are filled
+        as the dump directories are read.
+        """
+        with self.recorder.phase('index'):
+            dir_stamps, latest = self.source.get_main_index_stamped()
+
+        window = self.get_window(dir_stamps)
+        dump_dirs = LazyDumpDirs(
+            self, {dir_date: dir_stamps[dir_date] for dir_date in window})
+
+        return DumpAllInfo(latest, dump_dirs, None, dump_dirs.unreachable_dirs)
+
+    def load_dumps_info(self, dumps_info: DumpAllInfo) -> DumpAllInfo:
+        """
+        Reads all dump directories of a DumpAllInfo from get_lazy_dumps_info, returns
+        a DumpAllInfo like get_dumps_info does.
+        """
+        dump_dirs = dumps_info.dump_dirs
+        if isinstance(dump_dirs, LazyDumpDirs):
+            dump_dirs.load()
+            dump_dirs = dump_dirs.get_loaded()
+
+        with self.recorder.phase('dump_table'):
+            dump_table = DumpTable.from_dump_dirs(dump_dirs)
+
+        return DumpAllInfo(dumps_info.latest, dump_dirs, dump_table, dumps_info.unreachable_dirs)
+
+    def get_dump_dirs(self, dirs, newest_dir_date: Optional[str] = None):
+        """
+        Get the DumpDirInfo for all given dump directories, using up to self.max_workers
+        concurrent requests. The result is ordered like dirs (by date), as the
+        validator relies on this to compare each dump with the previous one.
+
+        newest_dir_date defaults to the last of dirs.
+
+        Returns a tuple of the dict of dump directories and a dict of the dump
+        directories that couldn't be read (the rest are still read) to the reason.
+        """
+        if newest_dir_date is None and dirs:
+            newest_dir_date = dirs[-1]
+
+        def get_dump_dir(dir_date):
+            return self._try_get_dump_dir(dir_date, dir_date == newest_dir_date)
+
+        if self.max_workers == 1 or len(dirs) < 2:
+            results = [get_dump_dir(dir_date) for dir_date in dirs]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(dirs))) as executor:
+                # Executor.map yields the results in the order of dirs
+                results = list(executor.map(get_dump_dir, dirs))
 
         dump_dirs = {}
-        for dir_date in dirs:
-            dump_dirs[dir_date] = self._get_dump_dir(dir_date)
-
-        return DumpAllInfo(latest, dump_dirs)
+        unreachable_dirs = {}
+        for dir_date, (dump_dir, reason) in zip(dirs, results):
+            if dump_dir is None:
+                unreachable_dirs[dir_date] = reason
+            else:
+                dump_dirs[dir_date] = dump_dir
+
+        return dump_dirs, unreachable_dirs
@@ -0,0 +1,285 @@
+from io import UnsupportedOperation
+from urllib.parse import unquote, urlsplit
+import datetime
+import os
+import re
+from typing import Optional, TYPE_CHECKING
+from .DumpListingParser import DumpListingParser
+from .DumpListingTypes import DumpDirInfo, DumpInfo
+from .HttpTransport import HttpStatusError, HttpTransport
+
+if TYPE_CHECKING:
+    from .DumpDirCache import DumpDirCache
+
+
+class DumpListingSource():
+    """
+    Where DumpListingReader gets the main index and the dump directories from.
+    """
+
+    def get_main_index_stamped(self):
+        """
+        Returns a tuple of a dict of the dump directories (ordered by date, like
+        "20211029/") to a modification stamp (that changes whenever the dump directory
+        changes, or None if unknown) and a dict of the "latest" dumps.
+        """
+        raise NotImplementedError()
+
+    def get_main_index(self):
+        """
+        Returns a tuple of the list of dump directories (ordered by date, like "20211029/")
+        and a dict of the "latest" dumps.
+        """
+        dirs, latest = self.get_main_index_stamped()
+
+        return list(dirs), latest
+
+    def get_dump_dir(self, dir_date: str, is_newest: bool = False) -> DumpDirInfo:
+        """
+        is_newest is set for the newest dump directory, which might still change.
+
+        Raises an OSError if the dump directory can't be read.
+        """
+        raise NotImplementedError()
+
+    def read_file(self, dir_date: str, file_name: str) -> bytes:
+        """
+        Read a (small) file from a dump directory, like a hash sum file.
+
+        Raises an OSError if the file can't be read (always, for sources that can't
+        read files).
+        """
+        raise UnsupportedOperation(self.__class__.__name__ + ' can not read files')
+
+
+class HtmlListingSource(DumpListingSource):
+    """
+    Source reading HTML directory index listings, as served by dumps.wikimedia.org.
+    """
+
+    def _read_main_index(self):
+        """
+        Returns the raw main index listing (bytes or an iterable of chunks).
+        """
+        raise NotImplementedError()
+
+    def _read_dump_dir(self, dir_date):
+        """
+        Returns the raw listing of the given dump directory (bytes or an iterable of chunks).
+        """
+        raise NotImplementedError()
+
+    def get_main_index_stamped(self):
+        return DumpListingParser.parse_main_index_stamped(self._read_main_index())
+
+    def get_dump_dir(self, dir_date: str, is_newest: bool = False) -> DumpDirInfo:
+        return DumpListingParser.parse_dump_dir(self._read_dump_dir(dir_date))
+
+
+class HttpIndexSource(HtmlListingSource):
+    main_index_url: str
+    transport: HttpTransport
+    cache: Optional['DumpDirCache']
+
+    def __init__(
+        self,
+        main_index_url: str,
+        transport: Optional[HttpTransport] = None,
+        cache: Optional['DumpDirCache'] = None
+    ):
+        """
+        transport can be given to share keep-alive connections (and timeout settings)
+        between sources.
+
+        If a cache is given, dump directories whose modification stamp in the main
+        index didn't change since they were cached (except for the newest one) are not
+        requested again and all other dump directories are only revalidated (using
+        conditional requests).
+        """
+        self.main_index_url = main_index_url
+        self.transport = transport if transport is not None else HttpTransport()
+        self.cache = cache
+        # The dump directory modification stamps from the main index read last
+        self._dir_stamps = {}
+
+    def _request(self, url):
+        """
+        Returns the response body as an iterator of chunks, to be parsed as they arrive.
+        """
+        response = self.transport.stream(url)
+        if response.status != 200:
+            response.chunks.close()
+            raise HttpStatusError(url, response.status)
+        return response.chunks
+
+    def _request_dump_main_index(self):
+        return self._request(self.main_index_url)
+
+    def _request_dump_dir(self, dir_date):
+        return self._request(self.main_index_url + dir_date)
+
+    def _read_main_index(self):
+        return self._request_dump_main_index()
+
+    def _read_dump_dir(self, dir_date):
+        return self._request_dump_dir(dir_date)
+
+    def read_file(self, dir_date: str, file_name: str) -> bytes:
+        return b''.join(self._request(self.main_index_url + dir_date + file_name))
+
+    def get_main_index_stamped(self):
+        if self.cache is not None:
+            self.cache.evict()
+
+        dirs, latest = super().get_main_index_stamped()
+        self._dir_stamps = dirs
+
+        return dirs, latest
+
+    def get_dump_dir(self, dir_date: str, is_newest: bool = False) -> DumpDirInfo:
+        if self.cache is None:
+            return super().get_dump_dir(dir_date, is_newest)
+
+        url = self.main_index_url + dir_date
+        stamp = self._dir_stamps.get(dir_date)
+        entry = self.cache.get(url)
+        headers = {}
+        if entry:
+            if not is_newest and stamp is not None and entry.stamp == stamp:
+                # Unchanged since it was cached (the newest one might still change
+                # within the minute of its stamp)
+                return entry.dump_dir
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self.transport.stream(url, headers)
+        if response.status == 304 and entry:
+            # Consume the (empty) body, so that the connection can be reused
+            for _ in response.chunks:
+                pass
+            if entry.stamp != stamp:
+                self.cache.set(url, entry.dump_dir, entry.etag, entry.last_modified, stamp)
+            return entry.dump_dir
+        if response.status != 200:
+            response.chunks.close()
+            raise HttpStatusError(url, response.status)
+
+        dump_dir = DumpListingParser.parse_dump_dir(response.chunks)
+        self.cache.set(url, dump_dir, response.headers.get('etag'),
+                       response.headers.get('last-modified'), stamp)
+        return dump_dir
+
+
+class HtmlSnapshotSource(HtmlListingSource):
+    """
+    Source reading saved HTML listings: The main index at main_index_path and the dump
+    directory listings next to it, named like "index-20211029.html".
+    """
+    main_index_path: str
+
+    def __init__(self, main_index_path: str):
+        self.main_index_path = main_index_path
+
+    def _read_main_index(self):
+        with open(self.main_index_path, 'rb') as f:
+            return f.read()
+
+    def _read_dump_dir(self, dir_date):
+        path = os.path.join(os.path.dirname(self.main_index_path),
+                            'index-' + dir_date.rstrip('/') + '.html')
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def _get_file_date(timestamp) -> datetime.datetime:
+    # Like the HTML listings: Minute precision, in UTC
+    date = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+    return datetime.datetime(date.year, date.month, date.day, date.hour, date.minute)
+
+
+class LocalDirectorySource(DumpListingSource):
+    """
+    Source reading the dumps directly from the (e.g. NFS mounted) file system, which
+    gives exact sizes.
+    """
+    _dir_re = re.compile(r"20[2-3]\d[0-1]\d[0-3]\d")
+    _latest_re = re.compile(r"latest-.*\.(gz|bz2)")
+    _dump_re = re.compile(r"(wikidata|commons)-.*\.(gz|bz2)")
+    _hashsum_file_re = re.compile(r"(wikidata|commons)-\d+-(sha1|md5)sums\.txt")
+
+    main_dir: str
+
+    def __init__(self, main_dir: str):
+        self.main_dir = main_dir
+
+    def _get_dump_info(self, dir_entry: os.DirEntry) -> DumpInfo:
+        try:
+            stat = dir_entry.stat()
+        except FileNotFoundError:
+            # Broken symlink
+            stat = dir_entry.stat(follow_symlinks=False)
+            return DumpInfo(0, _get_file_date(stat.st_mtime))
+
+        return DumpInfo(stat.st_size, _get_file_date(stat.st_mtime))
+
+    def get_main_index_stamped(self):
+        dirs = {}
+        latest = {}
+
+        for dir_entry in sorted(os.scandir(self.main_dir), key=lambda dir_entry: dir_entry.name):
+            if self._dir_re.fullmatch(dir_entry.name) and dir_entry.is_dir():
+                dirs[dir_entry.name + '/'] = str(dir_entry.stat().st_mtime_ns)
+            elif self._latest_re.fullmatch(dir_entry.name):
+                latest[dir_entry.name] = self._get_dump_info(dir_entry)
+
+        return dirs, latest
+
+    def get_path(self, dir_date: str, file_name: str) -> str:
+        return os.path.join(self.main_dir, dir_date, file_name)
+
+    def read_file(self, dir_date: str, file_name: str) -> bytes:
+        with open(self.get_path(dir_date, file_name), 'rb') as f:
+            return f.read()
+
+    def get_dump_dir(self, dir_date: str, is_newest: bool = False) -> DumpDirInfo:
+        dumps = {}
+        md5sums_file = None
+        sha1sums_file = None
+
+        dir_path = os.path.join(self.main_dir, dir_date)
+        for dir_entry in sorted(os.scandir(dir_path), key=lambda dir_entry: dir_entry.name):
+            if self._dump_re.fullmatch(dir_entry.name):
+                dumps[dir_entry.name] = self._get_dump_info(dir_entry)
+                continue
+
+            res_hashsum_file = self._hashsum_file_re.fullmatch(dir_entry.name)
+            if res_hashsum_file and res_hashsum_file.group(2) == 'sha1':
+                sha1sums_file = dir_entry.name
+            elif res_hashsum_file:
+                md5sums_file = dir_entry.name
+
+        return DumpDirInfo(dumps, md5sums_file, sha1sums_file)
+
+
+def get_dump_listing_source(
+    url: str,
+    transport: Optional[HttpTransport] = None,
+    cache: Optional['DumpDirCache'] = None
+) -> DumpListingSource:
+    """
+    Get the source for the given URL: http(s):// URLs are read as directory index
+    listings, file:// URLs are either a local dumps directory or a saved main index
+    HTML listing (a file ending in ".html").
+    """
+    url_parts = urlsplit(url)
+    if url_parts.scheme in ('http', 'https'):
+        return HttpIndexSource(url, transport, cache)
+    if url_parts.scheme == 'file':
+        path = unquote(url_parts.path)
+        if path.endswith('.html'):
+            return HtmlSnapshotSource(path)
+        return LocalDirectorySource(path)
+
+    raise ValueError('Unsupported source "' + url + '".')
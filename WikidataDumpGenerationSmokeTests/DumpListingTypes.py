@@ -0,0 +1,33 @@
+import datetime
+from typing import Mapping, NamedTuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .DumpTable import DumpTable
+
+try:
+    class DumpInfo(NamedTuple):
+        size: int
+        date: datetime.datetime
+
+    class DumpDirInfo(NamedTuple):
+        dumps: dict[str, DumpInfo]
+        md5sums_file: Optional[str]
+        sha1sums_file: Optional[str]
+
+    class DumpAllInfo(NamedTuple):
+        latest: dict[str, DumpInfo]
+        # A dict, or a LazyDumpDirs (see DumpListingReader.get_lazy_dumps_info)
+        dump_dirs: Mapping[str, DumpDirInfo]
+        # Built by DumpListingReader, see DumpTable
+        dump_table: Optional['DumpTable'] = None
+        # Dump directories that couldn't be read (not in dump_dirs) -> reason
+        unreachable_dirs: Optional[dict[str, str]] = None
+except TypeError:
+    # B/C for Python < 3.9: https://docs.python.org/3.9/whatsnew/3.9.html#type-hinting-generics-in-standard-collections
+    from collections import namedtuple
+    DumpDirInfo = namedtuple(
+        # type: ignore
+        'DumpDirInfo', ['dumps', 'md5sums_file', 'sha1sums_file'])
+    DumpInfo = namedtuple('DumpInfo', ['size', 'date'])  # type: ignore
+    DumpAllInfo = namedtuple(
+        'DumpAllInfo', ['latest', 'dump_dirs', 'dump_table', 'unreachable_dirs'], defaults=[None, None])  # type: ignore
@@ -1,6 +1,13 @@
-from datetime import datetime, timedelta
-import re
-from typing import NamedTuple
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional, TYPE_CHECKING
+from .DumpListingReader import LazyDumpDirs
+from .DumpTable import DumpTable
+from .PhaseRecorder import PhaseRecorder
+from .ResultRecord import ResultRecord
+from .ValidationState import ValidationState
+
+if TYPE_CHECKING:
+    from .DumpSizeTrendAnalyzer import DumpSizeTrendAnalyzer
 
 try:
     class ValidatorResult(NamedTuple):
@@ -14,14 +21,54 @@ except TypeError:
 
 
 class DumpListingValidator():
+    _canonical_re = DumpTable._canonical_re
+
     max_latest_age = 0
     expected_size_multiplicator = 0.0
     latest_expected = []
+    size_trend_analyzer: Optional['DumpSizeTrendAnalyzer'] = None
+    manifest_history: Optional[int] = None
+    recorder: PhaseRecorder
+
+    def __init__(
+        self,
+        max_latest_age=10,
+        expected_size_multiplicator=1.0005,
+        latest_expected=[],
+        size_trend_analyzer: Optional['DumpSizeTrendAnalyzer'] = None,
+        recorder: Optional[PhaseRecorder] = None,
+        manifest_history: Optional[int] = None
+    ):
+        """
+        If a size_trend_analyzer is given, dump sizes are checked against the growth
+        trend of their type, instead of using expected_size_multiplicator (the
+        size_trend_analyzer has its own for dumps with too little history).
 
-    def __init__(self, max_latest_age=10, expected_size_multiplicator=1.0005, latest_expected=[]):
+        If manifest_history is given, the dumps of each dump directory are checked
+        against the ones of the previous manifest_history dump directories started on
+        the same weekday (see _ensure_manifest).
+
+        recorder is notified of each check (like "ensure_latest") as a phase.
+        """
         self.max_latest_age = max_latest_age + 1
         self.expected_size_multiplicator = expected_size_multiplicator
         self.latest_expected = latest_expected
+        self.size_trend_analyzer = size_trend_analyzer
+        self.manifest_history = manifest_history
+        self.recorder = recorder if recorder is not None else PhaseRecorder()
+
+    def _ensure_reachable(self, unreachable_dirs) -> ValidatorResult:
+        """
+        Report the dump directories that couldn't be read (and therefore weren't checked).
+        """
+        errors = []
+        for dump_dir_name, reason in (unreachable_dirs or {}).items():
+            errors.append(ResultRecord(
+                'Dump directory "' + dump_dir_name +
+                '" is unreachable (' + reason + ').',
+                'reachable', dump_dir=dump_dir_name, actual=reason))
+
+        return ValidatorResult(not errors, errors)
 
     def _ensure_hashsum_files(self, dump_dirs) -> ValidatorResult:
         """
@@ -36,12 +83,38 @@ class DumpListingValidator():
                 continue
             if not dump_dir.md5sums_file:
                 valid = False
-                errors.append('Missing md5sum file in dir "' +
-                              dump_dir_name + '".')
+                errors.append(ResultRecord(
+                    'Missing md5sum file in dir "' + dump_dir_name + '".',
+                    'hashsum_files', dump_dir=dump_dir_name, expected='md5'))
             if not dump_dir.sha1sums_file:
                 valid = False
-                errors.append('Missing sha1sum file in dir "' +
-                              dump_dir_name + '".')
+                errors.append(ResultRecord(
+                    'Missing sha1sum file in dir "' + dump_dir_name + '".',
+                    'hashsum_files', dump_dir=dump_dir_name, expected='sha1'))
+
+        return ValidatorResult(valid, errors)
+
+    def _ensure_hashsum_files_table(self, dump_table: DumpTable) -> ValidatorResult:
+        """
+        Like _ensure_hashsum_files, on a DumpTable.
+        """
+        valid = True
+        errors = []
+
+        for dir_id, dump_dir_name in enumerate(dump_table.dir_names):
+            if not dump_table.dir_dump_counts[dir_id]:
+                # No dumps, no need for hashes
+                continue
+            if not dump_table.dir_has_md5sums[dir_id]:
+                valid = False
+                errors.append(ResultRecord(
+                    'Missing md5sum file in dir "' + dump_dir_name + '".',
+                    'hashsum_files', dump_dir=dump_dir_name, expected='md5'))
+            if not dump_table.dir_has_sha1sums[dir_id]:
+                valid = False
+                errors.append(ResultRecord(
+                    'Missing sha1sum file in dir "' + dump_dir_name + '".',
+                    'hashsum_files', dump_dir=dump_dir_name, expected='sha1'))
 
         return ValidatorResult(valid, errors)
 
@@ -49,7 +122,8 @@ class DumpListingValidator():
         """
         Make sure all "latest" dumps are recent enough (at most self.max_latest_age days).
         """
-        now = datetime.now()
+        # The dates of the listings are in UTC (without a time zone)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
         valid = True
         errors = []
 
@@ -58,65 +132,168 @@ class DumpListingValidator():
             # Older than expected
             if age > timedelta(days=self.max_latest_age):
                 valid = False
-                errors.append('Latest dump "' + latest_name +
-                              '" is too old (' + str(age.days) + ' days).')
+                errors.append(ResultRecord(
+                    'Latest dump "' + latest_name +
+                    '" is too old (' + str(age.days) + ' days).',
+                    'latest_age', dump=latest_name, expected=self.max_latest_age - 1, actual=age.days))
             if latest_info.size < 150:
                 valid = False
-                errors.append('Latest dump "' + latest_name +
-                              '" seems empty (probably a broken symlink).')
+                errors.append(ResultRecord(
+                    'Latest dump "' + latest_name +
+                    '" seems empty (probably a broken symlink).',
+                    'latest_size', dump=latest_name, expected=150, actual=latest_info.size))
 
         missing_latest = set(self.latest_expected) - set(latest.keys())
         if missing_latest:
             valid = False
-            errors.append('Missing expected files: "%s".' %
-                          '", "'.join(missing_latest))
+            errors.append(ResultRecord(
+                'Missing expected files: "%s".' % '", "'.join(missing_latest),
+                'latest_expected', expected=sorted(missing_latest)))
 
         return ValidatorResult(valid, errors)
 
-    def _ensure_dump_sizes(self, dumps_by_type) -> ValidatorResult:
+    def _ensure_dump_sizes(self, dumps_by_type, last_sizes=None) -> ValidatorResult:
         """
         Make sure all dumps are at least self.expected_size_multiplicator time as large as
-        the previous dump of the same type.
+        the previous dump of the same type (or as the size given in last_sizes, for the
+        first dump of each type).
         """
+        if last_sizes is None:
+            last_sizes = {}
         valid = True
         errors = []
 
         for dump_type, dumps in dumps_by_type.items():
-            last_size = 0
+            last_size = last_sizes.get(dump_type, 0)
             for dump_name, dump in dumps.items():
                 expected_size = int(
                     last_size * self.expected_size_multiplicator)
                 if dump.size < expected_size:
                     valid = False
-                    errors.append(
+                    errors.append(ResultRecord(
                         'Dump ' + dump_name + ' should be at least ' +
                         str(expected_size) +
-                        ' bytes (is ' + str(dump.size) + ' bytes).'
-                    )
+                        ' bytes (is ' + str(dump.size) + ' bytes).',
+                        'dump_size', dump=dump_name, expected=expected_size, actual=dump.size
+                    ))
                 last_size = dump.size
 
         return ValidatorResult(valid, errors)
 
+    def _ensure_dump_sizes_table(self, dump_table: DumpTable) -> ValidatorResult:
+        """
+        Like _ensure_dump_sizes, on a DumpTable (in a single pass over its rows).
+        """
+        last_sizes = [0] * len(dump_table.type_names)
+        # Errors are reported grouped by dump type
+        errors_by_type = [[] for _ in dump_table.type_names]
+
+        for row, (type_id, size) in enumerate(zip(dump_table.dump_type_ids, dump_table.dump_sizes)):
+            expected_size = int(
+                last_sizes[type_id] * self.expected_size_multiplicator)
+            if size < expected_size:
+                errors_by_type[type_id].append(ResultRecord(
+                    'Dump ' + dump_table.dump_names[row] + ' should be at least ' +
+                    str(expected_size) +
+                    ' bytes (is ' + str(size) + ' bytes).',
+                    'dump_size',
+                    dump=dump_table.dump_names[row],
+                    dump_dir=dump_table.dir_names[dump_table.dump_dir_ids[row]],
+                    expected=expected_size,
+                    actual=size
+                ))
+            last_sizes[type_id] = size
+
+        errors = [error for errors in errors_by_type for error in errors]
+        return ValidatorResult(not errors, errors)
+
+    def _get_canonical_name(self, dump_name) -> str:
+        canonical_re = self._canonical_re.search(dump_name)
+
+        if not canonical_re:
+            raise Exception(
+                'Cannot normalize dump name "' + dump_name + '".')
+
+        return canonical_re.group(1) + '-' + canonical_re.group(2)
+
     def _group_dumps_by_type(self, dump_dirs):
         dumps_by_type = {}
 
         for dump_dir_name, dump_dir in dump_dirs.items():
             for dump_name, dump_info in dump_dir.dumps.items():
-                canonical_re = re.search(
-                    r"(commons|wikidata)-\d+-(.*?\.(gz|bz2))", dump_name)
-
-                if not canonical_re:
-                    raise Exception(
-                        'Cannot normalize dump name "' + dump_name + '".')
-
-                canonical_name = canonical_re.group(
-                    1) + '-' + canonical_re.group(2)
+                canonical_name = self._get_canonical_name(dump_name)
                 if not canonical_name in dumps_by_type:
                     dumps_by_type[canonical_name] = {}
                 dumps_by_type[canonical_name][dump_name] = dump_info
 
         return dumps_by_type
 
+    def _get_manifest_index(self, dump_table: DumpTable) -> dict:
+        """
+        Index of the canonical dump names in each dump directory of the given DumpTable,
+        like {"20211025/": {"wikidata-all.json.gz"}}.
+        """
+        dir_type_ids = [set() for _ in dump_table.dir_names]
+        for type_id, dir_id in zip(dump_table.dump_type_ids, dump_table.dump_dir_ids):
+            dir_type_ids[dir_id].add(type_id)
+
+        return {
+            dump_dir_name: {dump_table.type_names[type_id] for type_id in type_ids}
+            for dump_dir_name, type_ids in zip(dump_table.dir_names, dir_type_ids)
+        }
+
+    def _get_dump_name(self, canonical_name, dump_dir_name) -> str:
+        project, dump_type = canonical_name.split('-', 1)
+        return project + '-' + dump_dir_name[0:8] + '-' + dump_type
+
+    def _ensure_manifest(self, manifest_index, dir_names) -> ValidatorResult:
+        """
+        Make sure each dump directory contains the dumps (by canonical name) any of the
+        previous self.manifest_history dump directories started on the same weekday
+        contained, as the dumps are generated on a weekly schedule. Dump directories are
+        only checked once a newer one was started on the same weekday, before that their
+        dumps might still be generated.
+
+        Dumps of other formats than the expected "latest" dumps are unexpected (with
+        "-BETA" dropped, as the "latest" dumps are named without it).
+
+        manifest_index is like _get_manifest_index, dir_names are all dump directories
+        (ordered by date), the ones not in manifest_index have no dumps.
+        """
+        if not self.manifest_history:
+            return ValidatorResult(True, [])
+
+        expected_formats = {latest_name[len('latest-'):] for latest_name in self.latest_expected}
+        weekdays = {dump_dir_name: datetime.strptime(dump_dir_name[0:8], '%Y%m%d').weekday()
+                    for dump_dir_name in dir_names}
+        newest_dirs = {weekday: dump_dir_name for dump_dir_name, weekday in weekdays.items()}
+        # Canonical names of the previous dump directories, per weekday
+        previous = {}
+        errors = []
+
+        for dump_dir_name in dir_names:
+            canonical_names = manifest_index.get(dump_dir_name, set())
+            recent = previous.setdefault(weekdays[dump_dir_name], [])
+
+            if dump_dir_name != newest_dirs[weekdays[dump_dir_name]]:
+                for canonical_name in sorted(set().union(*recent) - canonical_names):
+                    dump_name = self._get_dump_name(canonical_name, dump_dir_name)
+                    errors.append(ResultRecord(
+                        'Dump ' + dump_name + ' is missing.',
+                        'manifest_missing', dump=dump_name, dump_dir=dump_dir_name))
+            if expected_formats:
+                for canonical_name in sorted(canonical_names):
+                    if canonical_name.split('-', 1)[1].replace('-BETA', '') not in expected_formats:
+                        dump_name = self._get_dump_name(canonical_name, dump_dir_name)
+                        errors.append(ResultRecord(
+                            'Dump ' + dump_name + ' is unexpected.',
+                            'manifest_unexpected', dump=dump_name, dump_dir=dump_dir_name))
+
+            recent.append(canonical_names)
+            del recent[:-self.manifest_history]
+
+        return ValidatorResult(not errors, errors)
+
     def _merge_results(self, *results) -> ValidatorResult:
         valid = True
         errors = []
@@ -127,17 +304,166 @@ class DumpListingValidator():
 
         return ValidatorResult(valid, errors)
 
-    def validate_listing(self, dump_all_info) -> ValidatorResult:
+    def _validate_dump_dirs_incremental(self, dump_dirs, state: ValidationState):
+        """
+        Like _ensure_hashsum_files and _ensure_dump_sizes, but only checks dump directories
+        that changed (or whose baseline changed) since the results in state were made.
+
+        If dump_dirs is a LazyDumpDirs, dump directories whose modification stamp didn't
+        change (except for the newest one) are not even requested.
+
+        Returns a tuple of the hash sum file errors, the dump size errors and the dump
+        directories that were checked (the unreachable ones are left out, their state is
+        kept for the next run).
         """
-        Makes sure the given DumpAllInfo is valid.
+        state.use_settings({
+            'expected_size_multiplicator': self.expected_size_multiplicator,
+            # Errors are stored as ResultRecord dicts
+            'error_format': 2,
+        })
+        lazy = isinstance(dump_dirs, LazyDumpDirs)
+        dirs = dump_dirs.get_dirs() if lazy else list(dump_dirs)
+        # Forget about dump directories that are gone
+        state.dirs = {dump_dir_name: dir_state for dump_dir_name,
+                      dir_state in state.dirs.items() if dump_dir_name in dirs}
+
+        stamps = {}
+        if lazy:
+            for dump_dir_name in dirs[:-1]:
+                stamp = dump_dirs.get_stamp(dump_dir_name)
+                dir_state = state.dirs.get(dump_dir_name)
+                if stamp is not None and dir_state is not None and dir_state.get('stamp') == stamp:
+                    stamps[dump_dir_name] = stamp
+            # Request the dump directories that might have changed at once
+            dump_dirs.load([dump_dir_name for dump_dir_name in dirs
+                            if dump_dir_name not in stamps])
+
+        hashsum_errors = []
+        size_errors = []
+        checked_dirs = []
+        last_sizes = {}
+        for dump_dir_name in dirs:
+            dir_state = state.dirs.get(dump_dir_name)
+            dump_dir = None
+            if dump_dir_name not in stamps:
+                dump_dir = dump_dirs.get(dump_dir_name)
+                if dump_dir is None:
+                    # Unreachable
+                    continue
+                if dir_state is not None and dir_state['fingerprint'] != ValidationState.get_fingerprint(dump_dir):
+                    dir_state = None
+
+            if dir_state is not None:
+                baseline = {dump_type: last_sizes.get(dump_type, 0)
+                            for dump_type in dir_state['sizes']}
+                if baseline != dir_state['baseline']:
+                    dir_state = None
+                    if dump_dir is None:
+                        dump_dir = dump_dirs.get(dump_dir_name)
+                        if dump_dir is None:
+                            continue
+
+            if dir_state is None:
+                dumps_by_type = self._group_dumps_by_type(
+                    {dump_dir_name: dump_dir})
+                sizes = {}
+                for dump_type, dumps in dumps_by_type.items():
+                    for dump_info in dumps.values():
+                        sizes[dump_type] = dump_info.size
+                size_errors_dir = [ResultRecord.from_error(error) for error in self._ensure_dump_sizes(
+                    dumps_by_type, last_sizes).errors]
+                for error in size_errors_dir:
+                    error.dump_dir = dump_dir_name
+                dir_state = {
+                    'fingerprint': ValidationState.get_fingerprint(dump_dir),
+                    'stamp': dump_dirs.get_stamp(dump_dir_name) if lazy else None,
+                    'sizes': sizes,
+                    'baseline': {dump_type: last_sizes.get(dump_type, 0) for dump_type in sizes},
+                    'hashsum_errors': [ResultRecord.from_error(error).to_dict()
+                                       for error in self._ensure_hashsum_files({dump_dir_name: dump_dir}).errors],
+                    'size_errors': [error.to_dict() for error in size_errors_dir],
+                }
+                state.dirs[dump_dir_name] = dir_state
+            elif lazy:
+                dir_state['stamp'] = dump_dirs.get_stamp(dump_dir_name)
+
+            hashsum_errors += [ResultRecord.from_dict(error)
+                               for error in dir_state['hashsum_errors']]
+            size_errors += [ResultRecord.from_dict(error)
+                            for error in dir_state['size_errors']]
+            last_sizes.update(dir_state['sizes'])
+            checked_dirs.append(dump_dir_name)
+
+        return hashsum_errors, size_errors, checked_dirs
+
+    def validate_listing(self, dump_all_info, state: Optional[ValidationState] = None) -> ValidatorResult:
+        """
+        Makes sure the given DumpAllInfo is valid. Unreachable dump directories are
+        reported as errors, the other dump directories are validated without them.
+
+        If a ValidationState is given, only dump directories that changed since the last
+        run are validated (against the stored results), the state is updated accordingly.
+        With a lazy DumpAllInfo (see DumpListingReader.get_lazy_dumps_info), only the
+        dump directories that might have changed are requested then.
 
         Returns a named tumple containing a bool indicating validity (valid) and a list
         of errors (errors).
         """
-        result_hashsum_files = self._ensure_hashsum_files(
-            dump_all_info.dump_dirs)
-        result_latest = self._ensure_latest(dump_all_info.latest)
-        result_dump_sizes = self._ensure_dump_sizes(
-            self._group_dumps_by_type(dump_all_info.dump_dirs))
+        if state is not None:
+            with self.recorder.phase('validate_incremental'):
+                hashsum_errors, size_errors, checked_dirs = self._validate_dump_dirs_incremental(
+                    dump_all_info.dump_dirs, state)
+            result_manifest = ValidatorResult(True, [])
+            if self.manifest_history:
+                # The state knows the dump types of each dump directory checked, no need to request them
+                with self.recorder.phase('ensure_manifest'):
+                    manifest_index = {dump_dir_name: set(state.dirs[dump_dir_name]['sizes'])
+                                      for dump_dir_name in checked_dirs}
+                    result_manifest = self._ensure_manifest(manifest_index, checked_dirs)
+            if self.size_trend_analyzer is not None:
+                # The trend is fitted to the full history anyway
+                with self.recorder.phase('size_trend'):
+                    result_dump_sizes = self.size_trend_analyzer.analyze(
+                        self._group_dumps_by_type(dump_all_info.dump_dirs))
+            else:
+                result_dump_sizes = ValidatorResult(
+                    not size_errors, size_errors)
+            with self.recorder.phase('ensure_latest'):
+                result_latest = self._ensure_latest(dump_all_info.latest)
+            return self._merge_results(
+                self._ensure_reachable(dump_all_info.unreachable_dirs),
+                ValidatorResult(not hashsum_errors, hashsum_errors),
+                result_latest,
+                result_dump_sizes,
+                result_manifest
+            )
+
+        dump_table = dump_all_info.dump_table
+        if dump_table is None:
+            with self.recorder.phase('dump_table'):
+                dump_table = DumpTable.from_dump_dirs(dump_all_info.dump_dirs)
+
+        with self.recorder.phase('ensure_hashsum_files'):
+            result_hashsum_files = self._ensure_hashsum_files_table(dump_table)
+        with self.recorder.phase('ensure_latest'):
+            result_latest = self._ensure_latest(dump_all_info.latest)
+        if self.size_trend_analyzer is not None:
+            with self.recorder.phase('size_trend'):
+                result_dump_sizes = self.size_trend_analyzer.analyze(
+                    dump_table.get_dumps_by_type())
+        else:
+            with self.recorder.phase('ensure_dump_sizes'):
+                result_dump_sizes = self._ensure_dump_sizes_table(dump_table)
+        result_manifest = ValidatorResult(True, [])
+        if self.manifest_history:
+            with self.recorder.phase('ensure_manifest'):
+                result_manifest = self._ensure_manifest(
+                    self._get_manifest_index(dump_table), dump_table.dir_names)
 
-        return self._merge_results(result_hashsum_files, result_latest, result_dump_sizes)
+        return self._merge_results(
+            self._ensure_reachable(dump_all_info.unreachable_dirs),
+            result_hashsum_files,
+            result_latest,
+            result_dump_sizes,
+            result_manifest
+        )
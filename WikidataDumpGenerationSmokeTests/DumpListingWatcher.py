@@ -0,0 +1,160 @@
+import datetime
+from http.client import HTTPException
+import time
+from typing import Callable, Optional
+from .DumpListingReader import DumpListingReader
+from .DumpListingTypes import DumpAllInfo
+from .DumpListingValidator import ValidatorResult
+from .DumpTable import DumpTable
+from .ResultRecord import ResultRecord
+
+
+class DumpListingWatcher():
+    """
+    Long running watch mode: The main index is polled on a schedule and the dump
+    directories are kept in memory, so that a dump directory is only requested again
+    if it is new, if the main index shows that it changed, or if it is the newest one
+    (and the main index doesn't tell whether it changed).
+
+    On the weekdays dumps were generated on recently (in UTC), the main index is polled
+    every window_interval seconds, on all other days every interval seconds.
+
+    After each poll the dumps are validated, errors that were not found by the previous
+    poll are passed to on_alert right away and errors that are gone to on_resolved.
+    Errors are told apart by ResultRecord.get_key, so that an error whose values change
+    (like the age of a dump) is not reported again.
+    """
+    reader: DumpListingReader
+    validate: Callable[[DumpAllInfo], ValidatorResult]
+    on_alert: Callable[[list], None]
+    on_resolved: Optional[Callable[[list], None]]
+    interval: float
+    window_interval: float
+    window_history_days: int
+
+    def __init__(
+        self,
+        reader: DumpListingReader,
+        validate: Callable[[DumpAllInfo], ValidatorResult],
+        on_alert: Callable[[list], None],
+        on_resolved: Optional[Callable[[list], None]] = None,
+        interval: float = 3600.0,
+        window_interval: float = 300.0,
+        window_history_days: int = 28,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        validate is called with the DumpAllInfo after each poll, like
+        DumpListingValidator.validate_listing.
+
+        window_history_days is how far back (from the newest dump) the dumps are
+        considered to find the weekdays dumps are generated on.
+        """
+        self.reader = reader
+        self.validate = validate
+        self.on_alert = on_alert
+        self.on_resolved = on_resolved
+        self.interval = interval
+        self.window_interval = window_interval
+        self.window_history_days = window_history_days
+        self._clock = clock
+        self._sleep = sleep
+
+        self._dump_dirs = {}
+        self._dir_stamps = {}
+        self._dumps_info = None
+        # ResultRecord key -> error
+        self._errors = {}
+
+    def _get_changed_dirs(self, dir_stamps) -> list:
+        dirs = list(dir_stamps)
+        changed = []
+        for dir_date, dir_stamp in dir_stamps.items():
+            if dir_date not in self._dump_dirs or dir_stamp != self._dir_stamps.get(dir_date):
+                changed.append(dir_date)
+            elif dir_stamp is None and dir_date == dirs[-1]:
+                # Unknown whether it changed, but the newest dump directory might
+                changed.append(dir_date)
+
+        return changed
+
+    def poll(self) -> ValidatorResult:
+        """
+        Poll the main index once, request the changed dump directories and validate.
+        """
+        dir_stamps, latest = self.reader.source.get_main_index_stamped()
+        dirs = self.reader.get_window(dir_stamps)
+        dir_stamps = {dir_date: dir_stamps[dir_date] for dir_date in dirs}
+
+        changed = self._get_changed_dirs(dir_stamps)
+        unreachable_dirs = {}
+        for dir_date in changed:
+            # Unreachable dump directories are requested again by the next poll
+            self._dump_dirs.pop(dir_date, None)
+        if changed:
+            dump_dirs, unreachable_dirs = self.reader.get_dump_dirs(
+                changed, dirs[-1])
+            self._dump_dirs.update(dump_dirs)
+        self._dump_dirs = {dir_date: self._dump_dirs[dir_date]
+                           for dir_date in dirs if dir_date in self._dump_dirs}
+        self._dir_stamps = dir_stamps
+
+        self._dumps_info = DumpAllInfo(latest, self._dump_dirs,
+                                       DumpTable.from_dump_dirs(self._dump_dirs), unreachable_dirs)
+        result = self.validate(self._dumps_info)
+
+        errors = {ResultRecord.from_error(error).get_key(): error for error in result.errors}
+        new_errors = [error for key, error in errors.items() if key not in self._errors]
+        resolved_errors = [error for key, error in self._errors.items() if key not in errors]
+        self._errors = errors
+        if new_errors:
+            self.on_alert(new_errors)
+        if resolved_errors and self.on_resolved:
+            self.on_resolved(resolved_errors)
+
+        return result
+
+    def get_window_weekdays(self) -> set:
+        """
+        The weekdays (0 is Monday) dumps were generated on recently.
+        """
+        dump_table = self._dumps_info.dump_table if self._dumps_info is not None else None
+        if dump_table is None or not len(dump_table):
+            return set()
+
+        dump_days = dump_table.dump_days
+        min_day = max(dump_days) - self.window_history_days
+        return {datetime.date.fromordinal(day).weekday() for day in dump_days if day > min_day}
+
+    def get_interval(self) -> float:
+        """
+        Seconds to wait until the next poll.
+        """
+        weekday = datetime.datetime.fromtimestamp(self._clock(), datetime.timezone.utc).weekday()
+        if weekday in self.get_window_weekdays():
+            return self.window_interval
+
+        return self.interval
+
+    def run(self, max_polls: Optional[int] = None):
+        """
+        Poll until max_polls is reached (forever, if not given). Polls that fail (for
+        example due to network errors) are retried on schedule, the failure is reported
+        to on_alert like an error of the validation (once, until a poll succeeds).
+        """
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            try:
+                self.poll()
+            except (OSError, HTTPException, ValueError) as e:
+                reason = str(e) or e.__class__.__name__
+                error = ResultRecord('Polling the dump listing failed (' + reason + ').', 'index', actual=reason)
+                # The errors of the last successful poll are kept
+                if error.get_key() not in self._errors:
+                    self._errors[error.get_key()] = error
+                    self.on_alert([error])
+
+            polls += 1
+            if max_polls is None or polls < max_polls:
+                self._sleep(self.get_interval())
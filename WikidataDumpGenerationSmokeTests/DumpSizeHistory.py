@@ -0,0 +1,123 @@
+from contextlib import closing
+import datetime
+import sqlite3
+from typing import NamedTuple, Optional
+from .DumpListingTypes import DumpAllInfo
+from .DumpTable import DumpTable
+
+
+class DumpSizeEntry(NamedTuple):
+    date: datetime.date
+    dump_name: str
+    dump_dir: str
+    size: int
+
+
+class DumpSizeHistory():
+    """
+    Local SQLite store of the sizes of all dumps seen so far (per project), so that
+    the size history of a dump type can be queried without reading the dump listings.
+
+    Dump types are the canonical dump names without the project (like "all.json.bz2").
+    """
+    path: str
+
+    _schema = '''
+        CREATE TABLE IF NOT EXISTS dump_sizes (
+            project TEXT NOT NULL,
+            dump_type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            dump_name TEXT NOT NULL,
+            dump_dir TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (project, dump_name)
+        );
+        CREATE INDEX IF NOT EXISTS dump_sizes_type_date ON dump_sizes (project, dump_type, date);
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection, connection:
+            connection.executescript(self._schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection per call, so that the history can be used from several threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def get_dump_type(name: str) -> str:
+        """
+        The dump type of a "latest" dump name, a dump type or a canonical dump name,
+        like "latest-all.json.bz2", "all.json.bz2" or "wikidata-all.json.bz2". "-BETA" is
+        dropped, as the "latest" symlinks are named without it.
+        """
+        if name.startswith(('latest-', 'wikidata-', 'commons-')):
+            name = name.split('-', 1)[1]
+
+        return name.replace('-BETA', '')
+
+    def add(self, project: str, dump_all_info: DumpAllInfo) -> int:
+        """
+        Add (or update) the dumps of the given DumpAllInfo. Of a lazy DumpAllInfo, only the
+        dump directories that were read are added.
+
+        Returns the number of dumps added or updated.
+        """
+        # Not imported at the top, as querying doesn't need the reader (nor http.client)
+        from .DumpListingReader import LazyDumpDirs
+
+        dump_table = dump_all_info.dump_table
+        if dump_table is None:
+            dump_dirs = dump_all_info.dump_dirs
+            if isinstance(dump_dirs, LazyDumpDirs):
+                dump_dirs = dump_dirs.get_loaded()
+            dump_table = DumpTable.from_dump_dirs(dump_dirs)
+
+        dump_types = [self.get_dump_type(type_name)
+                      for type_name in dump_table.type_names]
+        rows = [(
+            project,
+            dump_types[dump_table.dump_type_ids[row]],
+            datetime.date.fromordinal(dump_table.dump_days[row]).isoformat(),
+            dump_table.dump_names[row],
+            dump_table.dir_names[dump_table.dump_dir_ids[row]],
+            dump_table.dump_sizes[row],
+        ) for row in range(len(dump_table))]
+
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO dump_sizes (project, dump_type, date, dump_name, dump_dir, size) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+        return len(rows)
+
+    def get_sizes(
+        self,
+        project: str,
+        dump_type: str,
+        since: Optional[datetime.date] = None,
+        until: Optional[datetime.date] = None
+    ) -> list:
+        """
+        The DumpSizeEntry of each dump of the given type (see get_dump_type) from since
+        to until (both inclusive), ordered by date.
+        """
+        query = 'SELECT date, dump_name, dump_dir, size FROM dump_sizes WHERE project = ? AND dump_type = ?'
+        params = [project, self.get_dump_type(dump_type)]
+        if since is not None:
+            query += ' AND date >= ?'
+            params.append(since.isoformat())
+        if until is not None:
+            query += ' AND date <= ?'
+            params.append(until.isoformat())
+        query += ' ORDER BY date, dump_name'
+
+        with closing(self._connect()) as connection:
+            return [DumpSizeEntry(datetime.date.fromisoformat(date), dump_name, dump_dir, size)
+                    for date, dump_name, dump_dir, size in connection.execute(query, params)]
+
+    def get_dump_types(self, project: str) -> list:
+        with closing(self._connect()) as connection:
+            return [dump_type for dump_type, in connection.execute(
+                'SELECT DISTINCT dump_type FROM dump_sizes WHERE project = ? ORDER BY dump_type', (project,))]
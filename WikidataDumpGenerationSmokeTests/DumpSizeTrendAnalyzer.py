@@ -0,0 +1,129 @@
+import math
+from .DumpListingValidator import ValidatorResult
+from .ResultRecord import ResultRecord
+
+
+def get_prediction_scores(xs, ys, min_history=3) -> list:
+    """
+    Compare each point to the least squares line y = slope * x + intercept fitted to
+    the points before it (at least min_history, but no less than three of them).
+
+    Returns a list with a (predicted y, score) tuple for each point (None if there are
+    too few points before it), the score being the residual divided by the standard
+    error of the prediction (the externally studentized residual). It is infinite if
+    the points before are exactly on a line.
+    """
+    min_history = max(min_history, 3)
+    scores = []
+    # Running sums of the points so far (relative to the first one, to keep them small)
+    n = 0
+    sum_x = sum_y = sum_xx = sum_xy = sum_yy = 0.0
+    for x, y in zip(xs, ys):
+        x -= xs[0]
+        y -= ys[0]
+        if n < min_history:
+            scores.append(None)
+        else:
+            mean_x = sum_x / n
+            mean_y = sum_y / n
+            var_x = sum_xx - sum_x * mean_x
+            cov_xy = sum_xy - sum_x * mean_y
+            slope = cov_xy / var_x if var_x > 0 else 0.0
+            squared_residuals = max(sum_yy - sum_y * mean_y - slope * cov_xy, 0.0)
+            variance_factor = 1 + 1 / n + ((x - mean_x) ** 2 / var_x if var_x > 0 else 0.0)
+            std = math.sqrt(squared_residuals / (n - 2) * variance_factor)
+
+            prediction = mean_y + slope * (x - mean_x)
+            residual = y - prediction
+            if std > 0:
+                score = residual / std
+            else:
+                score = math.copysign(math.inf, residual) if residual else 0.0
+            scores.append((prediction + ys[0], score))
+
+        n += 1
+        sum_x += x
+        sum_y += y
+        sum_xx += x * x
+        sum_xy += x * y
+        sum_yy += y * y
+
+    return scores
+
+
+class DumpSizeTrendAnalyzer():
+    """
+    Checks dump sizes against the growth trend of their dump type, instead of only
+    comparing each dump to the previous one.
+
+    Per canonical dump type, each dump is compared to the prediction of an exponential
+    growth model (a line through the log of the sizes over the dump dates) fitted to
+    the dumps before it. Dumps whose size deviates from the prediction by more than
+    max_z_score standard errors of the prediction (and by more than min_deviation,
+    relative) are flagged. Dumps with fewer than min_history dumps before them are
+    checked like DumpListingValidator does without a trend: They need to be at least
+    expected_size_multiplicator times as large as the previous dump.
+    """
+    min_history = 0
+    max_z_score = 0.0
+    min_deviation = 0.0
+    expected_size_multiplicator = 0.0
+
+    def __init__(self, min_history=4, max_z_score=3.0, min_deviation=0.01, expected_size_multiplicator=1.0005):
+        self.min_history = min_history
+        self.max_z_score = max_z_score
+        self.min_deviation = min_deviation
+        self.expected_size_multiplicator = expected_size_multiplicator
+
+    def _analyze_dump_type(self, dumps) -> list:
+        errors = []
+        xs = []
+        ys = []
+        names = []
+        sizes = []
+        for dump_name, dump in dumps.items():
+            if dump.size <= 0:
+                errors.append(ResultRecord('Dump ' + dump_name + ' is empty.',
+                                           'size_trend', dump=dump_name, actual=dump.size))
+                continue
+            xs.append(dump.date.toordinal())
+            ys.append(math.log(dump.size))
+            names.append(dump_name)
+            sizes.append(dump.size)
+
+        max_residual = math.log1p(self.min_deviation)
+        scores = get_prediction_scores(xs, ys, self.min_history)
+        for i, (dump_name, size, score) in enumerate(zip(names, sizes, scores)):
+            if score is None:
+                # Too little history for a trend
+                expected_size = int(sizes[i - 1] * self.expected_size_multiplicator) if i else 0
+                if size < expected_size:
+                    errors.append(ResultRecord(
+                        'Dump ' + dump_name + ' should be at least ' + str(expected_size) +
+                        ' bytes (is ' + str(size) + ' bytes).',
+                        'dump_size', dump=dump_name, expected=expected_size, actual=size
+                    ))
+                continue
+
+            prediction, z_score = score
+            if abs(z_score) > self.max_z_score and abs(ys[i] - prediction) > max_residual:
+                expected_size = int(math.exp(prediction))
+                errors.append(ResultRecord(
+                    'Dump ' + dump_name + ' deviates from the size trend (expected about ' +
+                    str(expected_size) + ' bytes, is ' +
+                    str(size) + ' bytes, z-score ' + '%.1f' % z_score + ').',
+                    'size_trend', dump=dump_name, expected=expected_size, actual=size
+                ))
+
+        return errors
+
+    def analyze(self, dumps_by_type) -> ValidatorResult:
+        """
+        Check the given dumps (as grouped by DumpListingValidator._group_dumps_by_type,
+        ordered by date) against the size trend of their dump type.
+        """
+        errors = []
+        for dumps in dumps_by_type.values():
+            errors += self._analyze_dump_type(dumps)
+
+        return ValidatorResult(not errors, errors)
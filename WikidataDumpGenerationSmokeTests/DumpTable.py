@@ -0,0 +1,94 @@
+from array import array
+import datetime
+import re
+from .DumpListingTypes import DumpInfo
+
+
+class DumpTable():
+    """
+    Compact, column oriented representation of all dumps in all dump directories.
+
+    Each dump is a row with its name, canonical type id (interned, in order of first
+    appearance), dump directory id, size (int64) and date (int32 day ordinal). Rows
+    are ordered like the dump directories (by date), a dump name only has one row.
+    """
+    _canonical_re = re.compile(r"(commons|wikidata)-\d+-(.*?\.(gz|bz2))")
+
+    def __init__(self):
+        self.dir_names = []
+        self.dir_has_md5sums = array('b')
+        self.dir_has_sha1sums = array('b')
+        self.dir_dump_counts = array('i')
+
+        self.type_names = []
+        self._type_ids = {}
+
+        self.dump_names = []
+        self._dump_rows = {}
+        self.dump_type_ids = array('i')
+        self.dump_dir_ids = array('i')
+        self.dump_sizes = array('q')
+        self.dump_days = array('i')
+
+    def __len__(self):
+        return len(self.dump_names)
+
+    def __eq__(self, other):
+        return isinstance(other, DumpTable) and self.__dict__ == other.__dict__
+
+    def _get_type_id(self, dump_name) -> int:
+        canonical_re = self._canonical_re.search(dump_name)
+        if not canonical_re:
+            raise Exception(
+                'Cannot normalize dump name "' + dump_name + '".')
+
+        canonical_name = canonical_re.group(1) + '-' + canonical_re.group(2)
+        type_id = self._type_ids.get(canonical_name)
+        if type_id is None:
+            type_id = self._type_ids[canonical_name] = len(self.type_names)
+            self.type_names.append(canonical_name)
+
+        return type_id
+
+    def add_dump_dir(self, dump_dir_name, dump_dir):
+        dir_id = len(self.dir_names)
+        self.dir_names.append(dump_dir_name)
+        self.dir_has_md5sums.append(bool(dump_dir.md5sums_file))
+        self.dir_has_sha1sums.append(bool(dump_dir.sha1sums_file))
+        self.dir_dump_counts.append(len(dump_dir.dumps))
+
+        for dump_name, dump_info in dump_dir.dumps.items():
+            row = self._dump_rows.get(dump_name)
+            if row is not None:
+                # Same dump listed again (in another dump directory), the last one wins
+                self.dump_dir_ids[row] = dir_id
+                self.dump_sizes[row] = dump_info.size
+                self.dump_days[row] = dump_info.date.toordinal()
+                continue
+
+            self._dump_rows[dump_name] = len(self.dump_names)
+            self.dump_names.append(dump_name)
+            self.dump_type_ids.append(self._get_type_id(dump_name))
+            self.dump_dir_ids.append(dir_id)
+            self.dump_sizes.append(dump_info.size)
+            self.dump_days.append(dump_info.date.toordinal())
+
+    @classmethod
+    def from_dump_dirs(cls, dump_dirs) -> 'DumpTable':
+        table = cls()
+        for dump_dir_name, dump_dir in dump_dirs.items():
+            table.add_dump_dir(dump_dir_name, dump_dir)
+
+        return table
+
+    def get_dumps_by_type(self):
+        """
+        Like DumpListingValidator._group_dumps_by_type, but without normalizing the
+        dump names again.
+        """
+        dumps_by_type = {type_name: {} for type_name in self.type_names}
+        for row in range(len(self.dump_names)):
+            dumps_by_type[self.type_names[self.dump_type_ids[row]]][self.dump_names[row]] = DumpInfo(
+                self.dump_sizes[row], datetime.datetime.fromordinal(self.dump_days[row]))
+
+        return dumps_by_type
@@ -0,0 +1,205 @@
+import datetime
+import statistics
+import time
+from typing import Callable, NamedTuple
+from .DumpListingReader import LazyDumpDirs
+from .DumpListingValidator import ValidatorResult
+from .DumpTable import DumpTable
+from .ResultRecord import ResultRecord
+
+
+class DumpDuration(NamedTuple):
+    dump_name: str
+    dump_dir: str
+    # Hours from the start of the dump directory's day (UTC) until the dump was written
+    duration: float
+
+
+def get_dump_type(dump_name: str) -> str:
+    """
+    The format of a dump, like "all.json.bz2", for both dated dump names and "latest"
+    dump names. "-BETA" is dropped, as the "latest" symlinks are named without it.
+    """
+    if dump_name.startswith('latest-'):
+        dump_type = dump_name[len('latest-'):]
+    else:
+        canonical_re = DumpTable._canonical_re.search(dump_name)
+        if not canonical_re:
+            raise Exception(
+                'Cannot normalize dump name "' + dump_name + '".')
+        dump_type = canonical_re.group(2)
+
+    return dump_type.replace('-BETA', '')
+
+
+def get_dir_start(dump_dir_name: str) -> datetime.datetime:
+    """
+    The time the generation of the dumps in the given dump directory (like "20211025/")
+    starts, at the beginning of its day.
+    """
+    return datetime.datetime.strptime(dump_dir_name[0:8], '%Y%m%d')
+
+
+class DumpTimingAnalyzer():
+    """
+    Checks how long the dumps of each format take to generate, using the timestamps of
+    the dump listings (which are in UTC, with minute precision).
+
+    The newest dump of each format is compared to the median duration of the previous
+    ones (its profile). Formats that are still being generated in a newer dump directory
+    than their last dump are flagged once they take longer than their profile allows,
+    which catches slow generations before a week is missed. "latest" dumps that still
+    point to an older dump max_latest_lag hours after a newer one was written are
+    flagged as well.
+    """
+    max_duration_ratio = 0.0
+    min_delay = 0.0
+    max_latest_lag = 0.0
+    min_history = 0
+    history_weeks = 0
+    clock: Callable[[], float]
+
+    def __init__(
+        self,
+        max_duration_ratio=1.25,
+        min_delay_hours=2.0,
+        max_latest_lag_hours=12.0,
+        min_history=3,
+        history_weeks=8,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        A generation is too slow if it takes more than max_duration_ratio times (and at
+        least min_delay_hours more than) the median of the min_history or more previous
+        durations of the format. Only the dump directories of the last history_weeks
+        weeks (up to the newest one) are taken into account.
+        """
+        self.max_duration_ratio = max_duration_ratio
+        self.min_delay = min_delay_hours
+        self.max_latest_lag = max_latest_lag_hours
+        self.min_history = min_history
+        self.history_weeks = history_weeks
+        self.clock = clock
+
+    def _get_now(self) -> datetime.datetime:
+        # Naive UTC, like the dump dates
+        return datetime.datetime.fromtimestamp(self.clock(), datetime.timezone.utc).replace(tzinfo=None)
+
+    def _get_dump_dirs(self, dump_dirs) -> dict:
+        """
+        The dump directories of the last self.history_weeks weeks, in order. Of a
+        LazyDumpDirs, only these are read (unreachable ones are left out).
+        """
+        dir_names = sorted(dump_dirs.get_dirs() if isinstance(dump_dirs, LazyDumpDirs) else dump_dirs)
+        if not dir_names:
+            return {}
+
+        oldest_start = get_dir_start(dir_names[-1]) - datetime.timedelta(weeks=self.history_weeks)
+        dir_names = [dir_name for dir_name in dir_names if get_dir_start(dir_name) >= oldest_start]
+        if isinstance(dump_dirs, LazyDumpDirs):
+            dump_dirs.load(dir_names)
+
+        return {dir_name: dump_dirs[dir_name] for dir_name in dir_names if dir_name in dump_dirs}
+
+    def get_durations(self, dump_dirs) -> dict:
+        """
+        The DumpDuration of each dump per dump type (see get_dump_type), in dump
+        directory order. Dumps without a time (only a date) are left out.
+        """
+        durations = {}
+        for dump_dir_name, dump_dir in dump_dirs.items():
+            dir_start = get_dir_start(dump_dir_name)
+            for dump_name, dump_info in dump_dir.dumps.items():
+                if dump_info.date.time() == datetime.time():
+                    continue
+                duration = (dump_info.date - dir_start).total_seconds() / 3600
+                durations.setdefault(get_dump_type(dump_name), []).append(
+                    DumpDuration(dump_name, dump_dir_name, duration))
+
+        return durations
+
+    def _get_max_duration(self, median: float) -> float:
+        return max(median * self.max_duration_ratio, median + self.min_delay)
+
+    def _analyze_durations(self, dump_dirs, durations_by_type, now: datetime.datetime) -> list:
+        errors = []
+        for dump_type, durations in durations_by_type.items():
+            newest = durations[-1]
+            if len(durations) <= self.min_history:
+                continue
+
+            median = statistics.median(duration.duration for duration in durations[:-1])
+            if newest.duration > self._get_max_duration(median):
+                errors.append(ResultRecord(
+                    'Dump ' + newest.dump_name + ' took ' + '%.1f' % newest.duration +
+                    ' hours to generate (usually ' + '%.1f' % median + ' hours).',
+                    'generation_duration', dump=newest.dump_name, dump_dir=newest.dump_dir,
+                    expected=round(median, 1), actual=round(newest.duration, 1)
+                ))
+
+            # Dump directories started on the weekdays this format is generated on,
+            # after its newest dump: It is still being generated there
+            median = statistics.median(duration.duration for duration in durations)
+            max_duration = self._get_max_duration(median)
+            weekdays = {get_dir_start(duration.dump_dir).weekday() for duration in durations}
+            for dump_dir_name in dump_dirs:
+                dir_start = get_dir_start(dump_dir_name)
+                if dump_dir_name <= newest.dump_dir or dir_start.weekday() not in weekdays:
+                    continue
+
+                elapsed = (now - dir_start).total_seconds() / 3600
+                if elapsed > max_duration:
+                    errors.append(ResultRecord(
+                        'Dump type "' + dump_type + '" is overdue in dump directory "' + dump_dir_name +
+                        '" (started ' + '%.1f' % elapsed + ' hours ago, usually takes ' + '%.1f' % median + ' hours).',
+                        'generation_overdue', dump_dir=dump_dir_name,
+                        expected=round(median, 1), actual=round(elapsed, 1)
+                    ))
+
+        return errors
+
+    def _analyze_latest(self, latest, dump_dirs, now: datetime.datetime) -> list:
+        # The newest dump of each type
+        newest_dumps = {}
+        for dump_dir in dump_dirs.values():
+            for dump_name, dump_info in dump_dir.dumps.items():
+                newest_dumps[get_dump_type(dump_name)] = (dump_name, dump_info)
+
+        errors = []
+        for latest_name, latest_info in latest.items():
+            newest = newest_dumps.get(get_dump_type(latest_name))
+            if newest is None:
+                continue
+
+            dump_name, dump_info = newest
+            if latest_info.size == dump_info.size:
+                lag = (latest_info.date - dump_info.date).total_seconds() / 3600
+                if lag > self.max_latest_lag:
+                    errors.append(ResultRecord(
+                        'Latest dump "' + latest_name + '" was updated ' + '%.1f' % lag +
+                        ' hours after ' + dump_name + ' was written.',
+                        'latest_lag', dump=latest_name, expected=self.max_latest_lag, actual=round(lag, 1)
+                    ))
+            elif latest_info.date < dump_info.date:
+                # Still points to an older dump
+                lag = (now - dump_info.date).total_seconds() / 3600
+                if lag > self.max_latest_lag:
+                    errors.append(ResultRecord(
+                        'Latest dump "' + latest_name + '" was not updated ' + '%.1f' % lag +
+                        ' hours after ' + dump_name + ' was written.',
+                        'latest_lag', dump=latest_name, expected=self.max_latest_lag, actual=round(lag, 1)
+                    ))
+
+        return errors
+
+    def analyze(self, dump_all_info) -> ValidatorResult:
+        """
+        Check the generation durations of the dumps and the "latest" dumps of the given
+        DumpAllInfo.
+        """
+        now = self._get_now()
+        dump_dirs = self._get_dump_dirs(dump_all_info.dump_dirs)
+        errors = self._analyze_durations(dump_dirs, self.get_durations(dump_dirs), now)
+        errors += self._analyze_latest(dump_all_info.latest, dump_dirs, now)
+
+        return ValidatorResult(not errors, errors)
@@ -0,0 +1,274 @@
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit
+import random
+import ssl
+import threading
+import time
+import zlib
+from typing import Generator, NamedTuple, Optional, Tuple
+
+try:
+    class HttpResponse(NamedTuple):
+        status: int
+        # Header names are lower case
+        headers: dict[str, str]
+        body: bytes
+
+    class HttpStreamingResponse(NamedTuple):
+        status: int
+        # Header names are lower case
+        headers: dict[str, str]
+        # Needs to be consumed (for the connection to be reused) or closed
+        chunks: Generator[bytes, None, None]
+except TypeError:
+    # B/C for Python < 3.9: https://docs.python.org/3.9/whatsnew/3.9.html#type-hinting-generics-in-standard-collections
+    from collections import namedtuple
+    HttpResponse = namedtuple(
+        'HttpResponse', ['status', 'headers', 'body'])  # type: ignore
+    HttpStreamingResponse = namedtuple(
+        'HttpStreamingResponse', ['status', 'headers', 'chunks'])  # type: ignore
+
+
+class HttpStatusError(OSError):
+    """
+    A request was answered with an unexpected status.
+    """
+    url: str
+    status: int
+
+    def __init__(self, url: str, status: int):
+        super().__init__('HTTP status ' + str(status) + ' for "' + url + '"')
+        self.url = url
+        self.status = status
+
+
+# Statuses that are worth retrying (rate limited or temporary server problems)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpTransport():
+    """
+    Minimal HTTP(S) client that keeps connections alive and reuses them per host.
+
+    Safe to be used from multiple threads: Each request takes an idle connection
+    to the host from the pool (or opens a new one) and returns it once done.
+
+    Requests that fail (connection errors, timeouts or statuses like 503) are retried
+    with jittered exponential backoff, up to max_retries times per request and
+    retry_budget times in total (so that an unreachable host doesn't multiply the run
+    time). A response body that fails part way through is not retried.
+    """
+    timeout: float
+    max_idle_connections_per_host: int
+    max_retries: int
+    backoff_base: float
+    backoff_max: float
+    retry_budget: Optional[int]
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        max_idle_connections_per_host: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_budget: Optional[int] = 50
+    ):
+        """
+        timeout is the per request timeout (in seconds) for connecting and for every
+        socket read.
+
+        Before the nth retry of a request, a random time of up to
+        backoff_base * 2 ** (n - 1) seconds (at most backoff_max) is waited, or as long
+        as the Retry-After header says (also at most backoff_max). retry_budget None
+        means no limit.
+        """
+        self.timeout = timeout
+        self.max_idle_connections_per_host = max_idle_connections_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = retry_budget
+        self._idle_connections = {}
+        self._lock = threading.Lock()
+        self._ssl_context = None
+        self._thread_stats = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_connection(self, scheme, netloc) -> HTTPConnection:
+        if scheme == 'https':
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return HTTPSConnection(netloc, timeout=self.timeout, context=self._ssl_context)
+        if scheme == 'http':
+            return HTTPConnection(netloc, timeout=self.timeout)
+
+        raise ValueError('Unsupported URL scheme "' + scheme + '".')
+
+    def _get_idle_connection(self, host_key) -> Optional[HTTPConnection]:
+        with self._lock:
+            idle_connections = self._idle_connections.get(host_key)
+            if idle_connections:
+                return idle_connections.pop()
+        return None
+
+    def _release_connection(self, host_key, connection: HTTPConnection):
+        with self._lock:
+            idle_connections = self._idle_connections.setdefault(host_key, [])
+            if len(idle_connections) < self.max_idle_connections_per_host:
+                idle_connections.append(connection)
+                return
+        connection.close()
+
+    def get_thread_stats(self) -> Tuple[int, int]:
+        """
+        Returns the number of requests made and the number of response body bytes
+        received (before gzip decoding) by the calling thread.
+        """
+        return getattr(self._thread_stats, 'requests', 0), getattr(self._thread_stats, 'bytes', 0)
+
+    def _take_retry(self, attempt) -> bool:
+        """
+        Whether the request may be retried (again), uses up one retry of the budget.
+        """
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            if self.retry_budget is not None:
+                if self.retry_budget <= 0:
+                    return False
+                self.retry_budget -= 1
+        return True
+
+    def _get_backoff(self, attempt, retry_after=None) -> float:
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+
+        # "Full jitter", so that concurrent requests don't retry in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, connection: HTTPConnection, path, headers):
+        connection.request('GET', path, headers=headers)
+        return connection.getresponse()
+
+    def _open(self, url, headers):
+        url_parts = urlsplit(url)
+        host_key = (url_parts.scheme, url_parts.netloc)
+        path = url_parts.path or '/'
+        if url_parts.query:
+            path += '?' + url_parts.query
+
+        request_headers = {'Accept-Encoding': 'gzip'}
+        request_headers.update(headers or {})
+        self._thread_stats.requests = getattr(
+            self._thread_stats, 'requests', 0) + 1
+
+        connection = self._get_idle_connection(host_key)
+        try:
+            if connection is None:
+                connection = self._new_connection(*host_key)
+                response = self._send(connection, path, request_headers)
+            else:
+                try:
+                    response = self._send(connection, path, request_headers)
+                except (HTTPException, ConnectionError):
+                    # The server closed the idle keep-alive connection, retry once on a new one
+                    connection.close()
+                    connection = self._new_connection(*host_key)
+                    response = self._send(connection, path, request_headers)
+        except BaseException:
+            if connection is not None:
+                connection.close()
+            raise
+
+        return host_key, connection, response
+
+    def _iter_body(self, host_key, connection: HTTPConnection, response, gzipped, chunk_size):
+        done = False
+        try:
+            # Primed by stream(), so that closing the generator always runs the finally block
+            yield b''
+            decompressor = zlib.decompressobj(
+                16 + zlib.MAX_WBITS) if gzipped else None
+            while True:
+                chunk = response.read1(chunk_size)
+                if not chunk:
+                    # Make sure the response is marked as closed, for the connection to be reused
+                    response.read()
+                    break
+                self._thread_stats.bytes = getattr(
+                    self._thread_stats, 'bytes', 0) + len(chunk)
+                if decompressor:
+                    chunk = decompressor.decompress(chunk)
+                if chunk:
+                    yield chunk
+            if decompressor:
+                chunk = decompressor.flush()
+                if chunk:
+                    yield chunk
+            done = True
+        finally:
+            if done and not response.will_close:
+                self._release_connection(host_key, connection)
+            else:
+                # Not fully read (or not reusable), the connection is unusable
+                connection.close()
+
+    def stream(self, url: str, headers: Optional[dict] = None, chunk_size: int = 65536) -> HttpStreamingResponse:
+        """
+        GET the given URL (retrying as described above), without reading the response
+        body upfront. The body chunks are transparently gzip decoded.
+        """
+        attempt = 0
+        while True:
+            try:
+                host_key, connection, response = self._open(url, headers)
+            except (HTTPException, OSError):
+                if not self._take_retry(attempt):
+                    raise
+                time.sleep(self._get_backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status in RETRY_STATUSES and self._take_retry(attempt):
+                # Don't bother reading the error page
+                connection.close()
+                time.sleep(self._get_backoff(
+                    attempt, response.getheader('Retry-After')))
+                attempt += 1
+                continue
+            break
+
+        response_headers = {name.lower(): value for name,
+                            value in response.getheaders()}
+        gzipped = response_headers.get('content-encoding') == 'gzip'
+        chunks = self._iter_body(
+            host_key, connection, response, gzipped, chunk_size)
+        next(chunks)
+
+        return HttpStreamingResponse(response.status, response_headers, chunks)
+
+    def request(self, url: str, headers: Optional[dict] = None) -> HttpResponse:
+        """
+        GET the given URL. The response body is transparently gzip decoded.
+        """
+        response = self.stream(url, headers)
+
+        return HttpResponse(response.status, response.headers, b''.join(response.chunks))
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle_connections = self._idle_connections
+            self._idle_connections = {}
+
+        for connections in idle_connections.values():
+            for connection in connections:
+                connection.close()
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+from http.client import HTTPException
+from typing import NamedTuple, Optional
+from .DumpListingReader import DumpListingReader
+from .DumpListingTypes import DumpAllInfo
+from .ResultRecord import ResultRecord
+
+try:
+    class MirrorComparison(NamedTuple):
+        valid: bool
+        errors: list[str]
+        # Newest dump directory of the reference the mirror has all dumps of (if any)
+        synced_dir: Optional[str]
+        # Days between the reference's newest dump directory and synced_dir
+        sync_lag: Optional[int]
+except TypeError:
+    # B/C for Python < 3.9: https://docs.python.org/3.9/whatsnew/3.9.html#type-hinting-generics-in-standard-collections
+    from collections import namedtuple
+    MirrorComparison = namedtuple(
+        'MirrorComparison', ['valid', 'errors', 'synced_dir', 'sync_lag'])  # type: ignore
+
+
+def _get_dir_day(dump_dir_name: str) -> int:
+    return datetime.datetime.strptime(dump_dir_name[0:8], '%Y%m%d').toordinal()
+
+
+class MirrorComparator():
+    """
+    Compares the dump listings of mirrors with the ones of a reference (usually
+    dumps.wikimedia.org): All listings are read concurrently and each mirror's
+    DumpAllInfo is diffed with the reference's one.
+
+    Mirrors only need to keep a part of the history: Dump directories older than the
+    oldest one on a mirror are not missing, dump directories newer than the newest
+    one on a mirror (and differences in it, as it might still be syncing) are not
+    synced yet (see MirrorComparison.sync_lag).
+    """
+    reference: DumpListingReader
+    mirrors: dict
+    max_sync_lag: int
+
+    def __init__(self, reference: DumpListingReader, mirrors: dict, max_sync_lag: int = 7):
+        """
+        mirrors maps the mirror names to their DumpListingReader.
+
+        Mirrors that are more than max_sync_lag days behind the reference are reported.
+        """
+        self.reference = reference
+        self.mirrors = mirrors
+        self.max_sync_lag = max_sync_lag
+
+    def compare(self) -> dict:
+        """
+        Read the reference and all mirrors concurrently and compare them.
+
+        Returns a dict of the mirror names to their MirrorComparison. Errors reading the
+        reference's main index are raised, as nothing can be compared without it.
+        """
+        def get_dumps_info(reader):
+            try:
+                return reader.get_dumps_info()
+            except (OSError, HTTPException) as e:
+                # Why the mirror is unreachable
+                return str(e) or e.__class__.__name__
+
+        readers = [self.reference] + list(self.mirrors.values())
+        with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+            reference_future = executor.submit(self.reference.get_dumps_info)
+            mirror_results = list(executor.map(get_dumps_info, readers[1:]))
+            reference_info = reference_future.result()
+
+        comparisons = {}
+        for mirror_name, mirror_info in zip(self.mirrors, mirror_results):
+            if isinstance(mirror_info, str):
+                comparisons[mirror_name] = MirrorComparison(False, [ResultRecord(
+                    'Main index is unreachable (' + mirror_info + ').', 'reachable', actual=mirror_info)], None, None)
+                continue
+
+            comparisons[mirror_name] = self.compare_dumps_info(
+                reference_info, mirror_info)
+
+        return comparisons
+
+    def compare_dumps_info(self, reference_info: DumpAllInfo, mirror_info: DumpAllInfo) -> MirrorComparison:
+        """
+        Diff a mirror's DumpAllInfo with the reference's one.
+        """
+        errors = []
+        mirror_unreachable_dirs = mirror_info.unreachable_dirs or {}
+        for dump_dir_name, reason in mirror_unreachable_dirs.items():
+            errors.append(ResultRecord(
+                'Dump directory "' + dump_dir_name +
+                '" is unreachable (' + reason + ').',
+                'reachable', dump_dir=dump_dir_name, actual=reason))
+
+        mirror_dirs = list(mirror_info.dump_dirs) + list(mirror_unreachable_dirs)
+        oldest_mirror_dir = min(mirror_dirs) if mirror_dirs else None
+        newest_mirror_dir = max(mirror_dirs) if mirror_dirs else None
+
+        synced_dir = None
+        newest_dir = None
+        for dump_dir_name, dump_dir in reference_info.dump_dirs.items():
+            if not dump_dir.dumps:
+                # Not started yet (or no dumps on that day)
+                continue
+            newest_dir = dump_dir_name
+            if dump_dir_name in mirror_unreachable_dirs:
+                continue
+
+            mirror_dump_dir = mirror_info.dump_dirs.get(dump_dir_name)
+            if mirror_dump_dir is None:
+                if (oldest_mirror_dir is not None and newest_mirror_dir is not None and
+                        oldest_mirror_dir < dump_dir_name < newest_mirror_dir):
+                    errors.append(ResultRecord(
+                        'Dump directory "' + dump_dir_name + '" is missing.',
+                        'mirror_dir', dump_dir=dump_dir_name))
+                continue
+
+            dump_errors = self._compare_dumps(
+                dump_dir_name, dump_dir.dumps, mirror_dump_dir.dumps)
+            if not dump_errors:
+                synced_dir = dump_dir_name
+            elif dump_dir_name != newest_mirror_dir:
+                # The newest dump directory might still be syncing
+                errors += dump_errors
+
+        sync_lag = None
+        if synced_dir is not None and newest_dir is not None:
+            sync_lag = _get_dir_day(newest_dir) - _get_dir_day(synced_dir)
+            if sync_lag > self.max_sync_lag:
+                errors.append(ResultRecord(
+                    'Mirror is ' + str(sync_lag) + ' days behind (last synced dump directory is "' +
+                    synced_dir + '", newest is "' + newest_dir + '").',
+                    'mirror_sync_lag', dump_dir=synced_dir, expected=self.max_sync_lag, actual=sync_lag))
+        elif newest_dir is not None:
+            errors.append(ResultRecord(
+                'Mirror has none of the dump directories completely.',
+                'mirror_sync_lag', expected=self.max_sync_lag))
+
+        return MirrorComparison(not errors, errors, synced_dir, sync_lag)
+
+    def _compare_dumps(self, dump_dir_name, reference_dumps, mirror_dumps) -> list:
+        """
+        Join the dumps of a dump directory on their names: Dumps missing on the
+        mirror and dumps with a different size.
+        """
+        errors = []
+        for dump_name, dump_info in reference_dumps.items():
+            mirror_dump_info = mirror_dumps.get(dump_name)
+            if mirror_dump_info is None:
+                errors.append(ResultRecord(
+                    'Dump ' + dump_name + ' is missing.',
+                    'mirror_dump', dump=dump_name, dump_dir=dump_dir_name))
+            elif mirror_dump_info.size != dump_info.size:
+                errors.append(ResultRecord(
+                    'Dump ' + dump_name + ' should be ' + str(dump_info.size) +
+                    ' bytes (is ' + str(mirror_dump_info.size) + ' bytes).',
+                    'mirror_dump_size', dump=dump_name, dump_dir=dump_dir_name,
+                    expected=dump_info.size, actual=mirror_dump_info.size))
+
+        return errors
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from typing import ContextManager, NamedTuple, Optional
+from .HttpTransport import HttpTransport
+from .PhaseRecorder import PhaseRecorder
+
+
+class PhaseEvent(NamedTuple):
+    project: str
+    phase: str
+    thread_id: int
+    # time.perf_counter() at the start of the phase
+    start: float
+    wall_time: float
+    # CPU time of the thread the phase ran in
+    cpu_time: float
+    requests: int
+    # Response body bytes received (before gzip decoding)
+    received_bytes: int
+
+
+class _ProfiledPhase():
+    def __init__(self, profiler: 'PhaseProfiler', project: str, name: str):
+        self._profiler = profiler
+        self._project = project
+        self._name = name
+
+    def __enter__(self):
+        transport = self._profiler.transport
+        self._requests, self._received_bytes = transport.get_thread_stats() if transport else (0, 0)
+        self._cpu_start = time.thread_time()
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        wall_time = time.perf_counter() - self._start
+        cpu_time = time.thread_time() - self._cpu_start
+        transport = self._profiler.transport
+        requests, received_bytes = transport.get_thread_stats() if transport else (0, 0)
+
+        self._profiler.add_event(PhaseEvent(
+            self._project,
+            self._name,
+            threading.get_ident(),
+            self._start,
+            wall_time,
+            cpu_time,
+            requests - self._requests,
+            received_bytes - self._received_bytes
+        ))
+
+
+class _ProfilerPhaseRecorder(PhaseRecorder):
+    def __init__(self, profiler: 'PhaseProfiler', project: str):
+        self._profiler = profiler
+        self._project = project
+
+    def phase(self, name: str) -> ContextManager:
+        return _ProfiledPhase(self._profiler, self._project, name)
+
+
+class PhaseProfiler():
+    """
+    Records the wall time, CPU time, requests and received bytes of every phase (see
+    PhaseRecorder). The requests and bytes are taken from the given HttpTransport, for
+    the thread the phase runs in.
+
+    The events can be summarized per phase (format_table) or be written as Chrome trace
+    file (write_chrome_trace), which can be opened in chrome://tracing or Perfetto.
+    """
+    transport: Optional[HttpTransport]
+    events: list
+
+    def __init__(self, transport: Optional[HttpTransport] = None):
+        self.transport = transport
+        self.events = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def get_phase_recorder(self, project: str) -> PhaseRecorder:
+        return _ProfilerPhaseRecorder(self, project)
+
+    def add_event(self, event: PhaseEvent):
+        with self._lock:
+            self.events.append(event)
+
+    def get_summary(self) -> dict:
+        """
+        Returns a dict of (project, phase) -> (count, wall time, max wall time, CPU time,
+        requests, received bytes), ordered by when each phase was first entered.
+        """
+        summary = {}
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event.start)
+        for event in events:
+            count, wall_time, max_wall_time, cpu_time, requests, received_bytes = summary.get(
+                (event.project, event.phase), (0, 0.0, 0.0, 0.0, 0, 0))
+            summary[(event.project, event.phase)] = (
+                count + 1,
+                wall_time + event.wall_time,
+                max(max_wall_time, event.wall_time),
+                cpu_time + event.cpu_time,
+                requests + event.requests,
+                received_bytes + event.received_bytes
+            )
+
+        return summary
+
+    def format_table(self) -> str:
+        """
+        Per phase timing table. Note that the wall time of concurrent phases (like
+        requesting the dump directories) adds up to more than the time that passed.
+        """
+        header = ('Project', 'Phase', 'Count', 'Wall (s)', 'Max wall (s)', 'CPU (s)', 'Requests', 'Bytes')
+        rows: list = [header]
+        for (project, phase), (count, wall_time, max_wall_time, cpu_time, requests, received_bytes) in self.get_summary().items():
+            rows.append((project, phase, str(count), '%.3f' % wall_time, '%.3f' % max_wall_time,
+                        '%.3f' % cpu_time, str(requests), str(received_bytes)))
+
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        lines = []
+        for row in rows:
+            # Left align the names, right align the numbers
+            lines.append('  '.join(value.ljust(width) if i < 2 else value.rjust(width)
+                                   for i, (value, width) in enumerate(zip(row, widths))).rstrip())
+
+        return '\n'.join(lines)
+
+    def get_chrome_trace(self) -> dict:
+        """
+        Returns the events in the Chrome trace event format (complete events, one
+        process per project).
+        """
+        with self._lock:
+            events = list(self.events)
+
+        project_ids = {}
+        trace_events = []
+        for event in events:
+            if event.project not in project_ids:
+                project_ids[event.project] = len(project_ids) + 1
+                trace_events.append({
+                    'name': 'process_name',
+                    'ph': 'M',
+                    'pid': project_ids[event.project],
+                    'args': {'name': event.project},
+                })
+            trace_events.append({
+                'name': event.phase,
+                'cat': 'phase',
+                'ph': 'X',
+                'ts': (event.start - self._start) * 1000000,
+                'dur': event.wall_time * 1000000,
+                'pid': project_ids[event.project],
+                'tid': event.thread_id,
+                'args': {
+                    'cpu_time': event.cpu_time,
+                    'requests': event.requests,
+                    'received_bytes': event.received_bytes,
+                },
+            })
+
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w', encoding='UTF-8') as f:
+            json.dump(self.get_chrome_trace(), f)
@@ -0,0 +1,38 @@
+from contextlib import ExitStack, nullcontext
+from typing import ContextManager
+
+_NULL_CONTEXT = nullcontext()
+
+
+class PhaseRecorder():
+    """
+    Hook to instrument the phases of reading and validating the dump listings, like
+    requesting the main index, requesting a dump directory or one of the checks of
+    DumpListingValidator.
+
+    This records nothing, subclasses override phase. Phases can be entered from several
+    threads at once (dump directories are requested concurrently).
+    """
+
+    def phase(self, name: str) -> ContextManager:
+        """
+        Returns a context manager wrapping the phase with the given name.
+        """
+        return _NULL_CONTEXT
+
+
+class MultiPhaseRecorder(PhaseRecorder):
+    """
+    Passes the phases on to all of the given recorders.
+    """
+    recorders: list
+
+    def __init__(self, recorders: list):
+        self.recorders = recorders
+
+    def phase(self, name: str) -> ContextManager:
+        stack = ExitStack()
+        for recorder in self.recorders:
+            stack.enter_context(recorder.phase(name))
+
+        return stack
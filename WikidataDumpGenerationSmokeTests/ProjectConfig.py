@@ -0,0 +1,81 @@
+import json
+from typing import NamedTuple
+
+try:
+    class ProjectConfig(NamedTuple):
+        name: str
+        main_index_url: str
+        latest_expected: list[str]
+except TypeError:
+    # B/C for Python < 3.9: https://docs.python.org/3.9/whatsnew/3.9.html#type-hinting-generics-in-standard-collections
+    from collections import namedtuple
+    ProjectConfig = namedtuple(
+        'ProjectConfig', ['name', 'main_index_url', 'latest_expected'])  # type: ignore
+
+DEFAULT_PROJECTS = {
+    'wikidata': ProjectConfig(
+        'wikidata',
+        'https://dumps.wikimedia.org/wikidatawiki/entities/',
+        [
+            "latest-all.json.bz2",
+            "latest-all.json.gz",
+            "latest-all.nt.bz2",
+            "latest-all.nt.gz",
+            "latest-all.ttl.bz2",
+            "latest-all.ttl.gz",
+            "latest-lexemes.json.bz2",
+            "latest-lexemes.json.gz",
+            "latest-lexemes.nt.bz2",
+            "latest-lexemes.nt.gz",
+            "latest-lexemes.ttl.bz2",
+            "latest-lexemes.ttl.gz",
+            "latest-truthy.nt.bz2",
+            "latest-truthy.nt.gz"
+        ]
+    ),
+    'commons': ProjectConfig(
+        'commons',
+        'https://dumps.wikimedia.org/commonswiki/entities/',
+        [
+            "latest-mediainfo.json.bz2",
+            "latest-mediainfo.json.gz",
+            "latest-mediainfo.nt.bz2",
+            "latest-mediainfo.nt.gz",
+            "latest-mediainfo.ttl.bz2",
+            "latest-mediainfo.ttl.gz"
+        ]
+    ),
+}
+
+
+def load_project_configs(path: str) -> list:
+    """
+    Load the projects to test from a JSON file like:
+
+        {"projects": [
+            {"name": "wikidata"},
+            {"name": "wikidata-mirror", "main_index_url": "https://...", "latest_expected": ["latest-all.json.gz"]}
+        ]}
+
+    main_index_url and latest_expected default to the ones of the DEFAULT_PROJECTS
+    project with the same name. Project names need to be unique.
+    """
+    with open(path, encoding='UTF-8') as f:
+        data = json.load(f)
+
+    projects = []
+    for project in data['projects']:
+        name = project['name']
+        if any(other.name == name for other in projects):
+            raise ValueError('Project "' + name + '" is configured more than once.')
+        default = DEFAULT_PROJECTS.get(name)
+        if default is None and 'main_index_url' not in project:
+            raise ValueError('Project "' + name + '" needs a main_index_url.')
+
+        projects.append(ProjectConfig(
+            name,
+            project.get('main_index_url', default.main_index_url if default else ''),
+            project.get('latest_expected', default.latest_expected if default else [])
+        ))
+
+    return projects
@@ -0,0 +1,133 @@
+import json
+from typing import Optional
+
+
+class ResultRecord(str):
+    """
+    A validation error: The error message (so that it can be used like the plain error
+    strings in ValidatorResult.errors) with the structured details of the problem.
+
+    check identifies the check that failed (like "dump_size"), dump and dump_dir what it
+    failed for (if applicable), expected and actual are the values compared (if any).
+    """
+    check: str
+    severity: str
+    dump: Optional[str]
+    dump_dir: Optional[str]
+    expected: object
+    actual: object
+
+    def __new__(
+        cls,
+        message: str,
+        check: str,
+        dump: Optional[str] = None,
+        dump_dir: Optional[str] = None,
+        expected: object = None,
+        actual: object = None,
+        severity: str = 'error'
+    ):
+        record = super().__new__(cls, message)
+        record.check = check
+        record.severity = severity
+        record.dump = dump
+        record.dump_dir = dump_dir
+        record.expected = expected
+        record.actual = actual
+        return record
+
+    def __reduce__(self):
+        return (ResultRecord.from_dict, (self.to_dict(),))
+
+    @classmethod
+    def from_error(cls, error: str) -> 'ResultRecord':
+        """
+        Get the ResultRecord for an error from ValidatorResult.errors, which might be a
+        plain string.
+        """
+        if isinstance(error, ResultRecord):
+            return error
+        return cls(error, 'unknown')
+
+    def get_key(self) -> str:
+        """
+        Identifies the problem (but not its current values), to deduplicate alerts
+        over several runs. Problems not about a specific dump (directory) are identified
+        by their message.
+        """
+        if self.dump is None and self.dump_dir is None:
+            return self.check + '::' + str(self)
+        return self.check + ':' + (self.dump_dir or '') + ':' + (self.dump or '')
+
+    def to_dict(self) -> dict:
+        return {
+            'check': self.check,
+            'severity': self.severity,
+            'dump': self.dump,
+            'dump_dir': self.dump_dir,
+            'expected': self.expected,
+            'actual': self.actual,
+            'message': str(self),
+        }
+
+    @classmethod
+    def from_dict(cls, record: dict) -> 'ResultRecord':
+        return cls(
+            record['message'],
+            record['check'],
+            record['dump'],
+            record['dump_dir'],
+            record['expected'],
+            record['actual'],
+            record['severity']
+        )
+
+
+def format_json_lines(project: str, errors, **fields) -> str:
+    """
+    One JSON object per error (see ResultRecord.to_dict), with the project, the key (see
+    ResultRecord.get_key) and the given additional fields.
+    """
+    lines = []
+    for error in errors:
+        record = ResultRecord.from_error(error)
+        line = {'project': project, 'key': record.get_key()}
+        line.update(fields)
+        line.update(record.to_dict())
+        lines.append(json.dumps(line) + '\n')
+
+    return ''.join(lines)
+
+
+def format_junit_xml(results) -> str:
+    """
+    JUnit XML report for the given list of (project, ValidatorResult): A test suite per
+    project with a failed test case per error, or a single passed test case.
+    """
+    # Only needed for this output format
+    from xml.etree import ElementTree
+
+    test_suites = ElementTree.Element('testsuites')
+    for project, result in results:
+        test_suite = ElementTree.SubElement(test_suites, 'testsuite', {
+            'name': project,
+            'tests': str(max(1, len(result.errors))),
+            'failures': str(len(result.errors)),
+        })
+        if not result.errors:
+            ElementTree.SubElement(test_suite, 'testcase', {
+                'classname': project, 'name': 'valid'})
+        for error in result.errors:
+            record = ResultRecord.from_error(error)
+            test_case = ElementTree.SubElement(test_suite, 'testcase', {
+                'classname': project + '.' + record.check,
+                'name': record.dump or record.dump_dir or record.check,
+            })
+            failure = ElementTree.SubElement(test_case, 'failure', {
+                'message': str(record),
+                'type': record.severity,
+            })
+            failure.text = json.dumps(record.to_dict(), indent=2)
+
+    # tostring only has xml_declaration as of Python 3.8
+    return '<?xml version="1.0" encoding="utf-8"?>\n' + ElementTree.tostring(test_suites, encoding='unicode') + '\n'
@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+
+class ValidationState():
+    """
+    Validation results from previous runs, persisted as JSON file.
+
+    Per dump directory this holds a fingerprint of its listing (and its modification
+    stamp from the main index, if known), the size of each
+    canonical dump type in it, the sizes it was compared against (baseline) and the
+    resulting errors.
+    """
+    path: str
+    settings: dict
+    dirs: dict
+
+    def __init__(self, path: str):
+        self.path = path
+        self.settings = {}
+        self.dirs = {}
+
+        try:
+            with open(path, encoding='UTF-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # Corrupt state, start over
+            return
+
+        self.settings = data.get('settings', {})
+        self.dirs = data.get('dirs', {})
+
+    @staticmethod
+    def get_fingerprint(dump_dir) -> list:
+        return [
+            sorted([dump_name, dump_info.size, dump_info.date.isoformat()]
+                   for dump_name, dump_info in dump_dir.dumps.items()),
+            dump_dir.md5sums_file,
+            dump_dir.sha1sums_file,
+        ]
+
+    def use_settings(self, settings: dict):
+        """
+        Forget all results if they were made with different (validator) settings.
+        """
+        if settings != self.settings:
+            self.settings = settings
+            self.dirs = {}
+
+    def save(self):
+        data = {'settings': self.settings, 'dirs': self.dirs}
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='UTF-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
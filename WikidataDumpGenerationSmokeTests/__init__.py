@@ -1,2 +1,69 @@
-from .DumpListingReader import DumpListingReader
-from .DumpListingValidator import DumpListingValidator
+from importlib import import_module
+from types import ModuleType
+
+# Like typing.TYPE_CHECKING, without importing typing (which takes a while)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .DumpDirCache import DumpDirCache
+    from .DumpListingReader import DumpListingReader
+    from .DumpListingSource import DumpListingSource, HtmlSnapshotSource, HttpIndexSource, LocalDirectorySource, get_dump_listing_source
+    from .DumpListingValidator import DumpListingValidator
+    from .DumpListingWatcher import DumpListingWatcher
+    from .HttpTransport import HttpStatusError, HttpTransport
+    from .MirrorComparator import MirrorComparator
+    from .ValidationState import ValidationState
+
+# Exported name -> module, the modules are only imported when the name is first used
+# (importing all of them, and http.client with them, slows down the CLI's start)
+_EXPORTS = {
+    'DumpDirCache': '.DumpDirCache',
+    'DumpListingReader': '.DumpListingReader',
+    'DumpListingSource': '.DumpListingSource',
+    'HtmlSnapshotSource': '.DumpListingSource',
+    'HttpIndexSource': '.DumpListingSource',
+    'LocalDirectorySource': '.DumpListingSource',
+    'get_dump_listing_source': '.DumpListingSource',
+    'DumpListingValidator': '.DumpListingValidator',
+    'DumpListingWatcher': '.DumpListingWatcher',
+    'HttpStatusError': '.HttpTransport',
+    'HttpTransport': '.HttpTransport',
+    'MirrorComparator': '.MirrorComparator',
+    'ValidationState': '.ValidationState',
+}
+
+# The names of _EXPORTS, as a literal so that type checkers know them
+__all__ = [
+    'DumpDirCache',
+    'DumpListingReader',
+    'DumpListingSource',
+    'HtmlSnapshotSource',
+    'HttpIndexSource',
+    'LocalDirectorySource',
+    'get_dump_listing_source',
+    'DumpListingValidator',
+    'DumpListingWatcher',
+    'HttpStatusError',
+    'HttpTransport',
+    'MirrorComparator',
+    'ValidationState',
+]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    for export in _EXPORTS:
+        # Importing a submodule binds it on the package, most of them are named like the
+        # class they define, which is what is exported (and looked up again)
+        if isinstance(globals().get(export), ModuleType):
+            del globals()[export]
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
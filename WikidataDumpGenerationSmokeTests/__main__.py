@@ -0,0 +1,650 @@
+# Only what's needed for parsing the arguments is imported right away, so that
+# --help and argument errors don't need to wait for the rest
+import argparse
+import sys
+
+
+def iso_date(value: str):
+    import datetime
+
+    return datetime.date.fromisoformat(value)
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be at least 1')
+
+    return number
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog = "wikidata-dump-generation-smoke-tests",
+        description = "Smoke tests for Wikidata and Wikimedia Commons Wikibase entity dump generation. " +
+            "These tests ensure that all latest-* dumps are recent, the dump sizes look sane and hash sum files are correctly generated.",
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        '--max-last-age',
+        help = 'Max age that "latest" dumps may have (days).',
+        action = 'store',
+        dest = 'max_latest_age',
+        type = int,
+        default = 10
+    )
+    parser.add_argument(
+        '--expected-size-multiplicator',
+        help = 'Multiplicator for the size increase from one dump to the next.',
+        action = 'store',
+        dest = 'expected_size_multiplicator',
+        type = float,
+        default = 1.00025
+    )
+    parser.add_argument(
+        '--size-trend',
+        help = 'Check dump sizes against the growth trend of the previous dumps of their type (flagging outliers), ' +
+            'instead of using --expected-size-multiplicator (which is still used for dumps with too few previous dumps).',
+        action = 'store_true',
+        dest = 'size_trend'
+    )
+    parser.add_argument(
+        '--size-trend-max-z-score',
+        help = 'Max deviation from the growth trend (in standard errors of its prediction) for --size-trend.',
+        action = 'store',
+        dest = 'size_trend_max_z_score',
+        type = float,
+        default = 3.0
+    )
+    parser.add_argument(
+        '--check-manifest',
+        help = 'Check that each dump directory contains the dumps the previous ones started on the same weekday contained ' +
+            '(see --manifest-history) and no dumps of other formats than the expected "latest" dumps.',
+        action = 'store_true',
+        dest = 'check_manifest'
+    )
+    parser.add_argument(
+        '--manifest-history',
+        help = 'Number of previous dump directories started on the same weekday to expect the dumps of (for --check-manifest).',
+        action = 'store',
+        dest = 'manifest_history',
+        type = positive_int,
+        default = 2
+    )
+    parser.add_argument(
+        '--check-timing',
+        help = 'Check how long the newest dump of each format took (or is taking) to generate, compared to the previous ones, ' +
+            'and whether the "latest" dumps were updated in time.',
+        action = 'store_true',
+        dest = 'check_timing'
+    )
+    parser.add_argument(
+        '--max-duration-ratio',
+        help = 'Max generation duration of a dump, relative to the median of its format (for --check-timing).',
+        action = 'store',
+        dest = 'max_duration_ratio',
+        type = float,
+        default = 1.25
+    )
+    parser.add_argument(
+        '--max-latest-lag',
+        help = 'Max time after a dump was written until its "latest" dump points to it (hours, for --check-timing).',
+        action = 'store',
+        dest = 'max_latest_lag',
+        type = float,
+        default = 12.0
+    )
+    parser.add_argument(
+        '--max-concurrent-requests',
+        help = 'Max number of dump directories to request concurrently.',
+        action = 'store',
+        dest = 'max_concurrent_requests',
+        type = positive_int,
+        default = 4
+    )
+    parser.add_argument(
+        '--timeout',
+        help = 'Timeout for each HTTP request (seconds).',
+        action = 'store',
+        dest = 'timeout',
+        type = float,
+        default = 60.0
+    )
+    parser.add_argument(
+        '--max-retries',
+        help = 'Max number of retries for each failed HTTP request (with exponential backoff).',
+        action = 'store',
+        dest = 'max_retries',
+        type = int,
+        default = 3
+    )
+    parser.add_argument(
+        '--retry-budget',
+        help = 'Max number of retries of failed HTTP requests in total.',
+        action = 'store',
+        dest = 'retry_budget',
+        type = int,
+        default = 50
+    )
+    parser.add_argument(
+        '--last-dirs',
+        help = 'Only read (and validate) the given number of newest dump directories.',
+        action = 'store',
+        dest = 'last_dirs',
+        type = positive_int,
+        default = None
+    )
+    parser.add_argument(
+        '--since',
+        help = 'Only read (and validate) the dump directories from this date (YYYY-MM-DD) on.',
+        action = 'store',
+        dest = 'since_date',
+        type = iso_date,
+        default = None
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help = 'Directory to cache dump directory listings in (no caching if not given).',
+        action = 'store',
+        dest = 'cache_dir',
+        default = None
+    )
+    parser.add_argument(
+        '--source',
+        help = 'Read the dumps from this URL instead of dumps.wikimedia.org: Either a directory index URL (http(s)://), ' +
+            'a local dumps directory (file:///) or a saved main index HTML listing (file:///.../index.html).',
+        action = 'store',
+        dest = 'source',
+        default = None
+    )
+    parser.add_argument(
+        '--state-file',
+        help = 'File to keep validation results in, so that only new or changed dump directories need to be validated.',
+        action = 'store',
+        dest = 'state_file',
+        default = None
+    )
+    parser.add_argument(
+        '--verify-checksums',
+        help = 'Download the hash sum files and make sure they list every dump.',
+        action = 'store_true',
+        dest = 'verify_checksums'
+    )
+    parser.add_argument(
+        '--hash-dump-files',
+        help = 'Also hash all dump files and compare them to the md5 sums (implies --verify-checksums, needs a local --source).',
+        action = 'store_true',
+        dest = 'hash_dump_files'
+    )
+    parser.add_argument(
+        '--hash-state-file',
+        help = 'File to keep dump file hashes in, so that an interrupted --hash-dump-files run can be resumed (suffixed with the project name when testing several projects).',
+        action = 'store',
+        dest = 'hash_state_file',
+        default = None
+    )
+    parser.add_argument(
+        '--probe-latest',
+        help = 'Check the gzip/bzip2 structure of the "latest" dumps (using HTTP range requests for their first and last bytes).',
+        action = 'store_true',
+        dest = 'probe_latest'
+    )
+    parser.add_argument(
+        '--config',
+        help = 'JSON file with (additional) projects to test, see WikidataDumpGenerationSmokeTests.ProjectConfig.',
+        action = 'store',
+        dest = 'config',
+        default = None
+    )
+    parser.add_argument(
+        '--watch',
+        help = 'Keep running: Poll the dump listings and print new errors as soon as they are found.',
+        action = 'store_true',
+        dest = 'watch'
+    )
+    parser.add_argument(
+        '--watch-interval',
+        help = 'Seconds between polls in --watch mode.',
+        action = 'store',
+        dest = 'watch_interval',
+        type = float,
+        default = 3600.0
+    )
+    parser.add_argument(
+        '--watch-window-interval',
+        help = 'Seconds between polls in --watch mode, on the weekdays dumps are usually generated on.',
+        action = 'store',
+        dest = 'watch_window_interval',
+        type = float,
+        default = 300.0
+    )
+    parser.add_argument(
+        '--metrics-file',
+        help = 'Write metrics (in the OpenMetrics text format) to this file after each run, e.g. for the node_exporter textfile collector (file name needs to end in ".prom").',
+        action = 'store',
+        dest = 'metrics_file',
+        default = None
+    )
+    parser.add_argument(
+        '--metrics-port',
+        help = 'Serve metrics (in the OpenMetrics text format) on this port (only with --watch).',
+        action = 'store',
+        dest = 'metrics_port',
+        type = int,
+        default = None
+    )
+    parser.add_argument(
+        '--profile',
+        help = 'Print the wall time, CPU time, requests and bytes received of each phase (to stderr).',
+        action = 'store_true',
+        dest = 'profile'
+    )
+    parser.add_argument(
+        '--profile-trace',
+        help = 'Write the phases to this file in the Chrome trace format (implies --profile).',
+        action = 'store',
+        dest = 'profile_trace',
+        default = None
+    )
+    parser.add_argument(
+        '--output-format',
+        help = 'Print the errors as text, as JSON Lines (one error record per line) or as JUnit XML report.',
+        action = 'store',
+        dest = 'output_format',
+        choices = ['text', 'jsonl', 'junit'],
+        default = 'text'
+    )
+    parser.add_argument(
+        '--compare-mirrors',
+        help = 'Instead of validating the projects, compare the dump listings of all other projects (mirrors) with the ones of the first project: ' +
+            'Report missing dump directories and dumps, dumps with a different size and mirrors that are behind.',
+        action = 'store_true',
+        dest = 'compare_mirrors'
+    )
+    parser.add_argument(
+        '--max-sync-lag',
+        help = 'Max number of days mirrors may be behind (for --compare-mirrors).',
+        action = 'store',
+        dest = 'max_sync_lag',
+        type = int,
+        default = 7
+    )
+    parser.add_argument(
+        '--history-file',
+        help = 'SQLite file to add the sizes of all dumps read to (and to read them from for --show-history).',
+        action = 'store',
+        dest = 'history_file',
+        default = None
+    )
+    parser.add_argument(
+        '--show-history',
+        help = 'Instead of running the tests, print the sizes of the dumps of this type (like "latest-all.json.bz2") from --history-file.',
+        action = 'store',
+        dest = 'show_history',
+        default = None
+    )
+    parser.add_argument(
+        '--history-weeks',
+        help = 'Number of weeks --show-history goes back.',
+        action = 'store',
+        dest = 'history_weeks',
+        type = int,
+        default = 52
+    )
+    parser.add_argument('--test-wikidata', help = 'Test Wikidata.', action = 'append_const', dest = 'to_test', const = 'wikidata')
+    parser.add_argument('--test-commons', help = 'Test Wikimedia Commons.', action = 'append_const', dest = 'to_test', const = 'commons')
+
+    return parser
+
+
+def show_history(args, projects):
+    """
+    Print the sizes of the dumps of the type given by --show-history (this doesn't read
+    the dump listings).
+    """
+    import datetime
+    import json
+    from .DumpSizeHistory import DumpSizeHistory
+
+    history = DumpSizeHistory(args.history_file)
+    since = datetime.date.today() - datetime.timedelta(weeks = args.history_weeks)
+    for project in projects:
+        entries = history.get_sizes(project.name, args.show_history, since)
+        if args.output_format == 'jsonl':
+            for entry in entries:
+                print(json.dumps({
+                    'project': project.name,
+                    'dump_type': DumpSizeHistory.get_dump_type(args.show_history),
+                    'date': entry.date.isoformat(),
+                    'dump': entry.dump_name,
+                    'dump_dir': entry.dump_dir,
+                    'size': entry.size,
+                }))
+            continue
+
+        prefix = '' if len(projects) == 1 else project.name + ': '
+        if not entries:
+            print(prefix + 'No sizes were recorded in the last ' + str(args.history_weeks) + ' weeks.', file = sys.stderr)
+        for entry in entries:
+            print(prefix + entry.date.isoformat() + ' ' + ('%15d' % entry.size) + ' ' + entry.dump_name)
+
+
+def main(argv = None):
+    parser = get_argument_parser()
+    args = parser.parse_args(argv)
+
+    from .ProjectConfig import DEFAULT_PROJECTS, load_project_configs
+
+    projects = [DEFAULT_PROJECTS[name] for name in dict.fromkeys(args.to_test or [])]
+    if args.config:
+        try:
+            config_projects = load_project_configs(args.config)
+        except (OSError, ValueError) as e:
+            parser.error('--config ' + args.config + ' can not be loaded: ' + str(e))
+        except KeyError as e:
+            parser.error('--config ' + args.config + ' can not be loaded: missing key ' + str(e))
+        for project in config_projects:
+            if any(other.name == project.name for other in projects):
+                parser.error('--config project "' + project.name + '" is already tested')
+        projects += config_projects
+    if not projects:
+        parser.error('one of the arguments --test-wikidata --test-commons --config is required')
+
+    if args.source:
+        if not args.source.startswith(('http://', 'https://', 'file://')):
+            parser.error('--source needs to be a http(s):// or file:// URL')
+        if len(projects) > 1:
+            parser.error('--source can only be used when testing a single project')
+        projects = [projects[0]._replace(main_index_url = args.source)]
+
+    if args.compare_mirrors and len(projects) < 2:
+        parser.error('--compare-mirrors needs at least two projects (the first one and its mirrors)')
+
+    if args.compare_mirrors and args.watch:
+        parser.error('--compare-mirrors can not be used with --watch')
+
+    if args.metrics_port is not None and not args.watch:
+        parser.error('--metrics-port can only be used with --watch')
+
+    if args.output_format == 'junit' and args.watch:
+        parser.error('--output-format junit can not be used with --watch')
+
+    if (args.profile or args.profile_trace) and args.watch:
+        parser.error('--profile can not be used with --watch')
+
+    if args.probe_latest and not all(project.main_index_url.startswith(('http://', 'https://')) for project in projects):
+        parser.error('--probe-latest can only be used with http(s):// sources')
+
+    def is_html_snapshot(project):
+        return project.main_index_url.startswith('file://') and project.main_index_url.endswith('.html')
+
+    if args.hash_dump_files and not all(project.main_index_url.startswith('file://') and not is_html_snapshot(project) for project in projects):
+        parser.error('--hash-dump-files can only be used with local dumps directory (file:///) sources')
+
+    if (args.verify_checksums or args.hash_dump_files) and any(is_html_snapshot(project) for project in projects):
+        parser.error('--verify-checksums can not be used with saved HTML listing (file:///.../index.html) sources')
+
+    if args.show_history:
+        if not args.history_file:
+            parser.error('--show-history needs a --history-file')
+        if args.output_format == 'junit':
+            parser.error('--output-format junit can not be used with --show-history')
+
+        show_history(args, projects)
+        return
+
+    import os
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from http.client import HTTPException
+    from .CheckScheduler import CheckScheduler
+    from .DumpListingReader import DumpListingReader
+    from .DumpListingSource import get_dump_listing_source
+    from .DumpListingValidator import DumpListingValidator, ValidatorResult
+    from .HttpTransport import HttpTransport
+    from .PhaseRecorder import MultiPhaseRecorder
+    from .ResultRecord import ResultRecord, format_json_lines, format_junit_xml
+
+    transport = HttpTransport(args.timeout, max_retries = args.max_retries, retry_budget = args.retry_budget)
+    cache = None
+    if args.cache_dir:
+        from .DumpDirCache import DumpDirCache
+        cache = DumpDirCache(args.cache_dir)
+    metrics = None
+    if args.metrics_file or args.metrics_port is not None:
+        from .DumpListingMetrics import DumpListingMetrics
+        metrics = DumpListingMetrics()
+    profiler = None
+    if args.profile or args.profile_trace:
+        from .PhaseProfiler import PhaseProfiler
+        profiler = PhaseProfiler(transport)
+    history = None
+    if args.history_file:
+        from .DumpSizeHistory import DumpSizeHistory
+        history = DumpSizeHistory(args.history_file)
+
+    # Print the errors of each check as soon as it is done
+    stream_errors = args.output_format == 'jsonl' and not args.watch and not args.compare_mirrors
+    print_lock = threading.Lock()
+
+    def print_streamed_errors(project, errors):
+        with print_lock:
+            print(format_json_lines(project.name, errors), end = '', flush = True)
+
+    def print_hash_progress(done_bytes, total_bytes, dump_name):
+        percentage = done_bytes / total_bytes * 100
+        if dump_name is None:
+            print('Hashing (%.1f%% of %d bytes).' % (percentage, total_bytes), file = sys.stderr)
+        else:
+            print('Hashed %s (%.1f%% of %d bytes).' % (dump_name, percentage, total_bytes), file = sys.stderr)
+
+    def create_project_checker(project):
+        """
+        Returns the DumpListingReader for the given project and a function validating its DumpAllInfo.
+        """
+        source = get_dump_listing_source(project.main_index_url, transport, cache)
+        recorders = [instrument.get_phase_recorder(project.name) for instrument in (metrics, profiler) if instrument]
+        recorder = recorders[0] if len(recorders) == 1 else MultiPhaseRecorder(recorders) if recorders else None
+        dump_listing_reader = DumpListingReader(
+            project.main_index_url,
+            args.max_concurrent_requests,
+            source = source,
+            recorder = recorder,
+            last_dirs = args.last_dirs,
+            since_date = args.since_date
+        )
+        size_trend_analyzer = None
+        if args.size_trend:
+            from .DumpSizeTrendAnalyzer import DumpSizeTrendAnalyzer
+            size_trend_analyzer = DumpSizeTrendAnalyzer(
+                max_z_score = args.size_trend_max_z_score, expected_size_multiplicator = args.expected_size_multiplicator)
+        dump_listing_validator = DumpListingValidator(
+            args.max_latest_age, args.expected_size_multiplicator, project.latest_expected, size_trend_analyzer, recorder,
+            args.manifest_history if args.check_manifest else None)
+
+        state = None
+        if args.state_file:
+            from .ValidationState import ValidationState
+            # Each project needs its own state
+            state = ValidationState(args.state_file if len(projects) == 1 else args.state_file + '.' + project.name)
+
+        def get_listing(dumps_info):
+            if state:
+                # Only request the dump directories that might have changed since the last run
+                return dumps_info
+            return dump_listing_reader.load_dumps_info(dumps_info)
+
+        def validate_listing(dumps_info):
+            result = dump_listing_validator.validate_listing(dumps_info, state)
+            if state:
+                state.save()
+            return result
+
+        # "index" is the DumpAllInfo with just the main index read (see DumpListingReader.get_lazy_dumps_info),
+        # "listing" the one with the dump directories read as well (the same one with --state-file)
+        def index_unreachable(error):
+            # Nothing that needs the main index can be checked without it
+            reason = str(error) or error.__class__.__name__
+            return ResultRecord(
+                'Main index "' + project.main_index_url + '" is unreachable (' + reason + ').', 'reachable', actual = reason)
+
+        scheduler = CheckScheduler(recorder = recorder)
+        scheduler.add_input('index', dump_listing_reader.get_lazy_dumps_info, on_error = index_unreachable)
+        scheduler.add_input('listing', get_listing, ['index'])
+        scheduler.add_check('validate', validate_listing, ['listing'])
+        if args.verify_checksums or args.hash_dump_files:
+            from .ChecksumVerifier import ChecksumVerifier
+            # Each project needs its own hash state
+            hash_state_file = args.hash_state_file
+            if hash_state_file and len(projects) > 1:
+                hash_state_file += '.' + project.name
+            checksum_verifier = ChecksumVerifier(
+                source,
+                hash_dump_files = args.hash_dump_files,
+                state_path = hash_state_file,
+                progress = print_hash_progress if sys.stderr.isatty() else None
+            )
+            scheduler.add_check('checksums', checksum_verifier.verify, ['listing'])
+        if args.check_timing:
+            from .DumpTimingAnalyzer import DumpTimingAnalyzer
+            timing_analyzer = DumpTimingAnalyzer(args.max_duration_ratio, max_latest_lag_hours = args.max_latest_lag)
+            scheduler.add_check('timing', timing_analyzer.analyze, ['listing'])
+        if args.probe_latest:
+            from .DumpIntegrityProber import DumpIntegrityProber
+            prober = DumpIntegrityProber(project.main_index_url, transport)
+            # Only needs the main index, so the probes don't wait for the dump directories
+            scheduler.add_check('probe_latest', lambda dumps_info: prober.probe_latest(dumps_info.latest), ['index'])
+
+        def validate(dumps_info = None):
+            """
+            Runs all checks on the given DumpAllInfo (or reads it first), returns their merged ValidatorResult.
+            """
+            inputs = {} if dumps_info is None else {'index': dumps_info, 'listing': dumps_info}
+            result = scheduler.run_all(
+                inputs, (lambda name, check_result: print_streamed_errors(project, check_result.errors)) if stream_errors else None)
+            dumps_info = inputs.get('listing')
+            if dumps_info is None:
+                # The dump listings couldn't be read
+                return result
+
+            if history:
+                history.add(project.name, dumps_info)
+
+            if metrics:
+                metrics.update(project.name, dumps_info, result)
+                if args.metrics_file:
+                    metrics.write_textfile(args.metrics_file)
+
+            return result
+
+        return dump_listing_reader, validate
+
+    def validate_project(project):
+        dump_listing_reader, validate = create_project_checker(project)
+
+        return validate()
+
+    def watch_project(project):
+        from .DumpListingWatcher import DumpListingWatcher
+        dump_listing_reader, validate = create_project_checker(project)
+        prefix = '' if len(projects) == 1 else project.name + ': '
+
+        def print_errors(label, errors):
+            timestamp = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            if args.output_format == 'jsonl':
+                print(format_json_lines(project.name, errors, status = label.lower(), time = timestamp), end = '', flush = True)
+                return
+            for error in errors:
+                print(timestamp + ' ' + label + ' ' + prefix + error, flush = True)
+
+        DumpListingWatcher(
+            dump_listing_reader,
+            validate,
+            lambda errors: print_errors('ERROR', errors),
+            lambda errors: print_errors('RESOLVED', errors),
+            args.watch_interval,
+            args.watch_window_interval
+        ).run()
+
+    if args.watch:
+        if metrics is not None and args.metrics_port is not None:
+            metrics.serve(args.metrics_port)
+        with ThreadPoolExecutor(max_workers = len(projects)) as executor:
+            try:
+                # Only returns on errors (which are raised by list)
+                list(executor.map(watch_project, projects))
+            except KeyboardInterrupt:
+                # The watchers don't stop on their own
+                os._exit(130)
+
+    def compare_mirrors():
+        """
+        Returns the projects to report on (the mirrors) and their MirrorComparison.
+        """
+        from .MirrorComparator import MirrorComparator
+        reference, mirrors = projects[0], projects[1:]
+        mirror_comparator = MirrorComparator(
+            create_project_checker(reference)[0],
+            {mirror.name: create_project_checker(mirror)[0] for mirror in mirrors},
+            args.max_sync_lag
+        )
+
+        try:
+            comparisons = mirror_comparator.compare()
+        except (OSError, HTTPException) as e:
+            reason = str(e) or e.__class__.__name__
+            return [reference], [ValidatorResult(False, [ResultRecord(
+                'Main index "' + reference.main_index_url + '" is unreachable (' + reason + ').', 'reachable', actual = reason)])]
+
+        if metrics:
+            for mirror in mirrors:
+                metrics.update_mirror(mirror.name, comparisons[mirror.name])
+            if args.metrics_file:
+                metrics.write_textfile(args.metrics_file)
+
+        return mirrors, [comparisons[mirror.name] for mirror in mirrors]
+
+    if args.compare_mirrors:
+        projects, results = compare_mirrors()
+    else:
+        with ThreadPoolExecutor(max_workers = len(projects)) as executor:
+            results = list(executor.map(validate_project, projects))
+
+    if profiler:
+        print(profiler.format_table(), file = sys.stderr)
+        if args.profile_trace:
+            profiler.write_chrome_trace(args.profile_trace)
+
+    if args.output_format == 'jsonl' and not stream_errors:
+        for project, result in zip(projects, results):
+            print(format_json_lines(project.name, result.errors), end = '')
+    elif args.output_format == 'junit':
+        print(format_junit_xml([(project.name, result) for project, result in zip(projects, results)]), end = '')
+
+    valid = True
+    for project, result in zip(projects, results):
+        if args.output_format != 'text':
+            valid = valid and result.valid
+            continue
+        if result.valid:
+            continue
+
+        if not valid:
+            # Separate from the previous project's errors
+            print()
+        valid = False
+        if len(projects) == 1:
+            print('Errors were found:')
+        else:
+            print('Errors were found for ' + project.name + ':')
+        print()
+        for error in result.errors:
+            print(error)
+
+    if not valid:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
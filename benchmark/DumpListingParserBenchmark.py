@@ -0,0 +1,127 @@
+"""
+Micro-benchmark of DumpListingParser against the previous per-line parsing.
+
+Run with: python -m benchmark.DumpListingParserBenchmark [rows]
+"""
+import datetime
+import re
+import sys
+import timeit
+from WikidataDumpGenerationSmokeTests.DumpListingParser import DumpListingParser
+from WikidataDumpGenerationSmokeTests.DumpListingTypes import DumpDirInfo, DumpInfo
+
+FORMATS = ['json.bz2', 'json.gz', 'nt.bz2', 'nt.gz', 'ttl.bz2', 'ttl.gz']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def legacy_parse_dump_dir(dump_dir_raw):
+    dumps = {}
+    md5sums_file = None
+    sha1sums_file = None
+
+    for line in dump_dir_raw.splitlines():
+        line = line.decode('UTF-8')
+        res_dump = re.search(
+            r"((wikidata|commons)-.*?\.(gz|bz2)).*(\d\d-\w{3}-20[2-3]\d).*?(\d\d\d\d+)", line)
+        res_hashsum_file = re.search(
+            r"((wikidata|commons)-\d+-(sha1|md5)sums\.txt)", line)
+        if res_dump:
+            date = datetime.datetime.strptime(res_dump.group(4), '%d-%b-%Y')
+            dumps[res_dump.group(1)] = DumpInfo(int(res_dump.group(5)), date)
+        elif res_hashsum_file:
+            if res_hashsum_file.group(3) == 'sha1':
+                sha1sums_file = res_hashsum_file.group(1)
+            else:
+                md5sums_file = res_hashsum_file.group(1)
+
+    return DumpDirInfo(dumps, md5sums_file, sha1sums_file)
+
+
+def legacy_parse_main_index(dump_main_index_raw):
+    dirs = []
+    latest = {}
+
+    for line in dump_main_index_raw.splitlines():
+        line = line.decode('UTF-8')
+        res_dirs = re.search(r"20[2-3]\d[0-1]\d[0-3]\d/", line)
+        res_latest = re.search(
+            r"(latest-.*?\.(gz|bz2)).*(\d\d-\w{3}-20[2-3]\d) \d\d:\d\d +(\d+)", line)
+        if res_dirs:
+            dirs.append(res_dirs.group(0))
+        elif res_latest:
+            date = datetime.datetime.strptime(res_latest.group(3), '%d-%b-%Y')
+            latest[res_latest.group(1)] = DumpInfo(
+                int(res_latest.group(4)), date)
+
+    return dirs, latest
+
+
+def generate_dump_dir_listing(rows):
+    lines = [b'<html>', b'<h1>Index of /wikidatawiki/entities/20211029/</h1><hr><pre><a href="../">../</a>']
+    for i in range(rows):
+        name = 'wikidata-2021%04d-part%d.%s' % (
+            i % 1231, i, FORMATS[i % len(FORMATS)])
+        date = '%02d-%s-2021' % (i % 28 + 1, MONTHS[i % 12])
+        lines.append(('<a href="%s">%s</a>   %s 23:%02d   %d' % (
+            name, name, date, i % 60, 100000 + i)).encode())
+    lines.append(
+        b'<a href="wikidata-20211029-md5sums.txt">wikidata-20211029-md5sums.txt</a>  29-Oct-2021 23:31   288')
+    lines.append(
+        b'<a href="wikidata-20211029-sha1sums.txt">wikidata-20211029-sha1sums.txt</a>  29-Oct-2021 23:31   320')
+    lines.append(b'</pre><hr></body></html>')
+    return b'\n'.join(lines)
+
+
+def generate_main_index_listing(rows):
+    lines = [b'<html>', b'<h1>Index of /wikidatawiki/entities/</h1><hr><pre><a href="../">../</a>']
+    start = datetime.date(2020, 1, 1)
+    for i in range(rows):
+        # A dump directory per day, like the real listing each one is only listed once
+        # (up to about 20 years of them, as the directory pattern only matches 2020-2039)
+        dir_date = (start + datetime.timedelta(days=i % 7305)).strftime('%Y%m%d') + '/'
+        lines.append(('<a href="%s">%s</a>   01-Oct-2021 23:31   -' %
+                     (dir_date, dir_date)).encode())
+    for i in range(rows):
+        name = 'latest-part%d.%s' % (i, FORMATS[i % len(FORMATS)])
+        lines.append(('<a href="%s">%s</a>   %02d-Oct-2021 01:44   %d' %
+                     (name, name, i % 28 + 1, 100000 + i)).encode())
+    lines.append(b'</pre><hr></body></html>')
+    return b'\n'.join(lines)
+
+
+def truncate_times(dumps):
+    # The legacy parsing only parsed the dates, not the times
+    return {dump_name: DumpInfo(dump_info.size, datetime.datetime.combine(dump_info.date.date(), datetime.time()))
+            for dump_name, dump_info in dumps.items()}
+
+
+def normalize_dump_dir(dump_dir):
+    return DumpDirInfo(truncate_times(dump_dir.dumps), dump_dir.md5sums_file, dump_dir.sha1sums_file)
+
+
+def normalize_main_index(main_index):
+    dirs, latest = main_index
+    # The legacy parsing listed dump directories as often as they occurred
+    return list(dict.fromkeys(dirs)), truncate_times(latest)
+
+
+def benchmark(name, legacy, new, raw, number, normalize=lambda parsed: parsed):
+    assert normalize(legacy(raw)) == normalize(new(raw)), name + ': The parsers disagree.'
+    legacy_time = min(timeit.repeat(lambda: legacy(raw), number=number, repeat=3))
+    new_time = min(timeit.repeat(lambda: new(raw), number=number, repeat=3))
+    print('%-16s legacy: %8.2f ms  new: %8.2f ms  speedup: %.1fx' % (
+        name, legacy_time / number * 1000, new_time / number * 1000, legacy_time / new_time))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print('Parsing synthetic listings with %d rows' % rows)
+    benchmark('dump directory', legacy_parse_dump_dir, DumpListingParser.parse_dump_dir,
+              generate_dump_dir_listing(rows), 5, normalize_dump_dir)
+    benchmark('main index', legacy_parse_main_index, DumpListingParser.parse_main_index,
+              generate_main_index_listing(rows), 5, normalize_main_index)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark of DumpListingReader.get_dumps_info and DumpListingValidator.validate_listing
+on synthetic dump listings of growing size, served over HTTP by a local stand-in (in
+a separate process, so that it doesn't skew the time and memory measurements).
+
+Reports the throughput and the peak (Python) memory use. The results can be stored as
+baseline, later runs are compared to it and regressions are flagged (exit code 1).
+
+Run with: python -m benchmark.DumpListingReaderBenchmark [--help]
+"""
+import argparse
+from contextlib import contextmanager
+import json
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from WikidataDumpGenerationSmokeTests import DumpListingReader, DumpListingValidator, HttpTransport
+from .SyntheticDumpListings import generate_dump_listings
+from test.LocalHttpServer import LocalHttpServer
+
+# Measurements compared to the baseline (lower is better)
+MEASUREMENTS = (
+    'get_dumps_info_seconds',
+    'get_dumps_info_peak_bytes',
+    'validate_listing_seconds',
+    'validate_listing_peak_bytes',
+)
+# Slowdowns smaller than this (seconds) are just noise
+MIN_TIME_REGRESSION = 0.001
+
+
+def _serve(files, delay, connection):
+    with LocalHttpServer(files, delay) as server:
+        connection.send(server.url)
+        # Serve until the parent is done
+        connection.recv()
+
+
+@contextmanager
+def serve_in_subprocess(files, delay):
+    parent_connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(
+        files, delay, child_connection), daemon=True)
+    process.start()
+    try:
+        yield parent_connection.recv()
+    finally:
+        parent_connection.send(None)
+        process.join()
+
+
+def measure(function, repeat) -> tuple:
+    """
+    Returns the result of function, the fastest time of repeat runs and the peak memory
+    use (of an additional run, as tracing memory allocations is slow).
+    """
+    result = None
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return result, min(times), peak_bytes
+
+
+def run_benchmark(dir_count, latency, max_workers, repeat) -> dict:
+    files = generate_dump_listings(dir_count)
+    with serve_in_subprocess(files, latency) as url, HttpTransport() as transport:
+        reader = DumpListingReader(url + '/entities/', max_workers, transport)
+        dumps_info, get_dumps_info_seconds, get_dumps_info_peak_bytes = measure(
+            reader.get_dumps_info, repeat)
+
+    validator = DumpListingValidator()
+    _, validate_listing_seconds, validate_listing_peak_bytes = measure(
+        lambda: validator.validate_listing(dumps_info), repeat)
+
+    return {
+        'dumps': len(dumps_info.dump_table),
+        'get_dumps_info_seconds': get_dumps_info_seconds,
+        'get_dumps_info_peak_bytes': get_dumps_info_peak_bytes,
+        'validate_listing_seconds': validate_listing_seconds,
+        'validate_listing_peak_bytes': validate_listing_peak_bytes,
+    }
+
+
+def find_regressions(results, baseline, tolerance) -> list:
+    regressions = []
+    if baseline['settings'] != results['settings']:
+        print('Baseline was recorded with different settings (' +
+              json.dumps(baseline['settings']) + '), not comparing.', file=sys.stderr)
+        return regressions
+
+    for dir_count, result in results['runs'].items():
+        baseline_result = baseline['runs'].get(dir_count)
+        if baseline_result is None:
+            continue
+        for measurement in MEASUREMENTS:
+            if measurement.endswith('_seconds') and result[measurement] - baseline_result[measurement] < MIN_TIME_REGRESSION:
+                continue
+            if result[measurement] > baseline_result[measurement] * (1 + tolerance):
+                regressions.append('%s dirs: %s regressed from %s to %s (%+.0f%%).' % (
+                    dir_count, measurement, baseline_result[measurement], result[measurement],
+                    (result[measurement] / baseline_result[measurement] - 1) * 100))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmark.DumpListingReaderBenchmark',
+        description='Benchmark reading and validating synthetic dump listings.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument('--dirs', help='Comma separated numbers of dump directories to benchmark with (at most 7305).',
+                        default='10,100,1000,7300')
+    parser.add_argument('--latency', help='Latency of each request (seconds).',
+                        type=float, default=0.0)
+    parser.add_argument('--max-workers', help='Max number of dump directories to request concurrently.',
+                        type=int, default=4)
+    parser.add_argument('--repeat', help='Number of timed runs (the fastest one counts).',
+                        type=int, default=3)
+    parser.add_argument('--baseline', help='Compare the results to the baseline in this file.',
+                        default=None)
+    parser.add_argument('--save-baseline', help='Store the results as baseline in this file.',
+                        default=None)
+    parser.add_argument('--tolerance', help='Relative slowdown (or memory increase) over the baseline that is flagged as regression.',
+                        type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {
+        'settings': {'latency': args.latency, 'max_workers': args.max_workers},
+        'runs': {},
+    }
+    print('%8s %8s | %12s %10s %10s | %12s %10s %10s' % (
+        'dirs', 'dumps', 'read (s)', 'dirs/s', 'peak MiB', 'validate (s)', 'dumps/s', 'peak MiB'))
+    for dir_count in [int(dir_count) for dir_count in args.dirs.split(',')]:
+        result = run_benchmark(dir_count, args.latency,
+                               args.max_workers, args.repeat)
+        results['runs'][str(dir_count)] = result
+        print('%8d %8d | %12.4f %10.0f %10.2f | %12.4f %10.0f %10.2f' % (
+            dir_count,
+            result['dumps'],
+            result['get_dumps_info_seconds'],
+            dir_count / result['get_dumps_info_seconds'],
+            result['get_dumps_info_peak_bytes'] / 1024 / 1024,
+            result['validate_listing_seconds'],
+            result['dumps'] / result['validate_listing_seconds'],
+            result['validate_listing_peak_bytes'] / 1024 / 1024,
+        ))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='UTF-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='UTF-8') as f:
+            json.dump(results, f, indent=4)
+
+    if regressions:
+        print()
+        print('Regressions were found:')
+        for regression in regressions:
+            print(regression)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Generator for realistic synthetic dump listings (a main index and the dump directory
+listings), in the format served by dumps.wikimedia.org.
+"""
+import datetime
+import random
+
+# Dump directory names are only recognized for the years 2020 - 2039
+MAX_DIRS = (datetime.date(2040, 1, 1) - datetime.date(2020, 1, 1)).days
+
+# Weekday -> dump types generated on that day (as in the Wikidata dump schedule)
+DUMP_TYPES_BY_WEEKDAY = {
+    0: ['all.json.gz', 'all.json.bz2', 'all.nt.gz', 'all.nt.bz2', 'all.ttl.gz', 'all.ttl.bz2'],
+    2: ['truthy-BETA.nt.gz', 'truthy-BETA.nt.bz2', 'lexemes.json.gz', 'lexemes.json.bz2'],
+    4: ['lexemes-BETA.nt.gz', 'lexemes-BETA.nt.bz2', 'lexemes-BETA.ttl.gz', 'lexemes-BETA.ttl.bz2'],
+}
+INITIAL_SIZES = {
+    'all': 100000000000,
+    'truthy-BETA': 50000000000,
+    'lexemes': 300000000,
+    'lexemes-BETA': 500000000,
+}
+# Per day, dumps need to grow by more than DumpListingValidator's default multiplicator
+DAILY_GROWTH = 1.001
+
+
+def _format_row(name, date: datetime.datetime, size):
+    return ('<a href="%s">%s</a>%s %s %19s' % (
+        name, name, ' ' * max(1, 51 - len(name)), date.strftime('%d-%b-%Y %H:%M'), size)).encode()
+
+
+def _format_listing(title, rows):
+    return b'\n'.join([
+        b'<html>',
+        b'<head><title>Index of ' + title + b'</title></head>',
+        b'<body bgcolor="white">',
+        b'<h1>Index of ' + title + b'</h1><hr><pre><a href="../">../</a>',
+    ] + rows + [b'</pre><hr></body>', b'</html>', b''])
+
+
+def generate_dump_listings(dir_count: int, project: str = 'wikidata', path: str = '/entities/', seed: int = 0) -> dict:
+    """
+    Generate a main index with dir_count daily dump directories (and their listings) as
+    files for LocalHttpServer (path -> bytes), with the main index at path.
+    """
+    if not 0 < dir_count <= MAX_DIRS:
+        raise ValueError('dir_count must be between 1 and ' + str(MAX_DIRS) + '.')
+
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 1, 1)
+    files = {}
+    dir_rows = []
+    latest = {}
+    for day in range(dir_count):
+        dir_date = start + datetime.timedelta(days=day)
+        dir_name = dir_date.strftime('%Y%m%d')
+        finished = dir_date + datetime.timedelta(days=rng.randint(0, 2), hours=rng.randint(0, 23),
+                                                 minutes=rng.randint(0, 59))
+        rows = []
+        for dump_type in DUMP_TYPES_BY_WEEKDAY.get(dir_date.weekday(), []):
+            name = project + '-' + dir_name + '-' + dump_type
+            size = int(INITIAL_SIZES[dump_type.split('.')[0]] *
+                       DAILY_GROWTH ** day * (2 if dump_type.endswith('.gz') else 1))
+            rows.append(_format_row(name, finished, size))
+            latest['latest-' + dump_type] = (finished, size)
+        if rows:
+            for hash_type in ('md5', 'sha1'):
+                rows.append(_format_row(
+                    project + '-' + dir_name + '-' + hash_type + 'sums.txt', finished, 32 * len(rows)))
+
+        files[path + dir_name + '/'] = _format_listing(
+            (path + dir_name + '/').encode(), rows)
+        dir_rows.append(('<a href="%s/">%s/</a>%s %s %19s' % (
+            dir_name, dir_name, ' ' * 42, finished.strftime('%d-%b-%Y %H:%M'), '-')).encode())
+
+    latest_rows = [_format_row(name, date, size)
+                   for name, (date, size) in sorted(latest.items())]
+    files[path] = _format_listing(path.encode(), dir_rows + latest_rows)
+
+    return files
@@ -0,0 +1,46 @@
+from datetime import datetime
+from WikidataDumpGenerationSmokeTests import DumpListingSource
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpDirInfo, DumpInfo
+
+
+class InMemorySource(DumpListingSource):
+    """
+    Listing source serving the given dump directories, which records the requested
+    dump directories.
+
+    dir_stamps are the main index stamps of the dump directories (initially, all given
+    dump directories without a stamp). Unreachable sources fail to read the main index,
+    the dump directories in unreachable_dirs fail to be read.
+    """
+    def __init__(self, dump_dirs=None, reachable=True):
+        self.dump_dirs = dump_dirs if dump_dirs is not None else {}
+        self.dir_stamps = dict.fromkeys(self.dump_dirs)
+        self.latest = {}
+        self.reachable = reachable
+        self.unreachable_dirs = set()
+        self.requested_dirs = []
+
+    def get_main_index_stamped(self):
+        if not self.reachable:
+            raise ConnectionRefusedError('Connection refused')
+        return dict(self.dir_stamps), dict(self.latest)
+
+    def get_dump_dir(self, dir_date, is_newest=False):
+        self.requested_dirs.append((dir_date, is_newest))
+        if dir_date in self.unreachable_dirs:
+            raise ConnectionResetError('Connection reset')
+        return self.dump_dirs[dir_date]
+
+
+def create_dump_dir(date, sizes):
+    """
+    A dump directory of the given date (YYYYMMDD) with dumps of the given sizes by dump
+    type, a single size being the one of an all.json.gz dump.
+    """
+    if isinstance(sizes, int):
+        sizes = {'all.json.gz': sizes}
+
+    dump_date = datetime.fromisoformat(date[0:4] + '-' + date[4:6] + '-' + date[6:8])
+    return DumpDirInfo({
+        'wikidata-' + date + '-' + dump_type: DumpInfo(size, dump_date) for dump_type, size in sizes.items()
+    }, 'wikidata-' + date + '-md5sums.txt', 'wikidata-' + date + '-sha1sums.txt')
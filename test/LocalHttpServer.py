@@ -0,0 +1,143 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from hashlib import sha1
+import gzip
+import os
+import threading
+import time
+from pathlib import Path
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_test_case_files(test_case, path='/entities/'):
+    """
+    Get the listings from DumpListingReaderTestCases/test_case as files for LocalHttpServer,
+    with the main index at path.
+    """
+    test_case_dir = __DIR__ + '/DumpListingReaderTestCases/' + test_case + '/'
+    files = {path: Path(test_case_dir + 'index.html').read_bytes()}
+    for file in Path(test_case_dir).glob('index-*.html'):
+        dir_date = file.name[len('index-'):-len('.html')]
+        files[path + dir_date + '/'] = file.read_bytes()
+
+    return files
+
+
+class LocalHttpServer():
+    """
+    Local stand-in for dumps.wikimedia.org, serving the given files (path -> bytes)
+    over HTTP/1.1 with keep-alive.
+
+    Responses carry an ETag, conditional requests (If-None-Match) and single range
+    requests (Range: bytes=...) are supported.
+    Use as context manager, the base URL is available as self.url.
+    """
+
+    def __init__(self, files=None, delay=0.0, failures=None):
+        self.files = files if files is not None else {}
+        # Seconds to wait before answering each request
+        self.delay = delay
+        # path -> number of requests to answer with 503 Service Unavailable first
+        self.failures = failures if failures is not None else {}
+        # Number of TCP connections accepted
+        self.connection_count = 0
+        # List of (path, request headers) tuples
+        self.requests = []
+        self._lock = threading.Lock()
+        # body -> gzip compressed body
+        self._gzip_cache = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, don't wait for the (delayed) ACK in between
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with server._lock:
+                    server.connection_count += 1
+                super().setup()
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append((self.path, dict(self.headers)))
+                if server.delay:
+                    time.sleep(server.delay)
+
+                with server._lock:
+                    fail = server.failures.get(self.path, 0) > 0
+                    if fail:
+                        server.failures[self.path] -= 1
+                if fail:
+                    self._respond(503, b'Service Unavailable')
+                    return
+
+                if self.path not in server.files:
+                    self._respond(404, b'Not Found')
+                    return
+
+                body = server.files[self.path]
+                etag = '"' + sha1(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._respond(304, b'', {'ETag': etag})
+                    return
+
+                byte_range = self.headers.get('Range')
+                if byte_range:
+                    self._respond_range(body, byte_range)
+                    return
+
+                self._respond(200, body, {'ETag': etag})
+
+            def _respond_range(self, body, byte_range):
+                start, end = byte_range[len('bytes='):].split('-')
+                if not start:
+                    # Suffix range: The last n bytes
+                    start = max(0, len(body) - int(end))
+                    end = len(body) - 1
+                start = int(start)
+                end = min(int(end), len(body) - 1) if end else len(body) - 1
+                if start >= len(body):
+                    self._respond(416, b'', {'Content-Range': 'bytes */' + str(len(body))})
+                    return
+
+                self._respond(206, body[start:end + 1], {
+                    'Content-Range': 'bytes %d-%d/%d' % (start, end, len(body))
+                }, False)
+
+            def _respond(self, status, body, headers=None, allow_gzip=True):
+                headers = headers or {}
+                if allow_gzip and body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    gzipped_body = server._gzip_cache.get(body)
+                    if gzipped_body is None:
+                        gzipped_body = server._gzip_cache[body] = gzip.compress(body)
+                    body = gzipped_body
+                    headers['Content-Encoding'] = 'gzip'
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.handler_class = Handler
+        self.url = ''
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class)
+        self._server.daemon_threads = True
+        self.url = 'http://127.0.0.1:' + str(self._server.server_address[1])
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.01})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
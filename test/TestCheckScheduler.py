@@ -0,0 +1,183 @@
+import threading
+import unittest
+from WikidataDumpGenerationSmokeTests.CheckScheduler import CheckScheduler
+from WikidataDumpGenerationSmokeTests.DumpListingValidator import ValidatorResult
+from WikidataDumpGenerationSmokeTests.PhaseRecorder import PhaseRecorder
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+
+
+class ListPhaseRecorder(PhaseRecorder):
+    def __init__(self):
+        self.phases = []
+
+    def phase(self, name):
+        self.phases.append(name)
+        return super().phase(name)
+
+
+def result(*errors):
+    return ValidatorResult(not errors, [ResultRecord.from_error(error) for error in errors])
+
+
+class TestCheckScheduler(unittest.TestCase):
+    def test_run_inputs(self):
+        calls = []
+
+        def get_index():
+            calls.append('index')
+            return 'index'
+
+        def get_listing(index):
+            calls.append('listing')
+            return index + ' and dump directories'
+
+        recorder = ListPhaseRecorder()
+        scheduler = CheckScheduler(recorder=recorder)
+        scheduler.add_input('index', get_index)
+        scheduler.add_input('listing', get_listing, ['index'])
+        scheduler.add_check('a', lambda listing: result('a: ' + listing), ['listing'])
+        scheduler.add_check('b', lambda index, listing: result(), ['index', 'listing'])
+        inputs = {}
+
+        self.assertEqual(dict(scheduler.run(inputs)), {
+            'a': result('a: index and dump directories'),
+            'b': result(),
+        })
+        # Each input is only computed once
+        self.assertEqual(calls, ['index', 'listing'])
+        self.assertEqual(inputs, {'index': 'index', 'listing': 'index and dump directories'})
+        self.assertEqual(sorted(recorder.phases), ['a', 'b'])
+
+    def test_run_given_inputs(self):
+        scheduler = CheckScheduler()
+        scheduler.add_input('index', lambda: self.fail('The given input must not be computed.'))
+        scheduler.add_input('listing')
+        scheduler.add_check('a', lambda index, listing: result(index + listing), ['index', 'listing'])
+
+        self.assertEqual(list(scheduler.run({'index': 'x', 'listing': 'y'})), [('a', result('xy'))])
+        with self.assertRaises(ValueError):
+            list(scheduler.run({'index': 'x'}))
+
+    def test_run_unneeded_input(self):
+        scheduler = CheckScheduler()
+        scheduler.add_input('index', lambda: self.fail('Inputs no check needs must not be computed.'))
+        scheduler.add_check('a', lambda: result())
+
+        self.assertEqual(list(scheduler.run()), [('a', result())])
+
+    def test_run_concurrently(self):
+        # Neither check can finish without the other one running at the same time
+        barrier = threading.Barrier(3, timeout=10)
+
+        def check(name):
+            barrier.wait()
+            return result(name)
+
+        scheduler = CheckScheduler()
+        scheduler.add_input('index', lambda: barrier.wait())
+        scheduler.add_check('a', lambda: check('a'))
+        scheduler.add_check('b', lambda: check('b'))
+        scheduler.add_check('c', lambda index: result('c'), ['index'])
+
+        self.assertEqual(sorted(scheduler.run()), [('a', result('a')), ('b', result('b')), ('c', result('c'))])
+
+    def test_run_streams_results(self):
+        slow_check_done = threading.Event()
+        scheduler = CheckScheduler()
+        scheduler.add_check('slow', lambda: result() if slow_check_done.wait(10) else result('timeout'))
+        scheduler.add_check('fast', lambda: result('fast'))
+        results = scheduler.run()
+
+        # Yielded before the slow check is done
+        self.assertEqual(next(results), ('fast', result('fast')))
+        slow_check_done.set()
+        self.assertEqual(list(results), [('slow', result())])
+
+    def test_run_input_error(self):
+        def get_index():
+            raise ConnectionRefusedError('Connection refused')
+
+        scheduler = CheckScheduler()
+        scheduler.add_input('index', get_index)
+        scheduler.add_input('listing', lambda index: self.fail('Inputs without their inputs must not be computed.'), ['index'])
+        scheduler.add_check('a', lambda listing: self.fail('Checks without their inputs must not run.'), ['listing'])
+        scheduler.add_check('b', lambda: result('b'))
+
+        self.assertEqual(sorted(scheduler.run()), [
+            ('b', result('b')),
+            ('index', result('Input "index" failed (Connection refused).')),
+        ])
+        self.assertEqual(scheduler.run_all(), result('Input "index" failed (Connection refused).', 'b'))
+
+    def test_run_input_error_on_error(self):
+        def get_index():
+            raise ConnectionRefusedError('Connection refused')
+
+        scheduler = CheckScheduler()
+        scheduler.add_input('index', get_index, on_error=lambda error: ResultRecord(
+            'Main index is unreachable (' + str(error) + ').', 'reachable', actual=str(error)))
+        scheduler.add_check('a', lambda index: self.fail('Checks without their inputs must not run.'), ['index'])
+
+        name, index_result = list(scheduler.run())[0]
+        self.assertEqual((name, index_result), ('index', result('Main index is unreachable (Connection refused).')))
+        self.assertEqual((index_result.errors[0].check, index_result.errors[0].actual), ('reachable', 'Connection refused'))
+
+    def test_run_check_error(self):
+        def check():
+            raise ConnectionResetError('Connection reset')
+
+        scheduler = CheckScheduler(max_workers=1)
+        scheduler.add_check('a', check)
+        scheduler.add_check('b', lambda: result('b'))
+
+        # The other checks still run
+        results = dict(scheduler.run())
+        self.assertEqual(results, {'a': result('Check "a" failed (Connection reset).'), 'b': result('b')})
+        self.assertEqual(results['a'].errors[0].to_dict(), {
+            'check': 'a',
+            'severity': 'error',
+            'dump': None,
+            'dump_dir': None,
+            'expected': None,
+            'actual': 'Connection reset',
+            'message': 'Check "a" failed (Connection reset).',
+        })
+
+    def test_run_bug(self):
+        scheduler = CheckScheduler()
+        scheduler.add_check('a', lambda: result('a') if 1 / 0 else result())
+
+        # Only failures to read something are reported as results
+        with self.assertRaises(ZeroDivisionError):
+            list(scheduler.run())
+
+    def test_run_all(self):
+        slow_check_done = threading.Event()
+        scheduler = CheckScheduler()
+        scheduler.add_check('slow', lambda: result('slow 1', 'slow 2') if slow_check_done.wait(10) else result('timeout'))
+        scheduler.add_check('fast', lambda: result())
+        scheduler.add_check('last', lambda: result('last'))
+        done = []
+
+        def on_result(name, check_result):
+            done.append(name)
+            if name != 'slow' and len(done) == 2:
+                slow_check_done.set()
+
+        # Merged in the order the checks were added, not in the order they were done
+        self.assertEqual(scheduler.run_all(on_result=on_result), result('slow 1', 'slow 2', 'last'))
+        self.assertEqual(done[-1], 'slow')
+        self.assertEqual(scheduler.get_checks(), ['slow', 'fast', 'last'])
+
+    def test_add_invalid(self):
+        scheduler = CheckScheduler()
+        scheduler.add_check('a', lambda: result())
+
+        with self.assertRaises(ValueError):
+            scheduler.add_check('a', lambda: result())
+        # Inputs need to be added first
+        with self.assertRaises(ValueError):
+            scheduler.add_check('b', lambda index: result(), ['index'])
+        # Checks aren't inputs
+        with self.assertRaises(ValueError):
+            scheduler.add_check('c', lambda a: result(), ['a'])
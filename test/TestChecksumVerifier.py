@@ -0,0 +1,138 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from WikidataDumpGenerationSmokeTests import DumpListingReader, HtmlSnapshotSource, LocalDirectorySource
+from WikidataDumpGenerationSmokeTests.ChecksumVerifier import ChecksumVerifier, hash_file, parse_hashsum_file
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+
+
+class TestChecksumVerifier(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.main_dir = os.path.join(self.tmp_dir.name, 'entities')
+        os.makedirs(os.path.join(self.main_dir, '20211006'))
+
+        self.dumps = {
+            'wikidata-20211006-lexemes.json.gz': b'lexemes json' * 1000,
+            'wikidata-20211006-lexemes.nt.gz': b'lexemes nt' * 1000,
+            'wikidata-20211006-truthy-BETA.nt.gz': b'',
+        }
+        for dump_name, content in self.dumps.items():
+            self._write('20211006/' + dump_name, content)
+        self._write_hashsum_file('md5', self.dumps)
+        self._write_hashsum_file('sha1', self.dumps)
+
+    def _write(self, path, content):
+        with open(os.path.join(self.main_dir, path), 'wb') as f:
+            f.write(content)
+
+    def _write_hashsum_file(self, hash_type, dumps):
+        self._write('20211006/wikidata-20211006-' + hash_type + 'sums.txt', b''.join(
+            hashlib.new(hash_type, content).hexdigest().encode() +
+            b'  ' + dump_name.encode() + b'\n'
+            for dump_name, content in dumps.items()
+        ))
+
+    def _verify(self, **kwargs):
+        source = LocalDirectorySource(self.main_dir)
+        dumps_info = DumpListingReader('', source=source).get_dumps_info()
+        return ChecksumVerifier(source, **kwargs).verify(dumps_info)
+
+    def test_parse_hashsum_file(self):
+        self.assertEqual(parse_hashsum_file(b'ABC  foo.json.gz\ndef *bar.nt.gz\n\n'), {
+            'foo.json.gz': 'abc',
+            'bar.nt.gz': 'def',
+        })
+
+    def test_hash_file(self):
+        for content in [b'', b'abc', b'x' * 100]:
+            self._write('file', content)
+            self.assertEqual(hash_file(os.path.join(self.main_dir, 'file'), 'sha1', chunk_size=7),
+                             hashlib.sha1(content).hexdigest())
+
+    def test_hash_file_progress(self):
+        self._write('file', b'x' * 100)
+        progress = []
+        hash_file(os.path.join(self.main_dir, 'file'), 'md5', chunk_size=30, progress=progress.append)
+
+        # After each chunk
+        self.assertEqual(progress, [30, 30, 30, 10])
+
+    def test_verify(self):
+        result = self._verify(hash_dump_files=True, max_workers=2)
+        self.assertEqual(result.valid, True)
+        self.assertEqual(result.errors, [])
+
+    def test_verify_missing_hashsum_entry(self):
+        self._write_hashsum_file('sha1', {
+            'wikidata-20211006-lexemes.json.gz': self.dumps['wikidata-20211006-lexemes.json.gz']
+        })
+
+        result = self._verify()
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, [
+            'Dump wikidata-20211006-lexemes.nt.gz is missing from hash sum file "wikidata-20211006-sha1sums.txt".',
+            'Dump wikidata-20211006-truthy-BETA.nt.gz is missing from hash sum file "wikidata-20211006-sha1sums.txt".',
+        ])
+
+    def test_verify_unreachable_hashsum_file(self):
+        os.makedirs(os.path.join(self.main_dir, '20211008'))
+        self._write('20211008/wikidata-20211008-lexemes.json.gz', b'lexemes json')
+        # Listed, but gone by the time it is read
+        self._write('20211008/wikidata-20211008-md5sums.txt', b'')
+        source = LocalDirectorySource(self.main_dir)
+        dumps_info = DumpListingReader('', source=source).get_dumps_info()
+        os.unlink(os.path.join(self.main_dir, '20211008/wikidata-20211008-md5sums.txt'))
+
+        result = ChecksumVerifier(source).verify(dumps_info)
+        self.assertEqual(result.valid, False)
+        self.assertEqual(len(result.errors), 1)
+        self.assertRegex(result.errors[0], '^Hash sum file "wikidata-20211008-md5sums.txt" is unreachable \\(.+\\)\\.$')
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual((error.check, error.dump_dir), ('hashsum_file_reachable', '20211008/'))
+
+    def test_verify_hash_mismatch(self):
+        self._write('20211006/wikidata-20211006-lexemes.nt.gz', b'truncated')
+
+        result = self._verify(hash_dump_files=True, hash_type='sha1')
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, [
+            'Dump wikidata-20211006-lexemes.nt.gz has sha1 ' + hashlib.sha1(b'truncated').hexdigest() +
+            ' (expected ' + hashlib.sha1(self.dumps['wikidata-20211006-lexemes.nt.gz']).hexdigest() + ').'
+        ])
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual((error.check, error.dump_dir), ('dump_sha1', '20211006/'))
+
+    def test_verify_source_without_files(self):
+        dumps_info = DumpListingReader('', source=LocalDirectorySource(self.main_dir)).get_dumps_info()
+
+        # Saved HTML listings can't read the hash sum files
+        result = ChecksumVerifier(HtmlSnapshotSource(os.path.join(self.main_dir, 'index.html'))).verify(dumps_info)
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, [
+            'Hash sum file "wikidata-20211006-md5sums.txt" is unreachable (HtmlSnapshotSource can not read files).',
+            'Hash sum file "wikidata-20211006-sha1sums.txt" is unreachable (HtmlSnapshotSource can not read files).',
+        ])
+
+    def test_verify_resume(self):
+        state_path = os.path.join(self.tmp_dir.name, 'state.json')
+        progress = []
+        result = self._verify(hash_dump_files=True, state_path=state_path,
+                              progress=lambda done, total, dump_name: progress.append((done, total, dump_name)))
+        self.assertEqual(result.valid, True)
+        # Once each dump file was hashed (and in between)
+        self.assertEqual(sorted(dump_name for _, _, dump_name in progress if dump_name), sorted(self.dumps))
+        self.assertEqual(progress[-1][0:2], (22000, 22000))
+
+        # Everything was hashed before already
+        with patch('concurrent.futures.ProcessPoolExecutor') as mock_executor:
+            result = self._verify(hash_dump_files=True, state_path=state_path)
+            self.assertEqual(mock_executor.call_count, 0)
+        self.assertEqual(result.valid, True)
+
+    def test_hash_dump_files_needs_local_source(self):
+        with self.assertRaises(ValueError):
+            ChecksumVerifier(HtmlSnapshotSource(os.path.join(self.main_dir, 'index.html')), hash_dump_files=True)
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from WikidataDumpGenerationSmokeTests import DumpDirCache, DumpListingReader, HttpTransport
+from WikidataDumpGenerationSmokeTests.DumpDirCache import DumpDirCacheEntry
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpDirInfo, DumpInfo
+from .LocalHttpServer import LocalHttpServer, get_test_case_files
+
+
+class TestDumpDirCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_get_missing(self):
+        cache = DumpDirCache(self.tmp_dir.name)
+        self.assertEqual(cache.get('http://example.org/20211029/'), None)
+
+    def test_set_get(self):
+        cache = DumpDirCache(self.tmp_dir.name)
+        dump_dir = DumpDirInfo({
+            'wikidata-20211029-lexemes-BETA.nt.bz2': DumpInfo(562695508, datetime.fromisoformat('2021-10-29 23:30')),
+        }, 'wikidata-20211029-md5sums.txt', None)
+        cache.set('http://example.org/20211029/',
+                  dump_dir, '"abc"', 'Fri, 29 Oct 2021 23:31:00 GMT')
+
+        self.assertEqual(cache.get('http://example.org/20211029/'),
+                         DumpDirCacheEntry(dump_dir, '"abc"', 'Fri, 29 Oct 2021 23:31:00 GMT'))
+        self.assertEqual(cache.get('http://example.org/20211027/'), None)
+
+    def test_get_other_format(self):
+        cache = DumpDirCache(self.tmp_dir.name)
+        with open(cache._get_path('http://example.org/20211029/'), 'w', encoding='UTF-8') as f:
+            json.dump({
+                'url': 'http://example.org/20211029/',
+                'dumps': {'wikidata-20211029-lexemes-BETA.nt.bz2': [562695508, '2021-10-29T00:00:00']},
+                'md5sums_file': None,
+                'sha1sums_file': None,
+                'etag': '"abc"',
+                'last_modified': None,
+            }, f)
+
+        # Written before the dump dates had a time, needs to be requested again
+        self.assertEqual(cache.get('http://example.org/20211029/'), None)
+
+    def test_evict(self):
+        cache = DumpDirCache(self.tmp_dir.name, max_entries=2, max_age_days=10)
+        for i in range(4):
+            cache.set('http://example.org/' + str(i) + '/',
+                      DumpDirInfo({}, None, None), None, None)
+        # Least recently used first
+        for i, age_days in enumerate([20, 3, 2, 1]):
+            mtime = time.time() - age_days * 86400
+            os.utime(cache._get_path('http://example.org/' + str(i) + '/'), (mtime, mtime))
+
+        cache.evict()
+        self.assertEqual(cache.get('http://example.org/0/'), None)
+        self.assertEqual(cache.get('http://example.org/1/'), None)
+        self.assertNotEqual(cache.get('http://example.org/2/'), None)
+        self.assertNotEqual(cache.get('http://example.org/3/'), None)
+
+    def test_dump_listing_reader(self):
+        files = get_test_case_files('wikidatawiki-2021-10-30')
+
+        with LocalHttpServer(files) as server, HttpTransport() as transport:
+            def get_dumps_info():
+                cache = DumpDirCache(self.tmp_dir.name)
+                return DumpListingReader(server.url + '/entities/', transport=transport, cache=cache).get_dumps_info()
+
+            dumps_info = get_dumps_info()
+            self.assertEqual(len(server.requests), 21)
+
+            server.requests.clear()
+            self.assertEqual(get_dumps_info(), dumps_info)
+            # Only the main index and the newest directory are requested again
+            self.assertEqual([path for path, _ in server.requests], ['/entities/', '/entities/20211029/'])
+            self.assertIn('If-None-Match', server.requests[1][1])
+
+            # The truthy-BETA.nt.bz2 dump of 20211027/ was written (after its hash sum files)
+            files['/entities/20211027/'] = files['/entities/20211027/'].replace(
+                b'<a href="wikidata-20211027-truthy-BETA.nt.gz">',
+                b'<a href="wikidata-20211027-truthy-BETA.nt.bz2">wikidata-20211027-truthy-BETA.nt.bz2</a>' +
+                b'               30-Oct-2021 17:02         36427381514\n' +
+                b'<a href="wikidata-20211027-truthy-BETA.nt.gz">')
+            files['/entities/'] = files['/entities/'].replace(
+                b'20211027/</a>                                          30-Oct-2021 09:45',
+                b'20211027/</a>                                          30-Oct-2021 17:02')
+
+            server.requests.clear()
+            self.assertIn('wikidata-20211027-truthy-BETA.nt.bz2', get_dumps_info().dump_dirs['20211027/'].dumps)
+            self.assertEqual([path for path, _ in server.requests], [
+                '/entities/', '/entities/20211027/', '/entities/20211029/'])
+
+    def test_dump_listing_reader_unknown_stamp(self):
+        files = get_test_case_files('wikidatawiki-2021-10-30')
+        # Main index without modification times
+        files['/entities/'] = re.sub(rb'\d\d-\w{3}-2021 \d\d:\d\d( +-)', rb'\1', files['/entities/'])
+
+        with LocalHttpServer(files) as server, HttpTransport() as transport:
+            def get_dumps_info():
+                cache = DumpDirCache(self.tmp_dir.name)
+                return DumpListingReader(server.url + '/entities/', transport=transport, cache=cache).get_dumps_info()
+
+            dumps_info = get_dumps_info()
+            server.requests.clear()
+            self.assertEqual(get_dumps_info(), dumps_info)
+            # All dump directories are revalidated
+            self.assertEqual(len(server.requests), 21)
+            self.assertTrue(all('If-None-Match' in headers for _, headers in server.requests[1:]))
@@ -0,0 +1,54 @@
+import bz2
+import gzip
+import unittest
+from WikidataDumpGenerationSmokeTests import HttpTransport
+from WikidataDumpGenerationSmokeTests.DumpIntegrityProber import DumpIntegrityProber, check_bz2, check_gzip
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpInfo
+from datetime import datetime
+from .LocalHttpServer import LocalHttpServer
+
+content = b'{"type":"item","id":"Q42"}\n' * 10000
+
+
+class TestDumpIntegrityProber(unittest.TestCase):
+    def test_check_gzip(self):
+        data = gzip.compress(content)
+        self.assertEqual(check_gzip(data[:64], data[-64:]), None)
+        self.assertEqual(check_gzip(b'BZh9' + data[:60], data[-64:]), 'no gzip header')
+        self.assertEqual(check_gzip(data[:64], b'\0' * 64),
+                         'gzip trailer is zeroed (CRC32 and ISIZE are 0)')
+
+    def test_check_bz2(self):
+        for data in [bz2.compress(content), bz2.compress(b''), bz2.compress(content) + bz2.compress(content[:1234])]:
+            self.assertEqual(check_bz2(data[:64], data[-64:]), None)
+
+        data = bz2.compress(content)
+        self.assertEqual(check_bz2(gzip.compress(content)[:64], data[-64:]), 'no bzip2 header')
+        truncated = data[:len(data) // 2]
+        self.assertEqual(check_bz2(truncated[:64], truncated[-64:]),
+                         'no bzip2 end of stream marker')
+
+    def test_probe_latest(self):
+        gz = gzip.compress(content)
+        bz = bz2.compress(content)
+        files = {
+            '/latest-all.json.gz': gz,
+            '/latest-all.json.bz2': bz,
+            '/latest-truncated.json.bz2': bz[:len(bz) - 100],
+            '/latest-zeroed.json.gz': gz[:len(gz) // 2] + b'\0' * (len(gz) // 2),
+        }
+        latest = {name[1:]: DumpInfo(len(data), datetime.now()) for name, data in files.items()}
+        latest['latest-missing.nt.gz'] = DumpInfo(0, datetime.now())
+
+        with LocalHttpServer(files) as server, HttpTransport() as transport:
+            result = DumpIntegrityProber(server.url + '/', transport).probe_latest(latest)
+            # Only the head and the tail were requested
+            self.assertEqual(len(server.requests), 9)
+            self.assertTrue(all(headers['Range'] for _, headers in server.requests))
+
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, [
+            'Latest dump "latest-truncated.json.bz2" seems corrupt (no bzip2 end of stream marker).',
+            'Latest dump "latest-zeroed.json.gz" seems corrupt (gzip trailer is zeroed (CRC32 and ISIZE are 0)).',
+            'Latest dump "latest-missing.nt.gz" seems corrupt (range request failed (status 404)).',
+        ])
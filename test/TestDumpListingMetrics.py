@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from urllib.request import urlopen
+from WikidataDumpGenerationSmokeTests import DumpListingReader, DumpListingValidator, HtmlSnapshotSource
+from WikidataDumpGenerationSmokeTests.DumpListingMetrics import DumpListingMetrics
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo, DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpListingValidator import ValidatorResult
+from WikidataDumpGenerationSmokeTests.MirrorComparator import MirrorComparison
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestDumpListingMetrics(unittest.TestCase):
+    def get_dump_all_info(self):
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        return DumpAllInfo({}, {
+            '20211018/': DumpDirInfo({
+                'wikidata-20211018-all.json.gz': DumpInfo(400, today - timedelta(days=9)),
+                'wikidata-20211018-lexemes.json.gz': DumpInfo(100, today - timedelta(days=9)),
+            }, 'wikidata-20211018-md5sums.txt', 'wikidata-20211018-sha1sums.txt'),
+            '20211025/': DumpDirInfo({
+                'wikidata-20211025-all.json.gz': DumpInfo(500, today - timedelta(days=2)),
+            }, 'wikidata-20211025-md5sums.txt', None),
+        })
+
+    def test_update(self):
+        metrics = DumpListingMetrics()
+        metrics.update('wikidata', self.get_dump_all_info(), ValidatorResult(False, [
+            ResultRecord('Missing sha1sum file in dir "20211025/".', 'hashsum_files', dump_dir='20211025/', expected='sha1'),
+            ResultRecord('Latest dump "latest-lexemes.json.gz" is too old (9 days).', 'latest_age',
+                         dump='latest-lexemes.json.gz', expected=7, actual=9),
+        ]))
+        lines = metrics.render().splitlines()
+
+        self.assertIn('wikidata_dump_smoke_tests_valid{project="wikidata"} 0', lines)
+        self.assertIn('wikidata_dump_smoke_tests_errors{project="wikidata"} 2', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_latest_dump_size_bytes{project="wikidata",type="wikidata-all.json.gz"} 500', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_latest_dump_age_days{project="wikidata",type="wikidata-all.json.gz"} 2', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_latest_dump_age_days{project="wikidata",type="wikidata-lexemes.json.gz"} 9', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_latest_dump_growth_ratio{project="wikidata",type="wikidata-all.json.gz"} 1.25', lines)
+        # No previous dump, no growth ratio
+        self.assertFalse([line for line in lines if line.startswith(
+            'wikidata_dump_smoke_tests_latest_dump_growth_ratio{project="wikidata",type="wikidata-lexemes.json.gz"}')])
+        self.assertIn(
+            'wikidata_dump_smoke_tests_hashsum_file_present{project="wikidata",type="wikidata-all.json.gz",hash="md5"} 1', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_hashsum_file_present{project="wikidata",type="wikidata-all.json.gz",hash="sha1"} 0', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_dump_type_valid{project="wikidata",type="wikidata-all.json.gz"} 1', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_dump_type_valid{project="wikidata",type="wikidata-lexemes.json.gz"} 0', lines)
+        self.assertEqual(lines[-1], '# EOF')
+
+        # Updating replaces the project's metrics
+        metrics.update('wikidata', DumpAllInfo({}, {}), ValidatorResult(True, []))
+        lines = metrics.render().splitlines()
+        self.assertIn('wikidata_dump_smoke_tests_valid{project="wikidata"} 1', lines)
+        self.assertFalse([line for line in lines if 'type="wikidata-all.json.gz"' in line])
+
+    def test_update_latest_beta(self):
+        dump_all_info = self.get_dump_all_info()
+        dump_all_info.dump_dirs['20211025/'].dumps['wikidata-20211025-truthy-BETA.nt.gz'] = DumpInfo(
+            300, datetime.now() - timedelta(days=9))
+        metrics = DumpListingMetrics()
+        metrics.update('wikidata', dump_all_info, ValidatorResult(False, [
+            ResultRecord('Latest dump "latest-truthy.nt.gz" is too old (9 days).', 'latest_age',
+                         dump='latest-truthy.nt.gz', expected=7, actual=9),
+        ]))
+        lines = metrics.render().splitlines()
+
+        self.assertIn(
+            'wikidata_dump_smoke_tests_dump_type_valid{project="wikidata",type="wikidata-truthy-BETA.nt.gz"} 0', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_dump_type_valid{project="wikidata",type="wikidata-all.json.gz"} 1', lines)
+
+    def test_update_mirror(self):
+        metrics = DumpListingMetrics()
+        metrics.update_mirror('wikidata-mirror', MirrorComparison(True, [], '20211025/', 2))
+        metrics.update_mirror('other-mirror', MirrorComparison(
+            False, ['Mirror has none of the dump directories completely.'], None, None))
+        lines = metrics.render().splitlines()
+
+        self.assertIn('wikidata_dump_smoke_tests_valid{project="wikidata-mirror"} 1', lines)
+        self.assertIn('wikidata_dump_smoke_tests_mirror_sync_lag_days{project="wikidata-mirror"} 2', lines)
+        self.assertIn('wikidata_dump_smoke_tests_errors{project="other-mirror"} 1', lines)
+        self.assertFalse([line for line in lines if line.startswith(
+            'wikidata_dump_smoke_tests_mirror_sync_lag_days{project="other-mirror"}')])
+
+    def test_phase_durations(self):
+        metrics = DumpListingMetrics(buckets=(0.1, 1.0))
+        metrics.observe_phase('wikidata', 'index', 0.05)
+        metrics.observe_phase('wikidata', 'index', 0.5)
+        metrics.observe_phase('wikidata', 'index', 5.0)
+        lines = metrics.render().splitlines()
+
+        self.assertIn('# TYPE wikidata_dump_smoke_tests_phase_duration_seconds histogram', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_bucket{project="wikidata",phase="index",le="0.1"} 1', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_bucket{project="wikidata",phase="index",le="1.0"} 2', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_bucket{project="wikidata",phase="index",le="+Inf"} 3', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_sum{project="wikidata",phase="index"} 5.55', lines)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_count{project="wikidata",phase="index"} 3', lines)
+
+    def test_phase_recorder(self):
+        metrics = DumpListingMetrics()
+        recorder = metrics.get_phase_recorder('wikidata')
+        source = HtmlSnapshotSource(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html')
+        dumps_info = DumpListingReader('', source=source, recorder=recorder).get_dumps_info()
+        DumpListingValidator(recorder=recorder).validate_listing(dumps_info)
+        render = metrics.render()
+
+        for phase, count in (('index', 1), ('dump_dir', 20), ('dump_table', 1), ('ensure_hashsum_files', 1),
+                             ('ensure_latest', 1), ('ensure_dump_sizes', 1)):
+            self.assertIn('wikidata_dump_smoke_tests_phase_duration_seconds_count{project="wikidata",phase="' +
+                          phase + '"} ' + str(count) + '\n', render)
+
+    def test_label_escaping(self):
+        metrics = DumpListingMetrics()
+        metrics.update('a "b"\\', DumpAllInfo({}, {}), ValidatorResult(True, []))
+
+        self.assertIn('wikidata_dump_smoke_tests_valid{project="a \\"b\\"\\\\"} 1', metrics.render())
+
+    def test_write_textfile(self):
+        metrics = DumpListingMetrics()
+        metrics.update('wikidata', self.get_dump_all_info(), ValidatorResult(True, []))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'dumps.prom')
+            metrics.write_textfile(path)
+
+            with open(path, encoding='UTF-8') as f:
+                self.assertEqual(f.read(), metrics.render())
+            self.assertEqual(os.listdir(tmp_dir), ['dumps.prom'])
+
+    def test_serve(self):
+        metrics = DumpListingMetrics()
+        metrics.update('wikidata', self.get_dump_all_info(), ValidatorResult(True, []))
+        server = metrics.serve(0, '127.0.0.1')
+        try:
+            with urlopen('http://127.0.0.1:%d/metrics' % server.server_address[1]) as response:
+                self.assertEqual(response.read().decode('UTF-8'), metrics.render())
+        finally:
+            server.shutdown()
+            server.server_close()
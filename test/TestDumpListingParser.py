@@ -0,0 +1,94 @@
+import os
+import unittest
+from pathlib import Path
+from WikidataDumpGenerationSmokeTests.DumpListingParser import DumpListingParser
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpInfo
+from datetime import datetime
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestDumpListingParser(unittest.TestCase):
+    def test_parse_dump_dir_empty(self):
+        dump_dir = DumpListingParser.parse_dump_dir(b'')
+        self.assertEqual(dump_dir.dumps, {})
+        self.assertEqual(dump_dir.md5sums_file, None)
+        self.assertEqual(dump_dir.sha1sums_file, None)
+
+    def test_parse_dump_dir_wikidatawiki20211030_20211029(self):
+        dump_dir = DumpListingParser.parse_dump_dir(Path(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index-20211029.html').read_bytes())
+
+        self.assertEqual(dump_dir.dumps, {
+            'wikidata-20211029-lexemes-BETA.nt.bz2': DumpInfo(562695508, datetime.fromisoformat('2021-10-29 23:30')),
+            'wikidata-20211029-lexemes-BETA.nt.gz': DumpInfo(758379284, datetime.fromisoformat('2021-10-29 23:26')),
+            'wikidata-20211029-lexemes-BETA.ttl.bz2': DumpInfo(307490101, datetime.fromisoformat('2021-10-29 23:27')),
+            'wikidata-20211029-lexemes-BETA.ttl.gz': DumpInfo(389331663, datetime.fromisoformat('2021-10-29 23:24')),
+        })
+        self.assertEqual(dump_dir.md5sums_file,
+                         'wikidata-20211029-md5sums.txt')
+        self.assertEqual(dump_dir.sha1sums_file,
+                         'wikidata-20211029-sha1sums.txt')
+
+    def test_parse_dump_dir_one_match_per_line(self):
+        dump_dir = DumpListingParser.parse_dump_dir(
+            b'commons-20211025-mediainfo.json.gz 25-Oct-2021 10:00 12345 commons-20211025-md5sums.txt\n' +
+            b'commons-20211025-sha1sums.txt 25-Oct-2021 10:00 60\n'
+        )
+        self.assertEqual(dump_dir.dumps, {
+            'commons-20211025-mediainfo.json.gz': DumpInfo(12345, datetime.fromisoformat('2021-10-25 10:00')),
+        })
+        self.assertEqual(dump_dir.md5sums_file, None)
+        self.assertEqual(dump_dir.sha1sums_file,
+                         'commons-20211025-sha1sums.txt')
+
+    def test_parse_dump_dir_chunks(self):
+        dump_dir_raw = Path(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index-20211006.html').read_bytes()
+
+        for chunk_size in [1, 7, 100, len(dump_dir_raw)]:
+            chunks = (dump_dir_raw[i:i + chunk_size]
+                      for i in range(0, len(dump_dir_raw), chunk_size))
+            self.assertEqual(DumpListingParser.parse_dump_dir(
+                chunks), DumpListingParser.parse_dump_dir(dump_dir_raw))
+
+    def test_iter_dump_dir_chunks(self):
+        chunks = iter([
+            b'<a href="commons-20211025-mediainfo.json.gz">commons-20211025-mediainfo.js',
+            b'on.gz</a>  25-Oct-2021 10:00   12345\n<a href="commons-20211025-md5',
+            b'sums.txt">commons-20211025-md5sums.txt</a>  25-Oct-2021 10:00   60',
+        ])
+        records = DumpListingParser.iter_dump_dir(chunks)
+
+        self.assertEqual(next(records), (
+            'commons-20211025-mediainfo.json.gz', DumpInfo(12345, datetime.fromisoformat('2021-10-25 10:00'))))
+        self.assertEqual(next(records), ('commons-20211025-md5sums.txt', None))
+        self.assertEqual(list(records), [])
+
+    def test_parse_main_index_wikidatawiki20211030(self):
+        dirs, latest = DumpListingParser.parse_main_index(Path(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html').read_bytes())
+
+        self.assertEqual(len(dirs), 20)
+        self.assertEqual(dirs[0], '20210915/')
+        self.assertEqual(dirs[-1], '20211029/')
+        self.assertEqual(len(latest), 14)
+        self.assertEqual(latest['latest-lexemes.nt.gz'], DumpInfo(
+            758379284, datetime.fromisoformat('2021-10-29 23:26')))
+        self.assertNotIn('dcatap.rdf', latest)
+
+    def test_parse_main_index_stamped_wikidatawiki20211030(self):
+        dirs, latest = DumpListingParser.parse_main_index_stamped(Path(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html').read_bytes())
+
+        self.assertEqual(len(dirs), 20)
+        self.assertEqual(dirs['20210915/'], '18-Sep-2021 02:49')
+        self.assertEqual(list(dirs)[-1], '20211029/')
+        self.assertEqual(len(latest), 14)
+
+    def test_parse_main_index_stamped_no_stamp(self):
+        dirs, latest = DumpListingParser.parse_main_index_stamped(
+            b'<a href="20211029/">20211029/</a>\n')
+
+        self.assertEqual(dirs, {'20211029/': None})
+        self.assertEqual(latest, {})
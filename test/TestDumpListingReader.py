@@ -1,12 +1,17 @@
 import sys
 import os
+import random
+import time
 
 import unittest
 from unittest.mock import patch
 from pathlib import Path
-from WikidataDumpGenerationSmokeTests import DumpListingReader
-from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpInfo
+from WikidataDumpGenerationSmokeTests import DumpListingReader, HttpIndexSource, HttpTransport
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpInfo, LazyDumpDirs
+from WikidataDumpGenerationSmokeTests.DumpTable import DumpTable
 from datetime import datetime
+from .LocalHttpServer import LocalHttpServer, get_test_case_files
+from .InMemorySource import InMemorySource, create_dump_dir
 
 __DIR__ = os.path.dirname(os.path.abspath(__file__))
 wikidatawiki20211030_dirs = [
@@ -34,7 +39,7 @@ wikidatawiki20211030_dirs = [
 
 
 class TestDumpListingReader(unittest.TestCase):
-    @patch.object(DumpListingReader, '_request_dump_dir')
+    @patch.object(HttpIndexSource, '_request_dump_dir')
     def test_get_dump_dir_wikidatawiki20211030_20210924(self, mock_request_dump_dir):
         def request_dump_dir_from_file(dir_date):
             self.assertEqual(dir_date, '20210924/')
@@ -49,18 +54,18 @@ class TestDumpListingReader(unittest.TestCase):
         dump_dir = dump_listing_reader._get_dump_dir('20210924/')
 
         self.assertEqual(dump_dir.dumps, {
-            'wikidata-20210924-lexemes-BETA.nt.bz2': DumpInfo(512902814, datetime.fromisoformat('2021-09-24')),
-            'wikidata-20210924-lexemes-BETA.nt.gz': DumpInfo(697520557, datetime.fromisoformat('2021-09-24')),
-            'wikidata-20210924-lexemes-BETA.ttl.bz2': DumpInfo(277698476, datetime.fromisoformat('2021-09-24')),
-            'wikidata-20210924-lexemes-BETA.ttl.gz': DumpInfo(354761658, datetime.fromisoformat('2021-09-24')),
+            'wikidata-20210924-lexemes-BETA.nt.bz2': DumpInfo(512902814, datetime.fromisoformat('2021-09-24 23:27')),
+            'wikidata-20210924-lexemes-BETA.nt.gz': DumpInfo(697520557, datetime.fromisoformat('2021-09-24 23:23')),
+            'wikidata-20210924-lexemes-BETA.ttl.bz2': DumpInfo(277698476, datetime.fromisoformat('2021-09-24 23:24')),
+            'wikidata-20210924-lexemes-BETA.ttl.gz': DumpInfo(354761658, datetime.fromisoformat('2021-09-24 23:21')),
         })
         self.assertEqual(dump_dir.md5sums_file,
                          'wikidata-20210924-md5sums.txt')
         self.assertEqual(dump_dir.sha1sums_file,
                          'wikidata-20210924-sha1sums.txt')
 
-    @patch.object(DumpListingReader, '_request_dump_dir')
-    @patch.object(DumpListingReader, '_request_dump_main_index')
+    @patch.object(HttpIndexSource, '_request_dump_dir')
+    @patch.object(HttpIndexSource, '_request_dump_main_index')
     def test_get_dumps_info_wikidatawiki20211030(self, mock_request_dump_main_index, mock_request_dump_dir):
         dump_dirs_to_visit = wikidatawiki20211030_dirs.copy()
 
@@ -84,10 +89,10 @@ class TestDumpListingReader(unittest.TestCase):
         # Just check one by example
         dump_dir = dumps_info.dump_dirs['20211006/']
         self.assertEqual(dump_dir.dumps, {
-            'wikidata-20211006-lexemes.json.bz2': DumpInfo(195288101, datetime.fromisoformat('2021-10-06')),
-            'wikidata-20211006-lexemes.json.gz': DumpInfo(271807724, datetime.fromisoformat('2021-10-06')),
-            'wikidata-20211006-truthy-BETA.nt.bz2': DumpInfo(30708742696, datetime.fromisoformat('2021-10-09')),
-            'wikidata-20211006-truthy-BETA.nt.gz': DumpInfo(50187553542, datetime.fromisoformat('2021-10-09')),
+            'wikidata-20211006-lexemes.json.bz2': DumpInfo(195288101, datetime.fromisoformat('2021-10-06 03:42')),
+            'wikidata-20211006-lexemes.json.gz': DumpInfo(271807724, datetime.fromisoformat('2021-10-06 03:40')),
+            'wikidata-20211006-truthy-BETA.nt.bz2': DumpInfo(30708742696, datetime.fromisoformat('2021-10-09 05:29')),
+            'wikidata-20211006-truthy-BETA.nt.gz': DumpInfo(50187553542, datetime.fromisoformat('2021-10-09 02:38')),
         })
         self.assertEqual(dump_dir.md5sums_file,
                          'wikidata-20211006-md5sums.txt')
@@ -97,10 +102,138 @@ class TestDumpListingReader(unittest.TestCase):
         self.assertEqual(dump_dirs_to_visit, [])
         # Just check two "latest" dumps by example
         self.assertEqual(
-            dumps_info.latest['latest-all.json.bz2'].date, datetime.fromisoformat('2021-10-28'))
+            dumps_info.latest['latest-all.json.bz2'].date, datetime.fromisoformat('2021-10-28 01:44'))
         self.assertEqual(
             dumps_info.latest['latest-all.json.bz2'].size, 70729380062)
         self.assertEqual(
-            dumps_info.latest['latest-truthy.nt.gz'].date, datetime.fromisoformat('2021-10-30'))
+            dumps_info.latest['latest-truthy.nt.gz'].date, datetime.fromisoformat('2021-10-30 09:45'))
         self.assertEqual(
             dumps_info.latest['latest-truthy.nt.gz'].size, 50633667968)
+
+    @patch.object(HttpIndexSource, '_request_dump_dir')
+    @patch.object(HttpIndexSource, '_request_dump_main_index')
+    def test_get_dumps_info_wikidatawiki20211030_concurrent(self, mock_request_dump_main_index, mock_request_dump_dir):
+        def request_dump_dir(dir_date):
+            # Make the requests finish out of order
+            time.sleep(random.uniform(0, 0.01))
+            dir_date = dir_date.replace('/', '')
+            return Path(
+                __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index-' + dir_date + '.html'
+            ).read_text().encode()
+
+        mock_request_dump_main_index.side_effect = lambda: Path(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html').read_text().encode()
+        mock_request_dump_dir.side_effect = request_dump_dir
+
+        dumps_info = DumpListingReader('').get_dumps_info()
+        dumps_info_concurrent = DumpListingReader(
+            '', max_workers=8).get_dumps_info()
+
+        self.assertEqual(mock_request_dump_dir.call_count,
+                         len(wikidatawiki20211030_dirs) * 2)
+        # The dump directories need to be ordered by date, no matter when they were fetched
+        self.assertEqual(list(dumps_info_concurrent.dump_dirs.keys()),
+                         wikidatawiki20211030_dirs)
+        self.assertEqual(dumps_info_concurrent, dumps_info)
+
+    def test_get_dumps_info_unreachable_dirs(self):
+        files = get_test_case_files('wikidatawiki-2021-10-30')
+        del files['/entities/20210924/']
+        with LocalHttpServer(files, failures={'/entities/20211001/': 1, '/entities/20211004/': 10}) as server, \
+                HttpTransport(max_retries=2, backoff_base=0.001) as transport:
+            dumps_info = DumpListingReader(
+                server.url + '/entities/', max_workers=4, transport=transport).get_dumps_info()
+
+        self.assertEqual(dumps_info.unreachable_dirs, {
+            '20210924/': 'HTTP status 404 for "' + server.url + '/entities/20210924/"',
+            '20211004/': 'HTTP status 503 for "' + server.url + '/entities/20211004/"',
+        })
+        # The others were still read, the temporary failure was retried
+        self.assertEqual(len(dumps_info.dump_dirs), 18)
+        self.assertIn('20211001/', dumps_info.dump_dirs)
+        self.assertNotIn('20211004/', dumps_info.dump_dirs)
+        self.assertEqual(dumps_info.dump_table, DumpTable.from_dump_dirs(dumps_info.dump_dirs))
+
+    def get_in_memory_source(self):
+        source = InMemorySource()
+        source.dir_stamps = {'20211011/': 'a', '20211018/': 'b', '20211025/': None}
+        source.dump_dirs = {dir_date: create_dump_dir(dir_date[0:8], 100) for dir_date in source.dir_stamps}
+        return source
+
+    def test_get_dumps_info_window(self):
+        source = self.get_in_memory_source()
+
+        for last_dirs, since_date, expected_dirs in (
+            (2, None, ['20211018/', '20211025/']),
+            (None, datetime(2021, 10, 12).date(), ['20211018/', '20211025/']),
+            (None, datetime(2021, 10, 18).date(), ['20211018/', '20211025/']),
+            (1, datetime(2021, 10, 1).date(), ['20211025/']),
+            (5, None, ['20211011/', '20211018/', '20211025/']),
+        ):
+            source.requested_dirs = []
+            dumps_info = DumpListingReader('', source=source, last_dirs=last_dirs,
+                                           since_date=since_date).get_dumps_info()
+            self.assertEqual(list(dumps_info.dump_dirs), expected_dirs)
+            self.assertEqual([dir_date for dir_date, _ in source.requested_dirs], expected_dirs)
+
+    def test_get_lazy_dumps_info(self):
+        source = self.get_in_memory_source()
+        dumps_info = DumpListingReader('', max_workers=2, source=source).get_lazy_dumps_info()
+        self.assertEqual(source.requested_dirs, [])
+        self.assertIsNone(dumps_info.dump_table)
+        if not isinstance(dumps_info.dump_dirs, LazyDumpDirs):
+            self.fail('The dump directories need to be read lazily.')
+        self.assertEqual(dumps_info.dump_dirs.get_dirs(), ['20211011/', '20211018/', '20211025/'])
+        self.assertEqual(dumps_info.dump_dirs.get_stamp('20211018/'), 'b')
+
+        self.assertIn('20211018/', dumps_info.dump_dirs)
+        self.assertEqual(dumps_info.dump_dirs['20211018/'], source.dump_dirs['20211018/'])
+        self.assertEqual(dumps_info.dump_dirs['20211018/'], source.dump_dirs['20211018/'])
+        self.assertEqual(source.requested_dirs, [('20211018/', False)])
+        with self.assertRaises(KeyError):
+            dumps_info.dump_dirs['20211004/']
+
+        # Iterating requests the rest
+        self.assertEqual(dict(dumps_info.dump_dirs), source.dump_dirs)
+        self.assertEqual(sorted(source.requested_dirs), [
+            ('20211011/', False), ('20211018/', False), ('20211025/', True)])
+
+    def test_get_lazy_dumps_info_window(self):
+        source = self.get_in_memory_source()
+        dumps_info = DumpListingReader('', source=source, last_dirs=1).get_lazy_dumps_info()
+
+        self.assertEqual(list(dumps_info.dump_dirs), ['20211025/'])
+        self.assertEqual(source.requested_dirs, [('20211025/', True)])
+
+    def test_get_lazy_dumps_info_unreachable_dirs(self):
+        files = get_test_case_files('wikidatawiki-2021-10-30')
+        del files['/entities/20210924/']
+        with LocalHttpServer(files) as server, HttpTransport(max_retries=0) as transport:
+            dumps_info = DumpListingReader(
+                server.url + '/entities/', max_workers=4, transport=transport).get_lazy_dumps_info()
+
+            self.assertEqual(dumps_info.unreachable_dirs, {})
+            with self.assertRaises(KeyError):
+                dumps_info.dump_dirs['20210924/']
+            self.assertEqual(dumps_info.unreachable_dirs, {
+                '20210924/': 'HTTP status 404 for "' + server.url + '/entities/20210924/"'})
+            self.assertNotIn('20210924/', dumps_info.dump_dirs)
+            self.assertEqual(len(dumps_info.dump_dirs), 19)
+
+    def test_load_dumps_info(self):
+        files = get_test_case_files('wikidatawiki-2021-10-30')
+        del files['/entities/20210924/']
+        with LocalHttpServer(files) as server, HttpTransport(max_retries=0) as transport:
+            dump_listing_reader = DumpListingReader(server.url + '/entities/', max_workers=4, transport=transport)
+            lazy_dumps_info = dump_listing_reader.get_lazy_dumps_info()
+            lazy_dumps_info.dump_dirs['20211025/']
+
+            self.assertEqual(dump_listing_reader.load_dumps_info(lazy_dumps_info), dump_listing_reader.get_dumps_info())
+
+    def test_last_dirs_invalid(self):
+        with self.assertRaises(ValueError):
+            DumpListingReader('', last_dirs=0)
+
+    def test_max_workers_invalid(self):
+        with self.assertRaises(ValueError):
+            DumpListingReader('', max_workers=0)
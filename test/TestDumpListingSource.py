@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from WikidataDumpGenerationSmokeTests import DumpListingReader, HtmlSnapshotSource, HttpIndexSource, LocalDirectorySource, get_dump_listing_source
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpInfo
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestDumpListingSource(unittest.TestCase):
+    def test_html_snapshot_source(self):
+        source = HtmlSnapshotSource(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html')
+        dumps_info = DumpListingReader('', source=source).get_dumps_info()
+
+        self.assertEqual(len(dumps_info.latest), 14)
+        self.assertEqual(len(dumps_info.dump_dirs), 20)
+        dump_dir = dumps_info.dump_dirs['20211006/']
+        self.assertEqual(dump_dir.dumps['wikidata-20211006-truthy-BETA.nt.gz'],
+                         DumpInfo(50187553542, datetime.fromisoformat('2021-10-09 02:38')))
+        self.assertEqual(dump_dir.sha1sums_file,
+                         'wikidata-20211006-sha1sums.txt')
+
+    def test_local_directory_source(self):
+        with tempfile.TemporaryDirectory() as main_dir:
+            def create_file(path, size):
+                with open(os.path.join(main_dir, path), 'wb') as f:
+                    f.truncate(size)
+                # 2021-10-06 12:34:56 UTC
+                os.utime(os.path.join(main_dir, path), (1633523696, 1633523696))
+
+            os.mkdir(os.path.join(main_dir, '20211006'))
+            os.mkdir(os.path.join(main_dir, '20211004'))
+            os.mkdir(os.path.join(main_dir, 'not-a-dump-dir'))
+            create_file('20211006/wikidata-20211006-lexemes.json.gz', 271807724)
+            create_file('20211006/wikidata-20211006-lexemes.json.bz2', 195288101)
+            create_file('20211006/wikidata-20211006-md5sums.txt', 288)
+            create_file('20211006/wikidata-20211006-sha1sums.txt', 320)
+            create_file('20211006/wikidata-20211006-lexemes.json.gz.tmp', 5)
+            create_file('dcatap.rdf', 84751)
+            os.symlink('20211006/wikidata-20211006-lexemes.json.gz',
+                       os.path.join(main_dir, 'latest-lexemes.json.gz'))
+            os.symlink('20211006/does-not-exist.json.bz2',
+                       os.path.join(main_dir, 'latest-lexemes.json.bz2'))
+
+            dumps_info = DumpListingReader('', source=LocalDirectorySource(
+                main_dir)).get_dumps_info()
+
+        self.assertEqual(list(dumps_info.dump_dirs.keys()), [
+                         '20211004/', '20211006/'])
+        self.assertEqual(dumps_info.dump_dirs['20211004/'].dumps, {})
+        dump_dir = dumps_info.dump_dirs['20211006/']
+        self.assertEqual(dump_dir.dumps, {
+            'wikidata-20211006-lexemes.json.bz2': DumpInfo(195288101, datetime.fromisoformat('2021-10-06 12:34')),
+            'wikidata-20211006-lexemes.json.gz': DumpInfo(271807724, datetime.fromisoformat('2021-10-06 12:34')),
+        })
+        self.assertEqual(dump_dir.md5sums_file,
+                         'wikidata-20211006-md5sums.txt')
+        self.assertEqual(dump_dir.sha1sums_file,
+                         'wikidata-20211006-sha1sums.txt')
+        self.assertEqual(dumps_info.latest['latest-lexemes.json.gz'],
+                         DumpInfo(271807724, datetime.fromisoformat('2021-10-06 12:34')))
+        # Broken symlink
+        self.assertEqual(dumps_info.latest['latest-lexemes.json.bz2'].size, 0)
+        self.assertEqual(len(dumps_info.latest), 2)
+
+    def test_get_dump_listing_source(self):
+        self.assertIsInstance(get_dump_listing_source(
+            'https://dumps.wikimedia.org/wikidatawiki/entities/'), HttpIndexSource)
+        self.assertIsInstance(get_dump_listing_source(
+            'file:///mnt/dumps/wikidatawiki/entities/'), LocalDirectorySource)
+        source = get_dump_listing_source('file:///tmp/snapshot/index.html')
+        if not isinstance(source, HtmlSnapshotSource):
+            self.fail('Saved HTML listings are read by a HtmlSnapshotSource.')
+        self.assertEqual(source.main_index_path, '/tmp/snapshot/index.html')
+        with self.assertRaises(ValueError):
+            get_dump_listing_source('ftp://example.org/')
@@ -1,9 +1,17 @@
+import os
+import tempfile
+import time
 import unittest
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from collections import namedtuple
-from WikidataDumpGenerationSmokeTests import DumpListingValidator
+from unittest.mock import patch
+from WikidataDumpGenerationSmokeTests import DumpListingReader, DumpListingValidator
 from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpDirInfo, DumpInfo, DumpAllInfo
 from WikidataDumpGenerationSmokeTests.DumpListingValidator import ValidatorResult
+from WikidataDumpGenerationSmokeTests.DumpTable import DumpTable
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+from WikidataDumpGenerationSmokeTests.ValidationState import ValidationState
+from .InMemorySource import InMemorySource, create_dump_dir
 
 
 class TestDumpListingValidator(unittest.TestCase):
@@ -94,6 +102,22 @@ class TestDumpListingValidator(unittest.TestCase):
             'Latest dump "latest-mediainfo.nt.gz" is too old (100 days).',
         ])
 
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'Needs time.tzset')
+    def test_ensure_latest_utc(self):
+        dump_listing_validator = DumpListingValidator()
+        utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        # Far behind UTC, the local time would make the dump seem younger
+        try:
+            with patch.dict(os.environ, {'TZ': 'HST10'}):
+                time.tzset()
+                result = dump_listing_validator._ensure_latest({
+                    'a': DumpInfo(222, utc_now - timedelta(days=11, hours=5)),
+                })
+        finally:
+            time.tzset()
+        self.assertEqual(result.errors, ['Latest dump "a" is too old (11 days).'])
+
     def test_group_dumps_by_type_empty(self):
         dump_listing_validator = DumpListingValidator()
         dumps_by_type = dump_listing_validator._group_dumps_by_type({})
@@ -442,3 +466,233 @@ class TestDumpListingValidator(unittest.TestCase):
             'Dump wikidata-20211007-lexemes.json.bz2 should be at least 10005 bytes (is 10000 bytes).',
             'Dump wikidata-20211008-lexemes.json.bz2 should be at least 10005 bytes (is 0 bytes).',
         ])
+
+    def test_validate_listing_unreachable_dirs(self):
+        dump_listing_validator = DumpListingValidator()
+        dump_dirs = {
+            '20211006/': DumpDirInfo({
+                'wikidata-20211006-lexemes.json.bz2': DumpInfo(10000, datetime.fromisoformat('2021-10-06'))
+            }, 'md5', 'sha1'),
+            '20211020/': DumpDirInfo({
+                'wikidata-20211020-lexemes.json.bz2': DumpInfo(9000, datetime.fromisoformat('2021-10-20'))
+            }, 'md5', 'sha1'),
+        }
+        dumps_info = DumpAllInfo({}, dump_dirs, None, {
+                                 '20211013/': 'HTTP status 503'})
+
+        expected_errors = [
+            'Dump directory "20211013/" is unreachable (HTTP status 503).',
+            'Dump wikidata-20211020-lexemes.json.bz2 should be at least 10005 bytes (is 9000 bytes).',
+        ]
+        result = dump_listing_validator.validate_listing(dumps_info)
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, expected_errors)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = ValidationState(os.path.join(tmp_dir, 'state.json'))
+            self.assertEqual(dump_listing_validator.validate_listing(
+                dumps_info, state).errors, expected_errors)
+
+    def test_validate_listing_incremental(self):
+        dump_listing_validator = DumpListingValidator()
+
+        def dump_dir(date, size, has_sha1sums=True):
+            return DumpDirInfo({
+                'wikidata-' + date + '-lexemes.json.bz2': DumpInfo(size, datetime.fromisoformat('2021-10-06')),
+                'wikidata-' + date + '-lexemes.json.gz': DumpInfo(size * 2, datetime.fromisoformat('2021-10-06')),
+            }, 'md5', 'sha1' if has_sha1sums else None)
+
+        dump_dirs = {
+            '20211006/': dump_dir('20211006', 10000),
+            '20211013/': dump_dir('20211013', 8000, False),
+            '20211020/': dump_dir('20211020', 9000),
+        }
+        latest = {
+            'a': DumpInfo(222, datetime.now() - timedelta(days=70)),
+        }
+        expected_errors = dump_listing_validator.validate_listing(
+            DumpAllInfo(latest, dump_dirs)).errors
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_file = os.path.join(tmp_dir, 'state.json')
+            state = ValidationState(state_file)
+            result = dump_listing_validator.validate_listing(
+                DumpAllInfo(latest, dump_dirs), state)
+            self.assertEqual(result.valid, False)
+            self.assertEqual(sorted(result.errors), sorted(expected_errors))
+            state.save()
+
+            # Nothing changed: Nothing needs to be validated again
+            with patch.object(DumpListingValidator, '_ensure_dump_sizes') as mock_ensure_dump_sizes:
+                result = dump_listing_validator.validate_listing(
+                    DumpAllInfo(latest, dump_dirs), ValidationState(state_file))
+                self.assertEqual(mock_ensure_dump_sizes.call_count, 0)
+            self.assertEqual(sorted(result.errors), sorted(expected_errors))
+
+            # A new dump directory only needs the new one to be validated
+            dump_dirs['20211027/'] = dump_dir('20211027', 8500)
+            with patch.object(DumpListingValidator, '_ensure_dump_sizes', wraps=dump_listing_validator._ensure_dump_sizes) as mock_ensure_dump_sizes:
+                state = ValidationState(state_file)
+                result = dump_listing_validator.validate_listing(
+                    DumpAllInfo(latest, dump_dirs), state)
+                self.assertEqual(mock_ensure_dump_sizes.call_count, 1)
+            self.assertEqual(result.errors[-2:], [
+                'Dump wikidata-20211027-lexemes.json.bz2 should be at least 9004 bytes (is 8500 bytes).',
+                'Dump wikidata-20211027-lexemes.json.gz should be at least 18009 bytes (is 17000 bytes).',
+            ])
+            self.assertEqual(sorted(result.errors), sorted(dump_listing_validator.validate_listing(
+                DumpAllInfo(latest, dump_dirs)).errors))
+
+            # A changed dump directory affects the next ones
+            dump_dirs['20211013/'] = dump_dir('20211013', 9500)
+            result = dump_listing_validator.validate_listing(
+                DumpAllInfo(latest, dump_dirs), state)
+            self.assertEqual(sorted(result.errors), sorted(dump_listing_validator.validate_listing(
+                DumpAllInfo(latest, dump_dirs)).errors))
+
+    def test_validate_listing_incremental_lazy(self):
+        dump_listing_validator = DumpListingValidator()
+        source = InMemorySource()
+        source.dir_stamps = {'20211011/': 'a', '20211018/': 'b', '20211025/': 'c', '20211101/': None}
+        source.dump_dirs = {
+            '20211011/': create_dump_dir('20211011', 10000),
+            '20211018/': create_dump_dir('20211018', 9000),
+            '20211025/': create_dump_dir('20211025', 11000),
+            '20211101/': create_dump_dir('20211101', 12000),
+        }
+        reader = DumpListingReader('', source=source)
+        expected_errors = dump_listing_validator.validate_listing(reader.get_dumps_info()).errors
+        self.assertEqual(expected_errors, [
+            'Dump wikidata-20211018-all.json.gz should be at least 10005 bytes (is 9000 bytes).'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = ValidationState(os.path.join(tmp_dir, 'state.json'))
+            source.requested_dirs = []
+            self.assertEqual(dump_listing_validator.validate_listing(
+                reader.get_lazy_dumps_info(), state).errors, expected_errors)
+            self.assertEqual(len(source.requested_dirs), 4)
+
+            # Only the newest dump directory (which has no stamp) is requested again
+            source.requested_dirs = []
+            self.assertEqual(dump_listing_validator.validate_listing(
+                reader.get_lazy_dumps_info(), state).errors, expected_errors)
+            self.assertEqual(source.requested_dirs, [('20211101/', True)])
+
+            # A changed stamp means the dump directory needs to be requested (and the
+            # next one, as its baseline changed)
+            source.requested_dirs = []
+            source.dir_stamps['20211018/'] = 'b2'
+            source.dump_dirs['20211018/'] = create_dump_dir('20211018', 10500)
+            result = dump_listing_validator.validate_listing(reader.get_lazy_dumps_info(), state)
+            self.assertEqual(result.valid, True)
+            self.assertEqual(source.requested_dirs, [
+                ('20211018/', False), ('20211101/', True), ('20211025/', False)])
+
+    def test_validate_listing_incremental_settings_changed(self):
+        dump_dirs = {
+            '20211006/': DumpDirInfo({'wikidata-20211006-lexemes.json.bz2': DumpInfo(10000, datetime.now())}, 'md5', 'sha1'),
+            '20211013/': DumpDirInfo({'wikidata-20211013-lexemes.json.bz2': DumpInfo(12000, datetime.now())}, 'md5', 'sha1'),
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state = ValidationState(os.path.join(tmp_dir, 'state.json'))
+            result = DumpListingValidator().validate_listing(
+                DumpAllInfo({}, dump_dirs), state)
+            self.assertEqual(result.valid, True)
+
+            result = DumpListingValidator(expected_size_multiplicator=1.5).validate_listing(
+                DumpAllInfo({}, dump_dirs), state)
+            self.assertEqual(result.errors, [
+                'Dump wikidata-20211013-lexemes.json.bz2 should be at least 15000 bytes (is 12000 bytes).'])
+
+    def get_manifest_dump_dirs(self):
+        def dump_dir(date, dump_types):
+            return DumpDirInfo({
+                'wikidata-' + date + '-' + dump_type: DumpInfo(10000, datetime.now()) for dump_type in dump_types
+            }, 'wikidata-' + date + '-md5sums.txt', 'wikidata-' + date + '-sha1sums.txt')
+
+        # The all dumps are started on Mondays, the truthy and lexemes dumps on Wednesdays
+        return {
+            '20211004/': dump_dir('20211004', ['all.json.gz', 'all-BETA.nt.gz']),
+            '20211006/': dump_dir('20211006', ['truthy-BETA.nt.gz', 'lexemes.json.gz']),
+            '20211011/': dump_dir('20211011', ['all.json.gz', 'all-BETA.nt.gz']),
+            '20211013/': dump_dir('20211013', ['lexemes.json.gz']),
+            '20211018/': dump_dir('20211018', ['all.json.gz']),
+            '20211020/': dump_dir('20211020', ['truthy-BETA.nt.gz', 'lexemes.json.gz', 'lexemes.json.bz2']),
+            # Still being generated
+            '20211025/': dump_dir('20211025', ['all.json.gz']),
+            '20211027/': dump_dir('20211027', []),
+        }
+
+    def test_get_manifest_index(self):
+        dump_listing_validator = DumpListingValidator()
+        dump_table = DumpTable.from_dump_dirs(self.get_manifest_dump_dirs())
+
+        self.assertEqual(dump_listing_validator._get_manifest_index(dump_table), {
+            '20211004/': {'wikidata-all.json.gz', 'wikidata-all-BETA.nt.gz'},
+            '20211006/': {'wikidata-truthy-BETA.nt.gz', 'wikidata-lexemes.json.gz'},
+            '20211011/': {'wikidata-all.json.gz', 'wikidata-all-BETA.nt.gz'},
+            '20211013/': {'wikidata-lexemes.json.gz'},
+            '20211018/': {'wikidata-all.json.gz'},
+            '20211020/': {'wikidata-truthy-BETA.nt.gz', 'wikidata-lexemes.json.gz', 'wikidata-lexemes.json.bz2'},
+            '20211025/': {'wikidata-all.json.gz'},
+            '20211027/': set(),
+        })
+
+    def test_ensure_manifest(self):
+        dump_dirs = self.get_manifest_dump_dirs()
+        dump_listing_validator = DumpListingValidator(
+            latest_expected=['latest-all.json.gz', 'latest-all.nt.gz', 'latest-truthy.nt.gz', 'latest-lexemes.json.gz'],
+            manifest_history=2)
+        manifest_index = dump_listing_validator._get_manifest_index(DumpTable.from_dump_dirs(dump_dirs))
+        result = dump_listing_validator._ensure_manifest(manifest_index, list(dump_dirs))
+
+        self.assertEqual(result.errors, [
+            'Dump wikidata-20211013-truthy-BETA.nt.gz is missing.',
+            'Dump wikidata-20211018-all-BETA.nt.gz is missing.',
+            'Dump wikidata-20211020-lexemes.json.bz2 is unexpected.',
+        ])
+        self.assertEqual([(error.check, error.dump_dir) for error in map(ResultRecord.from_error, result.errors)], [
+            ('manifest_missing', '20211013/'), ('manifest_missing', '20211018/'), ('manifest_unexpected', '20211020/')])
+
+        # Only dumps of the previous dump directory are expected
+        dump_listing_validator.manifest_history = 1
+        self.assertEqual(dump_listing_validator._ensure_manifest(manifest_index, list(dump_dirs)).errors[0:2], [
+            'Dump wikidata-20211013-truthy-BETA.nt.gz is missing.',
+            'Dump wikidata-20211018-all-BETA.nt.gz is missing.',
+        ])
+
+    def test_validate_listing_manifest(self):
+        dump_dirs = self.get_manifest_dump_dirs()
+        expected_errors = [
+            'Dump wikidata-20211013-truthy-BETA.nt.gz is missing.',
+            'Dump wikidata-20211018-all-BETA.nt.gz is missing.',
+        ]
+
+        self.assertEqual(DumpListingValidator(expected_size_multiplicator=0, manifest_history=2).validate_listing(
+            DumpAllInfo({}, dump_dirs)).errors, expected_errors)
+        self.assertEqual(DumpListingValidator(expected_size_multiplicator=0).validate_listing(
+            DumpAllInfo({}, dump_dirs)).errors, [])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = InMemorySource()
+            source.dump_dirs = dump_dirs
+            source.dir_stamps = {dump_dir_name: 'a' for dump_dir_name in dump_dirs}
+            reader = DumpListingReader('', source=source)
+            state = ValidationState(os.path.join(tmp_dir, 'state.json'))
+            dump_listing_validator = DumpListingValidator(expected_size_multiplicator=0, manifest_history=2)
+
+            self.assertEqual(dump_listing_validator.validate_listing(
+                reader.get_lazy_dumps_info(), state).errors, expected_errors)
+            # The dump directories that didn't change are not requested again
+            source.requested_dirs = []
+            self.assertEqual(dump_listing_validator.validate_listing(
+                reader.get_lazy_dumps_info(), state).errors, expected_errors)
+            self.assertEqual(source.requested_dirs, [('20211027/', True)])
+
+            # Unreachable dump directories are not checked against the manifest with their old dumps
+            source.dir_stamps['20211018/'] = 'b'
+            source.unreachable_dirs.add('20211018/')
+            self.assertEqual(dump_listing_validator.validate_listing(reader.get_lazy_dumps_info(), state).errors, [
+                'Dump directory "20211018/" is unreachable (Connection reset).',
+                'Dump wikidata-20211013-truthy-BETA.nt.gz is missing.',
+            ])
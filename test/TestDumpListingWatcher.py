@@ -0,0 +1,140 @@
+import unittest
+from datetime import datetime
+from WikidataDumpGenerationSmokeTests import DumpListingReader, DumpListingWatcher
+from WikidataDumpGenerationSmokeTests.DumpListingValidator import ValidatorResult
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+from .InMemorySource import InMemorySource, create_dump_dir
+
+
+class TestDumpListingWatcher(unittest.TestCase):
+    def setUp(self):
+        self.source = InMemorySource()
+        self.source.dir_stamps = {'20211018/': '20-Oct-2021 12:00', '20211025/': None}
+        self.source.dump_dirs = {
+            '20211018/': create_dump_dir('20211018', 100),
+            '20211025/': create_dump_dir('20211025', 101),
+        }
+        self.alerts = []
+        self.resolved = []
+
+    def create_watcher(self, validate, **kwargs):
+        return DumpListingWatcher(
+            DumpListingReader('', source=self.source),
+            validate,
+            self.alerts.append,
+            self.resolved.append,
+            **kwargs
+        )
+
+    def test_poll_only_requests_changed_dirs(self):
+        validated = []
+
+        def validate(dumps_info):
+            validated.append(dumps_info)
+            return ValidatorResult(True, [])
+
+        watcher = self.create_watcher(validate)
+        watcher.poll()
+        self.assertEqual(self.source.requested_dirs, [
+                         ('20211018/', False), ('20211025/', True)])
+
+        # Unchanged: Only the newest dir (without a stamp) is requested again
+        self.source.requested_dirs = []
+        watcher.poll()
+        self.assertEqual(self.source.requested_dirs, [('20211025/', True)])
+
+        # Changed stamp and a new dump directory
+        self.source.requested_dirs = []
+        self.source.dir_stamps['20211018/'] = '21-Oct-2021 12:00'
+        self.source.dir_stamps['20211027/'] = None
+        self.source.dump_dirs['20211027/'] = create_dump_dir('20211027', 102)
+        watcher.poll()
+        self.assertEqual(self.source.requested_dirs, [
+                         ('20211018/', False), ('20211027/', True)])
+        self.assertEqual(list(validated[-1].dump_dirs), [
+                         '20211018/', '20211025/', '20211027/'])
+        self.assertEqual(len(validated[-1].dump_table), 3)
+
+        # Removed dump directories are dropped
+        del self.source.dir_stamps['20211018/']
+        watcher.poll()
+        self.assertEqual(list(validated[-1].dump_dirs), [
+                         '20211025/', '20211027/'])
+
+    def test_poll_window(self):
+        validated = []
+
+        def validate(dumps_info):
+            validated.append(dumps_info)
+            return ValidatorResult(True, [])
+
+        watcher = DumpListingWatcher(
+            DumpListingReader('', source=self.source, last_dirs=1), validate, self.alerts.append)
+        watcher.poll()
+
+        self.assertEqual(self.source.requested_dirs, [('20211025/', True)])
+        self.assertEqual(list(validated[-1].dump_dirs), ['20211025/'])
+
+    def test_poll_alerts_new_errors_only(self):
+        results = [
+            ValidatorResult(True, []),
+            ValidatorResult(False, ['a']),
+            ValidatorResult(False, ['a', 'b']),
+            ValidatorResult(True, []),
+        ]
+        watcher = self.create_watcher(lambda dumps_info: results.pop(0))
+        for _ in range(4):
+            watcher.poll()
+
+        self.assertEqual(self.alerts, [['a'], ['b']])
+        self.assertEqual(self.resolved, [['a', 'b']])
+
+    def test_poll_alerts_by_record_key(self):
+        results = [
+            ValidatorResult(False, [ResultRecord('Dump a is too old (1 days).', 'latest_age', 'a')]),
+            ValidatorResult(False, [ResultRecord('Dump a is too old (2 days).', 'latest_age', 'a')]),
+        ]
+        watcher = self.create_watcher(lambda dumps_info: results.pop(0))
+        watcher.poll()
+        watcher.poll()
+
+        self.assertEqual(self.alerts, [['Dump a is too old (1 days).']])
+        self.assertEqual(self.resolved, [])
+
+    def test_get_interval(self):
+        now = [datetime.fromisoformat('2021-10-26T12:00:00+00:00').timestamp()]
+        watcher = self.create_watcher(
+            lambda dumps_info: ValidatorResult(True, []),
+            interval=3600, window_interval=60, clock=lambda: now[0])
+
+        # Nothing known yet
+        self.assertEqual(watcher.get_interval(), 3600)
+
+        watcher.poll()
+        self.assertEqual(watcher.get_window_weekdays(), {0})
+        # Tuesday
+        self.assertEqual(watcher.get_interval(), 3600)
+        # Monday
+        now[0] = datetime.fromisoformat('2021-11-01T00:30:00+00:00').timestamp()
+        self.assertEqual(watcher.get_interval(), 60)
+
+    def test_run(self):
+        sleeps = []
+
+        def validate(dumps_info):
+            raise ConnectionError('unreachable')
+
+        # Tuesday, outside of the window
+        tuesday = datetime.fromisoformat('2021-10-26T12:00:00+00:00').timestamp()
+        watcher = self.create_watcher(
+            validate, interval=10, clock=lambda: tuesday, sleep=sleeps.append)
+        watcher.run(max_polls=3)
+
+        self.assertEqual(sleeps, [10, 10])
+        # Alerted once, the failure is still ongoing
+        self.assertEqual(self.alerts, [['Polling the dump listing failed (unreachable).']])
+        self.assertEqual(self.resolved, [])
+
+        watcher.validate = lambda dumps_info: ValidatorResult(True, [])
+        watcher.run(max_polls=1)
+        self.assertEqual(self.resolved, [['Polling the dump listing failed (unreachable).']])
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+from WikidataDumpGenerationSmokeTests import DumpListingReader
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo, DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpSizeHistory import DumpSizeEntry, DumpSizeHistory
+from .InMemorySource import InMemorySource, create_dump_dir
+
+
+class TestDumpSizeHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'history.sqlite')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_dump_all_info(self):
+        return DumpAllInfo({}, {
+            '20211018/': DumpDirInfo({
+                'wikidata-20211018-all.json.bz2': DumpInfo(400, datetime(2021, 10, 20, 3, 12)),
+                'wikidata-20211018-all.json.gz': DumpInfo(500, datetime(2021, 10, 19, 23, 1)),
+            }, 'md5', 'sha1'),
+            '20211025/': DumpDirInfo({
+                'wikidata-20211025-all.json.bz2': DumpInfo(410, datetime(2021, 10, 27, 2, 0)),
+            }, 'md5', 'sha1'),
+        })
+
+    def test_get_dump_type(self):
+        for name in ('latest-all.json.bz2', 'all.json.bz2', 'wikidata-all.json.bz2', 'commons-all.json.bz2'):
+            self.assertEqual(DumpSizeHistory.get_dump_type(name), 'all.json.bz2')
+        for name in ('latest-lexemes.nt.gz', 'lexemes-BETA.nt.gz', 'wikidata-lexemes-BETA.nt.gz'):
+            self.assertEqual(DumpSizeHistory.get_dump_type(name), 'lexemes.nt.gz')
+
+    def test_get_sizes_beta(self):
+        history = DumpSizeHistory(self.path)
+        history.add('wikidata', DumpAllInfo({}, {
+            '20211027/': DumpDirInfo({
+                'wikidata-20211027-lexemes-BETA.nt.gz': DumpInfo(300, datetime(2021, 10, 28, 1, 0)),
+            }, 'md5', 'sha1'),
+        }))
+
+        # Found by the name of the "latest" symlink
+        self.assertEqual(history.get_sizes('wikidata', 'latest-lexemes.nt.gz'), [
+            DumpSizeEntry(date(2021, 10, 28), 'wikidata-20211027-lexemes-BETA.nt.gz', '20211027/', 300),
+        ])
+        self.assertEqual(history.get_dump_types('wikidata'), ['lexemes.nt.gz'])
+
+    def test_add_get_sizes(self):
+        history = DumpSizeHistory(self.path)
+        self.assertEqual(history.add('wikidata', self.get_dump_all_info()), 3)
+        # Adding the same dumps again doesn't duplicate them
+        self.assertEqual(history.add('wikidata', self.get_dump_all_info()), 3)
+
+        # Read from the file again
+        history = DumpSizeHistory(self.path)
+        self.assertEqual(history.get_sizes('wikidata', 'latest-all.json.bz2'), [
+            DumpSizeEntry(date(2021, 10, 20), 'wikidata-20211018-all.json.bz2', '20211018/', 400),
+            DumpSizeEntry(date(2021, 10, 27), 'wikidata-20211025-all.json.bz2', '20211025/', 410),
+        ])
+        self.assertEqual(history.get_sizes('wikidata', 'all.json.bz2', since=date(2021, 10, 21)), [
+            DumpSizeEntry(date(2021, 10, 27), 'wikidata-20211025-all.json.bz2', '20211025/', 410),
+        ])
+        self.assertEqual(history.get_sizes('wikidata', 'all.json.bz2', until=date(2021, 10, 20)), [
+            DumpSizeEntry(date(2021, 10, 20), 'wikidata-20211018-all.json.bz2', '20211018/', 400),
+        ])
+        self.assertEqual(history.get_sizes('commons', 'all.json.bz2'), [])
+        self.assertEqual(history.get_dump_types('wikidata'), ['all.json.bz2', 'all.json.gz'])
+
+    def test_add_updates(self):
+        history = DumpSizeHistory(self.path)
+        history.add('wikidata', self.get_dump_all_info())
+        history.add('wikidata', DumpAllInfo({}, {
+            '20211025/': DumpDirInfo({
+                'wikidata-20211025-all.json.bz2': DumpInfo(420, datetime(2021, 10, 28, 2, 0)),
+            }, 'md5', 'sha1'),
+        }))
+
+        self.assertEqual(history.get_sizes('wikidata', 'all.json.bz2')[-1],
+                         DumpSizeEntry(date(2021, 10, 28), 'wikidata-20211025-all.json.bz2', '20211025/', 420))
+        self.assertEqual(len(history.get_sizes('wikidata', 'all.json.bz2')), 2)
+
+    def test_add_lazy(self):
+        source = InMemorySource()
+        source.dir_stamps = {'20211018/': 'a', '20211025/': None}
+        source.dump_dirs = {dir_date: create_dump_dir(dir_date[0:8], 100) for dir_date in source.dir_stamps}
+        dumps_info = DumpListingReader('', source=source).get_lazy_dumps_info()
+        dumps_info.dump_dirs['20211025/']
+
+        history = DumpSizeHistory(self.path)
+        # Only the dump directory that was read
+        self.assertEqual(history.add('wikidata', dumps_info), 1)
+        self.assertEqual(source.requested_dirs, [('20211025/', True)])
+        self.assertEqual(history.get_sizes('wikidata', 'all.json.gz'), [
+            DumpSizeEntry(date(2021, 10, 25), 'wikidata-20211025-all.json.gz', '20211025/', 100),
+        ])
@@ -0,0 +1,116 @@
+import math
+import random
+import time
+import unittest
+from datetime import datetime, timedelta
+from WikidataDumpGenerationSmokeTests import DumpListingValidator
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo, DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpSizeTrendAnalyzer import DumpSizeTrendAnalyzer, get_prediction_scores
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+
+
+def weekly_dumps(dump_type, weeks, seed=0):
+    rng = random.Random(seed)
+    start = datetime.fromisoformat('2021-01-06')
+    dumps = {}
+    for week in range(weeks):
+        date = start + timedelta(weeks=week)
+        # Noisy, but always growing a bit
+        size = int(100000000 * 1.003 ** week * rng.uniform(0.999, 1.001))
+        dumps['wikidata-' + date.strftime('%Y%m%d') + '-' +
+              dump_type] = DumpInfo(size, date)
+    return dumps
+
+
+class TestDumpSizeTrendAnalyzer(unittest.TestCase):
+    def test_get_prediction_scores(self):
+        scores = get_prediction_scores([1, 2, 3, 4, 5, 6], [3, 5.1, 6.9, 9, 11.1, 11], min_history=3)
+
+        self.assertEqual(scores[0:3], [None, None, None])
+        # Fitted to the points before only
+        self.assertAlmostEqual(scores[3][0], 8.9)
+        self.assertTrue(0 < scores[3][1] < 1)
+        self.assertLess(scores[5][1], -10)
+        # Points before exactly on a line
+        self.assertEqual(get_prediction_scores([1, 2, 3, 4], [3, 5, 7, 8]), [None, None, None, (9.0, -math.inf)])
+
+    def test_analyze_empty(self):
+        result = DumpSizeTrendAnalyzer().analyze({})
+        self.assertEqual(result.valid, True)
+        self.assertEqual(result.errors, [])
+
+    def test_analyze_steady_growth(self):
+        result = DumpSizeTrendAnalyzer().analyze({
+            'wikidata-all.json.gz': weekly_dumps('all.json.gz', 52),
+        })
+        self.assertEqual(result.valid, True)
+        self.assertEqual(result.errors, [])
+
+    def test_analyze_short_history(self):
+        dumps = weekly_dumps('all.json.gz', 4)
+        dumps['wikidata-20210127-all.json.gz'] = DumpInfo(
+            1, dumps['wikidata-20210127-all.json.gz'].date)
+        result = DumpSizeTrendAnalyzer().analyze({'wikidata-all.json.gz': dumps})
+
+        # Too few dumps for a trend, compared to the previous dump instead
+        self.assertEqual(result.valid, False)
+        self.assertEqual(len(result.errors), 1)
+        self.assertRegex(result.errors[0], r'^Dump wikidata-20210127-all.json.gz should be at least \d+ bytes \(is 1 bytes\)\.$')
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual(error.check, 'dump_size')
+
+    def test_analyze_newest_outlier(self):
+        # dumps.wikimedia.org keeps about six dumps of each type
+        for weeks in [6, 10, 12]:
+            dumps = weekly_dumps('all.json.gz', weeks)
+            newest_name = list(dumps)[-1]
+            dumps[newest_name] = DumpInfo(dumps[newest_name].size // 2, dumps[newest_name].date)
+            result = DumpSizeTrendAnalyzer().analyze({'wikidata-all.json.gz': dumps})
+
+            self.assertEqual(result.valid, False, weeks)
+            self.assertEqual([(error.check, error.dump) for error in map(ResultRecord.from_error, result.errors)], [('size_trend', newest_name)])
+
+    def test_analyze_outliers(self):
+        dumps = weekly_dumps('all.json.gz', 52)
+        date = dumps['wikidata-20210505-all.json.gz'].date
+        dumps['wikidata-20210505-all.json.gz'] = DumpInfo(90000000, date)
+        dumps['wikidata-20210512-all.json.gz'] = DumpInfo(0, date)
+
+        result = DumpSizeTrendAnalyzer().analyze({'wikidata-all.json.gz': dumps})
+        self.assertEqual(result.valid, False)
+        self.assertEqual(len(result.errors), 2)
+        self.assertEqual(result.errors[0], 'Dump wikidata-20210512-all.json.gz is empty.')
+        self.assertRegex(
+            result.errors[1],
+            r'^Dump wikidata-20210505-all.json.gz deviates from the size trend \(expected about 10\d{7} bytes, is 90000000 bytes, z-score -\d+\.\d\)\.$'
+        )
+
+    def test_analyze_performance(self):
+        # Ten years of weekly dumps in 30 formats
+        dumps_by_type = {'wikidata-' + str(i) + '.json.gz': weekly_dumps(str(i) + '.json.gz', 520, i)
+                         for i in range(30)}
+
+        start = time.perf_counter()
+        result = DumpSizeTrendAnalyzer().analyze(dumps_by_type)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(result.valid, True)
+
+    def test_validate_listing_size_trend(self):
+        dump_dirs = {}
+        for week, (dump_name, dump_info) in enumerate(weekly_dumps('lexemes.json.gz', 10).items()):
+            # This format legitimately shrinks
+            size = int(100000000 * 0.99 ** week)
+            dump_dirs[dump_name[9:17] + '/'] = DumpDirInfo(
+                {dump_name: DumpInfo(size, dump_info.date)}, 'md5', 'sha1')
+
+        result = DumpListingValidator().validate_listing(DumpAllInfo({}, dump_dirs))
+        self.assertEqual(result.valid, False)
+        self.assertEqual(len(result.errors), 9)
+
+        validator = DumpListingValidator(
+            size_trend_analyzer=DumpSizeTrendAnalyzer())
+        result = validator.validate_listing(DumpAllInfo({}, dump_dirs))
+        # Only the dumps before there are enough for a trend are compared to the previous one
+        self.assertEqual(result.valid, False)
+        self.assertEqual([error.dump for error in map(ResultRecord.from_error, result.errors)], [
+            'wikidata-20210113-lexemes.json.gz', 'wikidata-20210120-lexemes.json.gz', 'wikidata-20210127-lexemes.json.gz'])
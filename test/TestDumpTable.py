@@ -0,0 +1,71 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+from WikidataDumpGenerationSmokeTests import DumpListingValidator
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpTable import DumpTable
+
+
+def random_dump_dirs(count, seed=0):
+    rng = random.Random(seed)
+    dump_dirs = {}
+    start = datetime.fromisoformat('2021-01-04')
+    for i in range(count):
+        date = start + timedelta(days=i * 2)
+        dir_date = date.strftime('%Y%m%d')
+        dumps = {}
+        for dump_type in rng.sample(['all.json.gz', 'all.json.bz2', 'truthy-BETA.nt.gz', 'lexemes.ttl.bz2'], 2):
+            dumps['wikidata-' + dir_date + '-' + dump_type] = DumpInfo(rng.randint(900, 1100), date)
+        dump_dirs[dir_date + '/'] = DumpDirInfo(
+            dumps, rng.choice([None, 'md5']), rng.choice([None, 'sha1']))
+    return dump_dirs
+
+
+class TestDumpTable(unittest.TestCase):
+    def test_from_dump_dirs(self):
+        dump_table = DumpTable.from_dump_dirs({
+            '20211006/': DumpDirInfo({
+                'wikidata-20211006-lexemes.json.bz2': DumpInfo(195288101, datetime.fromisoformat('2021-10-06')),
+                'wikidata-20211006-truthy-BETA.nt.gz': DumpInfo(50187553542, datetime.fromisoformat('2021-10-09')),
+            }, 'md5', None),
+            '20211013/': DumpDirInfo({}, None, None),
+            '20211020/': DumpDirInfo({
+                'wikidata-20211020-lexemes.json.bz2': DumpInfo(196060822, datetime.fromisoformat('2021-10-20')),
+            }, 'md5', 'sha1'),
+        })
+
+        self.assertEqual(len(dump_table), 3)
+        self.assertEqual(dump_table.dir_names, ['20211006/', '20211013/', '20211020/'])
+        self.assertEqual(list(dump_table.dir_dump_counts), [2, 0, 1])
+        self.assertEqual(list(dump_table.dir_has_sha1sums), [0, 0, 1])
+        self.assertEqual(dump_table.type_names, [
+                         'wikidata-lexemes.json.bz2', 'wikidata-truthy-BETA.nt.gz'])
+        self.assertEqual(list(dump_table.dump_type_ids), [0, 1, 0])
+        self.assertEqual(list(dump_table.dump_dir_ids), [0, 0, 2])
+        self.assertEqual(list(dump_table.dump_sizes), [195288101, 50187553542, 196060822])
+        self.assertEqual(dump_table.dump_sizes.itemsize, 8)
+        self.assertEqual(list(dump_table.dump_days), [
+            datetime.fromisoformat('2021-10-06').toordinal(),
+            datetime.fromisoformat('2021-10-09').toordinal(),
+            datetime.fromisoformat('2021-10-20').toordinal(),
+        ])
+
+    def test_from_dump_dirs_invalid_name(self):
+        with self.assertRaises(Exception):
+            DumpTable.from_dump_dirs({'a/': DumpDirInfo({'foo.json.gz': DumpInfo(1, datetime.now())}, None, None)})
+
+    def test_get_dumps_by_type(self):
+        dump_dirs = random_dump_dirs(50)
+        self.assertEqual(DumpTable.from_dump_dirs(dump_dirs).get_dumps_by_type(),
+                         DumpListingValidator()._group_dumps_by_type(dump_dirs))
+
+    def test_checks(self):
+        validator = DumpListingValidator(expected_size_multiplicator=1.05)
+        for seed in range(5):
+            dump_dirs = random_dump_dirs(100, seed)
+            dump_table = DumpTable.from_dump_dirs(dump_dirs)
+
+            self.assertEqual(validator._ensure_hashsum_files_table(dump_table),
+                             validator._ensure_hashsum_files(dump_dirs))
+            self.assertEqual(validator._ensure_dump_sizes_table(dump_table),
+                             validator._ensure_dump_sizes(validator._group_dumps_by_type(dump_dirs)))
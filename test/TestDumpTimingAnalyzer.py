@@ -0,0 +1,164 @@
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+from WikidataDumpGenerationSmokeTests import DumpListingReader, HtmlSnapshotSource
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo, DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpTimingAnalyzer import DumpDuration, DumpTimingAnalyzer, get_dump_type
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+from .InMemorySource import InMemorySource
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_clock(date):
+    return lambda: datetime.fromisoformat(date).replace(tzinfo=timezone.utc).timestamp()
+
+
+def weekly_dump_dirs(durations, start='2021-10-04'):
+    """
+    A dump directory per week, each with an all.json.gz dump that took the given
+    duration (hours) to generate (None for none).
+    """
+    dump_dirs = {}
+    for week, duration in enumerate(durations):
+        dir_start = datetime.fromisoformat(start) + timedelta(weeks=week)
+        date = dir_start.strftime('%Y%m%d')
+        dumps = {}
+        if duration is not None:
+            dumps['wikidata-' + date + '-all.json.gz'] = DumpInfo(100 + week, dir_start + timedelta(hours=duration))
+        dump_dirs[date + '/'] = DumpDirInfo(dumps, 'wikidata-' + date + '-md5sums.txt', 'wikidata-' + date + '-sha1sums.txt')
+
+    return dump_dirs
+
+
+class TestDumpTimingAnalyzer(unittest.TestCase):
+    def test_get_dump_type(self):
+        self.assertEqual(get_dump_type('wikidata-20211025-all.json.bz2'), 'all.json.bz2')
+        self.assertEqual(get_dump_type('wikidata-20211025-all-BETA.nt.gz'), 'all.nt.gz')
+        self.assertEqual(get_dump_type('latest-all.nt.gz'), 'all.nt.gz')
+        self.assertEqual(get_dump_type('commons-20211025-mediainfo.json.gz'), 'mediainfo.json.gz')
+
+    def test_get_durations(self):
+        dump_dirs = weekly_dump_dirs([64.5, 65])
+        # Without a time
+        dump_dirs['20211011/'].dumps['wikidata-20211011-all.json.bz2'] = DumpInfo(100, datetime(2021, 10, 14))
+
+        self.assertEqual(DumpTimingAnalyzer().get_durations(dump_dirs), {
+            'all.json.gz': [
+                DumpDuration('wikidata-20211004-all.json.gz', '20211004/', 64.5),
+                DumpDuration('wikidata-20211011-all.json.gz', '20211011/', 65.0),
+            ],
+        })
+
+    def test_analyze_steady(self):
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([64, 66, 65, 67]))
+        result = DumpTimingAnalyzer(clock=get_clock('2021-10-26T12:00')).analyze(dump_all_info)
+
+        self.assertEqual(result.valid, True)
+        self.assertEqual(result.errors, [])
+
+    def test_analyze_slow(self):
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([64, 66, 65, 90]))
+        result = DumpTimingAnalyzer(clock=get_clock('2021-10-26T12:00')).analyze(dump_all_info)
+
+        self.assertEqual(result.valid, False)
+        self.assertEqual(result.errors, [
+            'Dump wikidata-20211025-all.json.gz took 90.0 hours to generate (usually 65.0 hours).',
+        ])
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual(error.to_dict(), {
+            'check': 'generation_duration',
+            'severity': 'error',
+            'dump': 'wikidata-20211025-all.json.gz',
+            'dump_dir': '20211025/',
+            'expected': 65.0,
+            'actual': 90.0,
+            'message': 'Dump wikidata-20211025-all.json.gz took 90.0 hours to generate (usually 65.0 hours).',
+        })
+
+    def test_analyze_short_history(self):
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([64, 66, 90]))
+        result = DumpTimingAnalyzer(clock=get_clock('2021-10-26T12:00')).analyze(dump_all_info)
+
+        self.assertEqual(result.valid, True)
+
+    def test_analyze_min_delay(self):
+        # A short dump that took one hour longer than usual
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([3, 3.5, 3, 4.5]))
+
+        self.assertEqual(DumpTimingAnalyzer(clock=get_clock('2021-10-26T12:00')).analyze(dump_all_info).valid, True)
+        self.assertEqual(DumpTimingAnalyzer(min_delay_hours=1, clock=get_clock('2021-10-26T12:00')).analyze(dump_all_info).valid, False)
+
+    def test_analyze_overdue(self):
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([64, 66, 65, 67, None]))
+
+        # Still within the usual duration (plus 25%)
+        self.assertEqual(DumpTimingAnalyzer(clock=get_clock('2021-11-04T08:00')).analyze(dump_all_info).valid, True)
+        result = DumpTimingAnalyzer(clock=get_clock('2021-11-04T12:00')).analyze(dump_all_info)
+        self.assertEqual(result.errors, [
+            'Dump type "all.json.gz" is overdue in dump directory "20211101/" (started 84.0 hours ago, usually takes 65.5 hours).',
+        ])
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual((error.check, error.dump_dir), ('generation_overdue', '20211101/'))
+
+    def test_analyze_overdue_other_weekday(self):
+        dump_dirs = weekly_dump_dirs([64, 66, 65, 67])
+        # Other dumps are generated in dump directories started on other weekdays
+        dump_dirs['20211027/'] = DumpDirInfo({}, None, None)
+        result = DumpTimingAnalyzer(clock=get_clock('2021-11-01T00:00')).analyze(DumpAllInfo({}, dump_dirs))
+
+        self.assertEqual(result.valid, True)
+
+    def test_analyze_latest_lag(self):
+        dump_dirs = weekly_dump_dirs([64, 66])
+        newest = dump_dirs['20211011/'].dumps['wikidata-20211011-all.json.gz']
+
+        def analyze(latest_info, date='2021-10-14T12:00'):
+            return DumpTimingAnalyzer(clock=get_clock(date)).analyze(
+                DumpAllInfo({'latest-all.json.gz': latest_info}, dump_dirs))
+
+        self.assertEqual(analyze(newest).valid, True)
+        self.assertEqual(analyze(DumpInfo(newest.size, newest.date + timedelta(hours=1))).valid, True)
+        self.assertEqual(analyze(DumpInfo(newest.size, newest.date + timedelta(hours=14))).errors, [
+            'Latest dump "latest-all.json.gz" was updated 14.0 hours after wikidata-20211011-all.json.gz was written.',
+        ])
+        # Still points to the previous dump
+        previous = dump_dirs['20211004/'].dumps['wikidata-20211004-all.json.gz']
+        self.assertEqual(analyze(previous, '2021-10-14T05:00').valid, True)
+        result = analyze(previous, '2021-10-14T07:00')
+        self.assertEqual(result.errors, [
+            'Latest dump "latest-all.json.gz" was not updated 13.0 hours after wikidata-20211011-all.json.gz was written.',
+        ])
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual((error.check, error.expected, error.actual),
+                         ('latest_lag', 12.0, 13.0))
+
+    def test_analyze_history_weeks(self):
+        # Used to be slower
+        dump_all_info = DumpAllInfo({}, weekly_dump_dirs([90, 90, 90, 90, 64, 66, 65, 84]))
+
+        self.assertEqual(DumpTimingAnalyzer(clock=get_clock('2021-11-26T12:00')).analyze(dump_all_info).valid, True)
+        self.assertEqual(DumpTimingAnalyzer(history_weeks=3, clock=get_clock('2021-11-26T12:00')).analyze(dump_all_info).valid, False)
+
+    def test_analyze_lazy(self):
+        source = InMemorySource()
+        source.dump_dirs = weekly_dump_dirs([90, 64, 66, 65, 67])
+        source.dir_stamps = dict.fromkeys(source.dump_dirs)
+        dumps_info = DumpListingReader('', source=source).get_lazy_dumps_info()
+        result = DumpTimingAnalyzer(history_weeks=3, clock=get_clock('2021-11-04T12:00')).analyze(dumps_info)
+
+        self.assertEqual(result.valid, True)
+        # Only the dump directories of the last weeks are requested
+        self.assertEqual(sorted(source.requested_dirs), [
+            ('20211011/', False), ('20211018/', False), ('20211025/', False), ('20211101/', True)])
+
+    def test_analyze_wikidatawiki20211030(self):
+        dumps_info = DumpListingReader('', source=HtmlSnapshotSource(
+            __DIR__ + '/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html')).get_dumps_info()
+
+        # When the listing was saved
+        self.assertEqual(DumpTimingAnalyzer(clock=get_clock('2021-10-30T10:00')).analyze(dumps_info).errors, [])
+        # The truthy-BETA.nt.bz2 dump of 20211027/ usually takes about 80 hours
+        self.assertEqual(DumpTimingAnalyzer(clock=get_clock('2021-10-31T23:00')).analyze(dumps_info).errors, [
+            'Dump type "truthy.nt.bz2" is overdue in dump directory "20211027/" (started 119.0 hours ago, usually takes 80.6 hours).',
+        ])
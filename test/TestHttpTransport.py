@@ -0,0 +1,137 @@
+import socket
+import unittest
+from WikidataDumpGenerationSmokeTests import DumpListingReader, HttpTransport
+from .LocalHttpServer import LocalHttpServer, get_test_case_files
+
+
+class TestHttpTransport(unittest.TestCase):
+    def test_request(self):
+        with LocalHttpServer({'/a': b'foo'}) as server, HttpTransport() as transport:
+            response = transport.request(server.url + '/a')
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b'foo')
+
+    def test_request_not_found(self):
+        with LocalHttpServer() as server, HttpTransport() as transport:
+            response = transport.request(server.url + '/nope')
+
+        self.assertEqual(response.status, 404)
+
+    def test_request_gzip(self):
+        body = b'<a href="20211029/">20211029/</a>\n' * 100
+        with LocalHttpServer({'/a': body}) as server, HttpTransport() as transport:
+            response = transport.request(server.url + '/a')
+
+        self.assertEqual(response.headers['content-encoding'], 'gzip')
+        self.assertEqual(response.body, body)
+        self.assertEqual(server.requests[0][1]['Accept-Encoding'], 'gzip')
+
+    def test_request_reuses_connection(self):
+        with LocalHttpServer({'/a': b'foo', '/b': b'bar'}) as server, HttpTransport() as transport:
+            self.assertEqual(transport.request(server.url + '/a').body, b'foo')
+            self.assertEqual(transport.request(server.url + '/b').body, b'bar')
+            self.assertEqual(transport.request(server.url + '/a').body, b'foo')
+
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.connection_count, 1)
+
+    def test_stream(self):
+        body = b'<a href="20211029/">20211029/</a>\n' * 1000
+        with LocalHttpServer({'/a': body}) as server, HttpTransport() as transport:
+            response = transport.stream(server.url + '/a', chunk_size=128)
+            chunks = list(response.chunks)
+            # The connection is reused once the response has been consumed
+            self.assertEqual(transport.request(server.url + '/a').body, body)
+
+        self.assertEqual(response.status, 200)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), body)
+        self.assertEqual(server.connection_count, 1)
+
+    def test_get_thread_stats(self):
+        body = b'<a href="20211029/">20211029/</a>\n' * 100
+        with LocalHttpServer({'/a': body, '/b': b'bar'}) as server, HttpTransport() as transport:
+            self.assertEqual(transport.get_thread_stats(), (0, 0))
+            transport.request(server.url + '/a')
+            requests, received_bytes = transport.get_thread_stats()
+            # Gzip encoded
+            self.assertEqual(requests, 1)
+            self.assertGreater(received_bytes, 0)
+            self.assertLess(received_bytes, len(body))
+
+            transport.request(server.url + '/b', {'Accept-Encoding': 'identity'})
+            self.assertEqual(transport.get_thread_stats(), (2, received_bytes + 3))
+
+    def test_request_retry(self):
+        with LocalHttpServer({'/a': b'foo'}, failures={'/a': 2}) as server, \
+                HttpTransport(backoff_base=0.001) as transport:
+            response = transport.request(server.url + '/a')
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.body, b'foo')
+        self.assertEqual(len(server.requests), 3)
+
+    def test_request_retry_max_retries(self):
+        with LocalHttpServer({'/a': b'foo'}, failures={'/a': 5}) as server, \
+                HttpTransport(max_retries=2, backoff_base=0.001) as transport:
+            response = transport.request(server.url + '/a')
+
+        self.assertEqual(response.status, 503)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_request_retry_budget(self):
+        with LocalHttpServer({'/a': b'foo', '/b': b'bar'}, failures={'/a': 5, '/b': 5}) as server, \
+                HttpTransport(backoff_base=0.001, retry_budget=4) as transport:
+            self.assertEqual(transport.request(server.url + '/a').status, 503)
+            # Only one retry left
+            self.assertEqual(transport.request(server.url + '/b').status, 503)
+
+        self.assertEqual(len(server.requests), 6)
+        self.assertEqual(transport.retry_budget, 0)
+
+    def test_request_not_retried(self):
+        with LocalHttpServer() as server, HttpTransport(backoff_base=0.001) as transport:
+            self.assertEqual(transport.request(server.url + '/nope').status, 404)
+
+        self.assertEqual(len(server.requests), 1)
+
+    def test_request_retry_connection_error(self):
+        # Nothing listens on the port anymore
+        with LocalHttpServer() as server:
+            url = server.url
+        with HttpTransport(max_retries=1, backoff_base=0.001) as transport:
+            with self.assertRaises(ConnectionRefusedError):
+                transport.request(url + '/a')
+
+        self.assertEqual(transport.retry_budget, 49)
+
+    def test_get_backoff(self):
+        transport = HttpTransport(backoff_base=1.0, backoff_max=5.0)
+        for attempt, max_backoff in ((0, 1.0), (1, 2.0), (2, 4.0), (3, 5.0), (10, 5.0)):
+            backoff = transport._get_backoff(attempt)
+            self.assertGreaterEqual(backoff, 0)
+            self.assertLessEqual(backoff, max_backoff)
+        self.assertEqual(transport._get_backoff(0, '3'), 3.0)
+        self.assertEqual(transport._get_backoff(0, '120'), 5.0)
+
+    def test_request_timeout(self):
+        with LocalHttpServer({'/a': b'foo'}, delay=1) as server, HttpTransport(timeout=0.1, max_retries=0) as transport:
+            with self.assertRaises(socket.timeout):
+                transport.request(server.url + '/a')
+
+    def test_request_unsupported_scheme(self):
+        with HttpTransport() as transport:
+            with self.assertRaises(ValueError):
+                transport.request('ftp://example.org/')
+
+    def test_dump_listing_reader(self):
+        with LocalHttpServer(get_test_case_files('wikidatawiki-2021-10-30')) as server, HttpTransport() as transport:
+            dumps_info = DumpListingReader(
+                server.url + '/entities/', max_workers=4, transport=transport).get_dumps_info()
+
+        self.assertEqual(len(dumps_info.latest), 14)
+        self.assertEqual(len(dumps_info.dump_dirs), 20)
+        self.assertEqual(len(server.requests), 21)
+        # Connections are kept alive and reused
+        self.assertLessEqual(server.connection_count, 4)
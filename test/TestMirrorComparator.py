@@ -0,0 +1,132 @@
+import unittest
+from WikidataDumpGenerationSmokeTests import DumpListingReader, MirrorComparator
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo
+from WikidataDumpGenerationSmokeTests.MirrorComparator import MirrorComparison
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord
+from .InMemorySource import InMemorySource, create_dump_dir
+
+
+def comparison(valid, errors, synced_dir, sync_lag):
+    return MirrorComparison(valid, [ResultRecord.from_error(error) for error in errors], synced_dir, sync_lag)
+
+
+def create_dumps_info(dump_dirs, unreachable_dirs=None):
+    return DumpAllInfo({}, dump_dirs, None, unreachable_dirs or {})
+
+
+class TestMirrorComparator(unittest.TestCase):
+    def setUp(self):
+        self.reference_dirs = {
+            '20211004/': create_dump_dir('20211004', {'all.json.gz': 100, 'all.json.bz2': 80}),
+            '20211011/': create_dump_dir('20211011', {'all.json.gz': 101, 'all.json.bz2': 81}),
+            '20211018/': create_dump_dir('20211018', {'all.json.gz': 102, 'all.json.bz2': 82}),
+            '20211025/': create_dump_dir('20211025', {'all.json.gz': 103, 'all.json.bz2': 83}),
+            '20211101/': create_dump_dir('20211101', {}),
+        }
+
+    def compare(self, mirror_dirs, unreachable_dirs=None, max_sync_lag=7) -> MirrorComparison:
+        return MirrorComparator(DumpListingReader('', source=InMemorySource(self.reference_dirs)), {}, max_sync_lag).compare_dumps_info(
+            create_dumps_info(self.reference_dirs), create_dumps_info(mirror_dirs, unreachable_dirs))
+
+    def test_compare_dumps_info_in_sync(self):
+        self.assertEqual(self.compare(dict(self.reference_dirs)),
+                         comparison(True, [], '20211025/', 0))
+
+    def test_compare_dumps_info_partial_history(self):
+        mirror_dirs = {dir_date: self.reference_dirs[dir_date]
+                       for dir_date in ('20211018/', '20211025/')}
+
+        self.assertEqual(self.compare(mirror_dirs),
+                         comparison(True, [], '20211025/', 0))
+
+    def test_compare_dumps_info_missing_dir(self):
+        mirror_dirs = {dir_date: self.reference_dirs[dir_date]
+                       for dir_date in ('20211004/', '20211025/')}
+        result = self.compare(mirror_dirs)
+
+        self.assertEqual(result, comparison(False, [
+            'Dump directory "20211011/" is missing.',
+            'Dump directory "20211018/" is missing.',
+        ], '20211025/', 0))
+        self.assertEqual([error.check for error in map(ResultRecord.from_error, result.errors)], ['mirror_dir', 'mirror_dir'])
+
+    def test_compare_dumps_info_dump_differences(self):
+        mirror_dirs = dict(self.reference_dirs)
+        mirror_dirs['20211011/'] = create_dump_dir('20211011', {'all.json.gz': 99})
+        result = self.compare(mirror_dirs)
+
+        self.assertEqual(result, comparison(False, [
+            'Dump wikidata-20211011-all.json.gz should be 101 bytes (is 99 bytes).',
+            'Dump wikidata-20211011-all.json.bz2 is missing.',
+        ], '20211025/', 0))
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual(error.to_dict(), {
+            'check': 'mirror_dump_size',
+            'severity': 'error',
+            'dump': 'wikidata-20211011-all.json.gz',
+            'dump_dir': '20211011/',
+            'expected': 101,
+            'actual': 99,
+            'message': 'Dump wikidata-20211011-all.json.gz should be 101 bytes (is 99 bytes).',
+        })
+
+    def test_compare_dumps_info_syncing(self):
+        mirror_dirs = {dir_date: self.reference_dirs[dir_date]
+                       for dir_date in ('20211004/', '20211011/')}
+        # Still syncing
+        mirror_dirs['20211018/'] = create_dump_dir('20211018', {'all.json.gz': 50})
+
+        self.assertEqual(self.compare(mirror_dirs, max_sync_lag=14),
+                         comparison(True, [], '20211011/', 14))
+
+    def test_compare_dumps_info_sync_lag(self):
+        mirror_dirs = {dir_date: self.reference_dirs[dir_date]
+                       for dir_date in ('20211004/', '20211011/')}
+        result = self.compare(mirror_dirs, max_sync_lag=10)
+
+        self.assertEqual(result, comparison(False, [
+            'Mirror is 14 days behind (last synced dump directory is "20211011/", newest is "20211025/").',
+        ], '20211011/', 14))
+        error = ResultRecord.from_error(result.errors[0])
+        self.assertEqual((error.check, error.expected, error.actual),
+                         ('mirror_sync_lag', 10, 14))
+
+    def test_compare_dumps_info_nothing_synced(self):
+        self.assertEqual(self.compare({}), comparison(False, [
+            'Mirror has none of the dump directories completely.',
+        ], None, None))
+
+    def test_compare_dumps_info_unreachable_dir(self):
+        mirror_dirs = {dir_date: self.reference_dirs[dir_date]
+                       for dir_date in ('20211004/', '20211018/', '20211025/')}
+
+        self.assertEqual(self.compare(mirror_dirs, {'20211011/': 'Connection reset'}), comparison(False, [
+            'Dump directory "20211011/" is unreachable (Connection reset).',
+        ], '20211025/', 0))
+
+    def test_compare(self):
+        mirror_dirs = dict(self.reference_dirs)
+        del mirror_dirs['20211011/']
+        mirror_comparator = MirrorComparator(
+            DumpListingReader('', source=InMemorySource(self.reference_dirs)),
+            {
+                'in-sync': DumpListingReader('', 2, source=InMemorySource(dict(self.reference_dirs))),
+                'missing-dir': DumpListingReader('', 2, source=InMemorySource(mirror_dirs)),
+                'unreachable': DumpListingReader('', source=InMemorySource({}, False)),
+            }
+        )
+
+        self.assertEqual(mirror_comparator.compare(), {
+            'in-sync': comparison(True, [], '20211025/', 0),
+            'missing-dir': comparison(False, ['Dump directory "20211011/" is missing.'], '20211025/', 0),
+            'unreachable': comparison(False, ['Main index is unreachable (Connection refused).'], None, None),
+        })
+
+    def test_compare_unreachable_reference(self):
+        mirror_comparator = MirrorComparator(
+            DumpListingReader('', source=InMemorySource({}, False)),
+            {'mirror': DumpListingReader('', source=InMemorySource(self.reference_dirs))}
+        )
+
+        with self.assertRaises(ConnectionRefusedError):
+            mirror_comparator.compare()
@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import unittest
+from WikidataDumpGenerationSmokeTests import DumpListingReader, DumpListingValidator, HttpTransport
+from WikidataDumpGenerationSmokeTests.DumpListingMetrics import DumpListingMetrics
+from WikidataDumpGenerationSmokeTests.PhaseProfiler import PhaseEvent, PhaseProfiler
+from WikidataDumpGenerationSmokeTests.PhaseRecorder import MultiPhaseRecorder
+from .LocalHttpServer import LocalHttpServer, get_test_case_files
+
+
+class TestPhaseProfiler(unittest.TestCase):
+    def test_profile_reader_and_validator(self):
+        with LocalHttpServer(get_test_case_files('wikidatawiki-2021-10-30')) as server, HttpTransport() as transport:
+            profiler = PhaseProfiler(transport)
+            recorder = profiler.get_phase_recorder('wikidata')
+            dumps_info = DumpListingReader(
+                server.url + '/entities/', max_workers=4, transport=transport, recorder=recorder).get_dumps_info()
+            DumpListingValidator(recorder=recorder).validate_listing(dumps_info)
+
+        summary = profiler.get_summary()
+        self.assertEqual(list(summary.keys()), [
+            ('wikidata', 'index'),
+            ('wikidata', 'dump_dir'),
+            ('wikidata', 'dump_table'),
+            ('wikidata', 'ensure_hashsum_files'),
+            ('wikidata', 'ensure_latest'),
+            ('wikidata', 'ensure_dump_sizes'),
+        ])
+        count, wall_time, max_wall_time, cpu_time, requests, received_bytes = summary[(
+            'wikidata', 'dump_dir')]
+        self.assertEqual(count, 20)
+        self.assertEqual(requests, 20)
+        self.assertGreater(received_bytes, 0)
+        self.assertGreaterEqual(wall_time, max_wall_time)
+        self.assertGreater(cpu_time, 0)
+        self.assertEqual(summary[('wikidata', 'index')][4], 1)
+        self.assertEqual(summary[('wikidata', 'ensure_latest')][4], 0)
+
+    def test_format_table(self):
+        profiler = PhaseProfiler()
+        profiler.add_event(PhaseEvent('wikidata', 'index', 1, 1.0, 0.5, 0.25, 1, 1024))
+        profiler.add_event(PhaseEvent('wikidata', 'dump_dir', 1, 2.0, 0.5, 0.125, 1, 2048))
+        profiler.add_event(PhaseEvent('wikidata', 'dump_dir', 2, 2.0, 1.5, 0.125, 1, 2048))
+
+        self.assertEqual(profiler.format_table().splitlines(), [
+            'Project   Phase     Count  Wall (s)  Max wall (s)  CPU (s)  Requests  Bytes',
+            'wikidata  index         1     0.500         0.500    0.250         1   1024',
+            'wikidata  dump_dir      2     2.000         1.500    0.250         2   4096',
+        ])
+
+    def test_write_chrome_trace(self):
+        profiler = PhaseProfiler()
+        with profiler.get_phase_recorder('wikidata').phase('index'):
+            pass
+        with profiler.get_phase_recorder('commons').phase('index'):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.json')
+            profiler.write_chrome_trace(path)
+            with open(path, encoding='UTF-8') as f:
+                trace = json.load(f)
+
+        trace_events = trace['traceEvents']
+        self.assertEqual([(event['name'], event['ph'], event['pid']) for event in trace_events], [
+            ('process_name', 'M', 1),
+            ('index', 'X', 1),
+            ('process_name', 'M', 2),
+            ('index', 'X', 2),
+        ])
+        self.assertEqual(trace_events[2]['args'], {'name': 'commons'})
+        self.assertGreaterEqual(trace_events[1]['ts'], 0)
+        self.assertGreaterEqual(trace_events[1]['dur'], 0)
+        self.assertEqual(trace_events[1]['args']['requests'], 0)
+
+    def test_multi_phase_recorder(self):
+        profiler = PhaseProfiler()
+        metrics = DumpListingMetrics()
+        recorder = MultiPhaseRecorder([profiler.get_phase_recorder(
+            'wikidata'), metrics.get_phase_recorder('wikidata')])
+        with recorder.phase('index'):
+            pass
+
+        self.assertEqual(len(profiler.events), 1)
+        self.assertIn(
+            'wikidata_dump_smoke_tests_phase_duration_seconds_count{project="wikidata",phase="index"} 1', metrics.render())
@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+import unittest
+from WikidataDumpGenerationSmokeTests.ProjectConfig import DEFAULT_PROJECTS, ProjectConfig, load_project_configs
+
+
+class TestProjectConfig(unittest.TestCase):
+    def _load(self, data):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'config.json')
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            return load_project_configs(path)
+
+    def test_load_project_configs(self):
+        projects = self._load({'projects': [
+            {'name': 'wikidata'},
+            {'name': 'commons', 'latest_expected': ['latest-mediainfo.json.gz']},
+            {'name': 'mirror', 'main_index_url': 'https://example.org/wikidatawiki/entities/'},
+        ]})
+
+        self.assertEqual(projects, [
+            DEFAULT_PROJECTS['wikidata'],
+            ProjectConfig('commons', 'https://dumps.wikimedia.org/commonswiki/entities/',
+                          ['latest-mediainfo.json.gz']),
+            ProjectConfig(
+                'mirror', 'https://example.org/wikidatawiki/entities/', []),
+        ])
+
+    def test_load_project_configs_missing_url(self):
+        with self.assertRaises(ValueError):
+            self._load({'projects': [{'name': 'mirror'}]})
+
+    def test_load_project_configs_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            self._load({'projects': [{'name': 'wikidata'}, {'name': 'wikidata'}]})
@@ -0,0 +1,162 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from xml.etree import ElementTree
+from WikidataDumpGenerationSmokeTests import DumpListingValidator, ValidationState
+from WikidataDumpGenerationSmokeTests.DumpListingReader import DumpAllInfo, DumpDirInfo, DumpInfo
+from WikidataDumpGenerationSmokeTests.DumpListingValidator import ValidatorResult
+from WikidataDumpGenerationSmokeTests.ResultRecord import ResultRecord, format_json_lines, format_junit_xml
+
+
+class TestResultRecord(unittest.TestCase):
+    def get_dump_all_info(self):
+        return DumpAllInfo({
+            'latest-lexemes.json.bz2': DumpInfo(222, datetime.now() - timedelta(days=70)),
+        }, {
+            '20211006/': DumpDirInfo({
+                'wikidata-20211006-lexemes.json.bz2': DumpInfo(10000, datetime.fromisoformat('2021-10-06'))
+            }, 'md5', 'sha1'),
+            '20211013/': DumpDirInfo({
+                'wikidata-20211013-lexemes.json.bz2': DumpInfo(9000, datetime.fromisoformat('2021-10-13'))
+            }, 'md5', None),
+        })
+
+    def test_record_is_message(self):
+        record = ResultRecord('Dump a is too small.', 'dump_size', dump='a', expected=2, actual=1)
+
+        self.assertEqual(record, 'Dump a is too small.')
+        self.assertEqual('Dump: ' + record, 'Dump: Dump a is too small.')
+        self.assertEqual(json.dumps([record]), '["Dump a is too small."]')
+        self.assertEqual(record.check, 'dump_size')
+        self.assertEqual(record.severity, 'error')
+
+    def test_to_dict_from_dict(self):
+        record = ResultRecord('Dump a is too small.', 'dump_size', 'a', '20211006/', 2, 1)
+        self.assertEqual(record.to_dict(), {
+            'check': 'dump_size',
+            'severity': 'error',
+            'dump': 'a',
+            'dump_dir': '20211006/',
+            'expected': 2,
+            'actual': 1,
+            'message': 'Dump a is too small.',
+        })
+
+        for copy in (ResultRecord.from_dict(record.to_dict()), pickle.loads(pickle.dumps(record))):
+            self.assertIsInstance(copy, ResultRecord)
+            self.assertEqual(copy.to_dict(), record.to_dict())
+
+    def test_from_error(self):
+        record = ResultRecord('a', 'dump_size')
+        self.assertIs(ResultRecord.from_error(record), record)
+
+        record = ResultRecord.from_error('Something went wrong.')
+        self.assertEqual(record.check, 'unknown')
+        self.assertEqual(record, 'Something went wrong.')
+
+    def test_get_key(self):
+        self.assertEqual(ResultRecord('Dump a is too small (1).', 'dump_size', 'a', '20211006/').get_key(),
+                         ResultRecord('Dump a is too small (2).', 'dump_size', 'a', '20211006/').get_key())
+        self.assertNotEqual(ResultRecord('a', 'unknown').get_key(),
+                            ResultRecord('b', 'unknown').get_key())
+
+    def test_validate_listing_records(self):
+        result = DumpListingValidator().validate_listing(self.get_dump_all_info())
+
+        self.assertEqual([error.to_dict() for error in map(ResultRecord.from_error, result.errors)], [
+            {
+                'check': 'hashsum_files',
+                'severity': 'error',
+                'dump': None,
+                'dump_dir': '20211013/',
+                'expected': 'sha1',
+                'actual': None,
+                'message': 'Missing sha1sum file in dir "20211013/".',
+            },
+            {
+                'check': 'latest_age',
+                'severity': 'error',
+                'dump': 'latest-lexemes.json.bz2',
+                'dump_dir': None,
+                'expected': 10,
+                'actual': 70,
+                'message': 'Latest dump "latest-lexemes.json.bz2" is too old (70 days).',
+            },
+            {
+                'check': 'dump_size',
+                'severity': 'error',
+                'dump': 'wikidata-20211013-lexemes.json.bz2',
+                'dump_dir': '20211013/',
+                'expected': 10005,
+                'actual': 9000,
+                'message': 'Dump wikidata-20211013-lexemes.json.bz2 should be at least 10005 bytes (is 9000 bytes).',
+            },
+        ])
+
+    def test_validate_listing_incremental_records(self):
+        dump_listing_validator = DumpListingValidator()
+        expected_records = [ResultRecord.from_error(error).to_dict() for error in dump_listing_validator.validate_listing(
+            self.get_dump_all_info()).errors]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_path = os.path.join(tmp_dir, 'state.json')
+            for _ in range(2):
+                # Second run: From the saved state
+                state = ValidationState(state_path)
+                result = dump_listing_validator.validate_listing(
+                    self.get_dump_all_info(), state)
+                state.save()
+
+                self.assertEqual([error.to_dict() for error in map(ResultRecord.from_error, result.errors)], expected_records)
+
+    def test_format_json_lines(self):
+        lines = format_json_lines('wikidata', [
+            ResultRecord('Dump a is too small.', 'dump_size', 'a', '20211006/', 2, 1),
+            'Something went wrong.',
+        ], status='new').splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0]), {
+            'project': 'wikidata',
+            'key': 'dump_size:20211006/:a',
+            'status': 'new',
+            'check': 'dump_size',
+            'severity': 'error',
+            'dump': 'a',
+            'dump_dir': '20211006/',
+            'expected': 2,
+            'actual': 1,
+            'message': 'Dump a is too small.',
+        })
+        self.assertEqual(json.loads(lines[1])['check'], 'unknown')
+
+    def test_format_junit_xml(self):
+        junit_xml = format_junit_xml([
+            ('wikidata', ValidatorResult(False, [
+                ResultRecord('Dump a is too small.', 'dump_size', 'a', '20211006/', 2, 1),
+                ResultRecord('Missing md5sum file in dir "20211006/".', 'hashsum_files', dump_dir='20211006/'),
+            ])),
+            ('commons', ValidatorResult(True, [])),
+        ])
+        self.assertTrue(junit_xml.startswith('<?xml version="1.0" encoding="utf-8"?>\n<testsuites'))
+
+        root = ElementTree.fromstring(junit_xml)
+        self.assertEqual(root.tag, 'testsuites')
+        wikidata, commons = root.findall('testsuite')
+        self.assertEqual((wikidata.get('name'), wikidata.get('tests'), wikidata.get('failures')),
+                         ('wikidata', '2', '2'))
+        test_cases = wikidata.findall('testcase')
+        self.assertEqual([(test_case.get('classname'), test_case.get('name')) for test_case in test_cases], [
+            ('wikidata.dump_size', 'a'),
+            ('wikidata.hashsum_files', '20211006/'),
+        ])
+        failures = test_cases[0].findall('failure')
+        self.assertEqual([failure.get('message') for failure in failures], ['Dump a is too small.'])
+        self.assertEqual(json.loads(''.join(failures[0].itertext()))['expected'], 2)
+
+        self.assertEqual((commons.get('tests'), commons.get('failures')), ('1', '0'))
+        self.assertEqual(len(commons.findall('testcase')), 1)
+        self.assertEqual(commons.findall('testcase/failure'), [])
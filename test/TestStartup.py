@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import unittest
+import WikidataDumpGenerationSmokeTests
+
+__DIR__ = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that take a while to import and are not needed for --help
+DEFERRED_MODULES = (
+    'concurrent.futures',
+    'email',
+    'http.client',
+    'http.server',
+    'json',
+    'multiprocessing',
+    'ssl',
+    'typing',
+    'urllib',
+    'xml',
+    'WikidataDumpGenerationSmokeTests.DumpListingReader',
+    'WikidataDumpGenerationSmokeTests.HttpTransport',
+)
+
+
+class TestStartup(unittest.TestCase):
+    def run_python(self, code: str) -> list:
+        """
+        Run the given code in a new interpreter, returns the lines it printed.
+        """
+        process = subprocess.run([sys.executable, '-c', code],
+                                 cwd=os.path.dirname(__DIR__), capture_output=True, text=True, check=True)
+
+        return process.stdout.splitlines()
+
+    def test_help_startup(self):
+        # Like the console script does
+        modules = self.run_python(
+            'import sys\n'
+            'from WikidataDumpGenerationSmokeTests.__main__ import main\n'
+            'try:\n'
+            '    main(["--help"])\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'print("\\n".join(sys.modules))\n'
+        )
+
+        self.assertIn('WikidataDumpGenerationSmokeTests.__main__', modules)
+        for module in modules:
+            for deferred_module in DEFERRED_MODULES:
+                self.assertFalse(module == deferred_module or module.startswith(deferred_module + '.'),
+                                 module + ' should not be imported for --help.')
+
+    def test_exports(self):
+        # DumpListingValidator imports the DumpListingReader submodule (named like the class)
+        self.assertEqual(self.run_python(
+            'from WikidataDumpGenerationSmokeTests import DumpListingValidator, DumpListingReader\n'
+            'print(DumpListingValidator.__name__, DumpListingReader.__name__, isinstance(DumpListingReader, type))\n'
+        ), ['DumpListingValidator DumpListingReader True'])
+
+        self.assertEqual(WikidataDumpGenerationSmokeTests.__all__, list(WikidataDumpGenerationSmokeTests._EXPORTS))
+        for name in WikidataDumpGenerationSmokeTests.__all__:
+            self.assertTrue(hasattr(WikidataDumpGenerationSmokeTests, name), name)
+        with self.assertRaises(AttributeError):
+            WikidataDumpGenerationSmokeTests.DoesNotExist
@@ -1,2 +1,20 @@
 from .TestDumpListingReader import TestDumpListingReader
 from .TestDumpListingValidator import TestDumpListingValidator
+from .TestHttpTransport import TestHttpTransport
+from .TestDumpDirCache import TestDumpDirCache
+from .TestDumpListingParser import TestDumpListingParser
+from .TestDumpListingSource import TestDumpListingSource
+from .TestProjectConfig import TestProjectConfig
+from .TestChecksumVerifier import TestChecksumVerifier
+from .TestDumpIntegrityProber import TestDumpIntegrityProber
+from .TestDumpSizeTrendAnalyzer import TestDumpSizeTrendAnalyzer
+from .TestDumpTable import TestDumpTable
+from .TestDumpListingWatcher import TestDumpListingWatcher
+from .TestDumpListingMetrics import TestDumpListingMetrics
+from .TestPhaseProfiler import TestPhaseProfiler
+from .TestResultRecord import TestResultRecord
+from .TestMirrorComparator import TestMirrorComparator
+from .TestStartup import TestStartup
+from .TestDumpSizeHistory import TestDumpSizeHistory
+from .TestDumpTimingAnalyzer import TestDumpTimingAnalyzer
+from .TestCheckScheduler import TestCheckScheduler
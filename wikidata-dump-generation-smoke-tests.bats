@@ -39,3 +39,56 @@ teardown() {
         [ "$status" -eq 1 ]
 	[[ "$output" =~ Dump\ commons-.*should\ be\ at\ least\ [0-9]+\ bytes\ \(is\ [0-9]+\ bytes\)\. ]]
 }
+@test "wikidata-dump-generation-smoke-tests --test-wikidata --source file:///…/index.html" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --source "file://$BATS_TEST_DIRNAME/test/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html"
+        [ "$status" -eq 1 ]
+	[[ "$output" =~ Latest\ dump\ \"latest-all.json.bz2\"\ is\ too\ old\ \([0-9]+\ days\)\. ]]
+}
+@test "wikidata-dump-generation-smoke-tests --test-wikidata --test-commons --source: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --test-commons --source "file://$BATS_TEST_DIRNAME/test/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html"
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --source\ can\ only\ be\ used\ when\ testing\ a\ single\ project ]]
+}
+@test "wikidata-dump-generation-smoke-tests --test-wikidata --test-commons" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --test-commons
+        [ "$status" -eq 0 ]
+        [ "$output" == "" ]
+}
+@test "wikidata-dump-generation-smoke-tests --max-concurrent-requests 0: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --max-concurrent-requests 0
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --max-concurrent-requests:\ must\ be\ at\ least\ 1 ]]
+}
+@test "wikidata-dump-generation-smoke-tests --hash-dump-files: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --hash-dump-files
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --hash-dump-files\ can\ only\ be\ used\ with\ local\ dumps\ directory ]]
+}
+@test "wikidata-dump-generation-smoke-tests --verify-checksums --source file:///…/index.html: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --verify-checksums --source "file://$BATS_TEST_DIRNAME/test/DumpListingReaderTestCases/wikidatawiki-2021-10-30/index.html"
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --verify-checksums\ can\ not\ be\ used\ with\ saved\ HTML\ listing ]]
+}
+@test "wikidata-dump-generation-smoke-tests --source file:///…/missing.html: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --source "file://$BATS_TEST_DIRNAME/test/DumpListingReaderTestCases/missing.html"
+        [ "$status" -eq 1 ]
+	[[ "$output" =~ Main\ index\ \"file://.*/missing.html\"\ is\ unreachable ]]
+}
+@test "wikidata-dump-generation-smoke-tests --source ftp://…: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --source ftp://example.org/
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --source\ needs\ to\ be\ a\ http\(s\)://\ or\ file://\ URL ]]
+}
+@test "wikidata-dump-generation-smoke-tests --config missing.json: failure" {
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --config "$BATS_TEST_DIRNAME/test/missing.json"
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --config\ .*missing\.json\ can\ not\ be\ loaded ]]
+}
+@test "wikidata-dump-generation-smoke-tests --test-wikidata --config …: duplicate project failure" {
+        config="$BATS_TMPDIR/wikidata-dump-generation-smoke-tests-config.json"
+        echo '{"projects": [{"name": "wikidata"}]}' > "$config"
+        run "$BATS_TEST_DIRNAME/wikidata-dump-generation-smoke-tests" --test-wikidata --config "$config"
+        rm "$config"
+        [ "$status" -eq 2 ]
+	[[ "$output" =~ --config\ project\ \"wikidata\"\ is\ already\ tested ]]
+}